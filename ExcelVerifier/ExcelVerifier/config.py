@@ -176,6 +176,31 @@ REPORTING_DATA_FILE = str(resolve_path("reportingData.xlsx"))
 COMPANY_DB_FILE = str(get_project_root() / "company_db.json")
 DATABASE_FILE = str((get_app_data_dir() if getattr(sys, "frozen", False) else get_project_root()) / "excelverifier.db")
 
+# Database tuning ("database" section of settings.json), e.g.
+# {"wal": true, "synchronous": "NORMAL", "cache_size_kb": 16384, "mmap_size_mb": 64}
+# See DEFAULT_DATABASE_OPTIONS in core/database_handler.py for all keys.
+DATABASE_SETTINGS = _settings.get("database", {})
+
+# Gemini batch extraction ("extraction" section of settings.json), e.g.
+# {"max_in_flight": 16, "requests_per_minute": 60}
+# See DEFAULT_PIPELINE_OPTIONS in core/extraction_pipeline.py for all keys.
+EXTRACTION_SETTINGS = _settings.get("extraction", {})
+
+# Cache of Gemini extraction results ("extraction_cache" section), e.g.
+# {"enabled": true, "max_size_mb": 64}
+EXTRACTION_CACHE_SETTINGS = _settings.get("extraction_cache", {})
+EXTRACTION_CACHE_FILE = str((get_app_data_dir() if getattr(sys, "frozen", False) else get_project_root()) / "extraction_cache.db")
+
+# Downsampling/recompression of photos before upload ("upload" section), e.g.
+# {"max_long_edge": 2560, "grayscale": "auto", "format": "JPEG", "quality": 85}
+# See DEFAULT_UPLOAD_OPTIONS in core/image_preprocess.py for all keys.
+UPLOAD_SETTINGS = _settings.get("upload", {})
+
+# Watching REPORTS_ROOT for new reports ("watcher" section), e.g.
+# {"debounce_ms": 500, "polling": "auto", "poll_interval_s": 10}
+# See DEFAULT_WATCHER_OPTIONS in ui/report_watcher.py for all keys.
+WATCHER_SETTINGS = _settings.get("watcher", {})
+
 # Ensure parent directories for files exist
 ensure_directories(get_project_root(), get_app_data_dir())
 
@@ -0,0 +1,219 @@
+"""
+Butlo-dni calculation engine for ExcelVerifier reports.
+Builds the per-transaction and per-interval ("Obliczenia") frames used by
+ExcelHandler.generate_report with whole-frame pandas/NumPy operations.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+GROUP_KEYS = ['Odbiorca', 'Nazwa', 'Miesiąc']
+INTERVAL_COLUMNS = ['Odbiorca', 'Nazwa', 'Nr dokumentu', 'Data początkowa', 'Data końcowa',
+                    'liczba dni', 'Stan', 'Butlo-dni', 'Miesiąc']
+
+ONE_DAY = np.timedelta64(1, 'D')
+
+
+def annotate_transactions(df: pd.DataFrame, today: pd.Timestamp) -> pd.DataFrame:
+    """
+    Adds 'Data następna', 'Liczba dni', 'Miesiąc', 'Is_first_of_month' and
+    'Butlo-dni' columns to the transaction frame (modifies and returns df).
+
+    The frame is expected to be sorted by Odbiorca, Nazwa, Data wystawienia.
+    The first transaction of a month counts with 'stan poprzedni', the
+    following ones with 'stan po wymianie'.
+    """
+    df['Data następna'] = df.groupby(['Odbiorca', 'Nazwa'])['Data wystawienia'].shift(-1)
+    df['Data następna'] = df['Data następna'].fillna(today)
+    days = (df['Data następna'] - df['Data wystawienia']).dt.days
+    df['Liczba dni'] = days.where(days >= 0, 0)
+    df['Miesiąc'] = df['Data wystawienia'].dt.strftime('%Y-%m')
+    df['Is_first_of_month'] = df.groupby(GROUP_KEYS).cumcount() == 0
+    df['Butlo-dni'] = np.where(
+        df['Is_first_of_month'],
+        df['stan poprzedni'] * df['Liczba dni'],
+        df['stan po wymianie'] * df['Liczba dni']
+    )
+    return df
+
+
+def build_intervals(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Builds the Butlo-dni intervals for every (Odbiorca, Nazwa, Miesiąc) group.
+
+    Within a month each transaction closes the interval that started at the
+    previous transaction (or on the first day of the month). The interval is
+    valued with 'stan poprzedni' of the first transaction, and with 'stan po
+    wymianie' of the previous transaction afterwards. The last transaction
+    opens an interval that runs until the last day of the month.
+
+    Args:
+        df: Transactions with Odbiorca, Nazwa, Miesiąc, Nr dokumentu,
+            Data wystawienia, stan poprzedni and stan po wymianie columns
+
+    Returns:
+        DataFrame with INTERVAL_COLUMNS, ordered by group and interval start
+    """
+    work = df.dropna(subset=GROUP_KEYS)
+    if work.empty:
+        return pd.DataFrame(columns=INTERVAL_COLUMNS)
+
+    work = work.sort_values(GROUP_KEYS + ['Data wystawienia'], kind='stable').reset_index(drop=True)
+
+    keys = work[GROUP_KEYS]
+    is_first = (keys != keys.shift(1)).any(axis=1).to_numpy()
+    is_last = np.append(is_first[1:], True)
+    group_id = np.cumsum(is_first) - 1
+    position = np.arange(len(work)) - np.flatnonzero(is_first)[group_id]
+
+    dates = pd.to_datetime(work['Data wystawienia']).to_numpy()
+    first_day = pd.to_datetime(work['Miesiąc'], format='%Y-%m').to_numpy()
+    days_in_month = pd.DatetimeIndex(first_day).days_in_month.to_numpy()
+    last_day = first_day + (days_in_month - 1) * ONE_DAY
+
+    stan_prev = work['stan poprzedni'].to_numpy()
+    stan_after = work['stan po wymianie'].to_numpy()
+    nr_doc = work['Nr dokumentu'].to_numpy()
+
+    # Interval closed by each transaction: [previous transaction, this one)
+    start = np.where(is_first, first_day, np.roll(dates, 1))
+    stan = np.where(is_first, stan_prev, np.roll(stan_after, 1))
+    nr = np.where(is_first, nr_doc, np.roll(nr_doc, 1))
+    days = (dates - start) // ONE_DAY
+
+    closed = days > 0
+    closed_frame = pd.DataFrame({
+        'Odbiorca': work['Odbiorca'].to_numpy()[closed],
+        'Nazwa': work['Nazwa'].to_numpy()[closed],
+        'Nr dokumentu': nr[closed],
+        'Data początkowa': start[closed],
+        'Data końcowa': dates[closed] - ONE_DAY,
+        'liczba dni': days[closed],
+        'Stan': stan[closed],
+        'Butlo-dni': stan[closed] * days[closed],
+        'Miesiąc': work['Miesiąc'].to_numpy()[closed],
+        '_group': group_id[closed],
+        '_seq': position[closed],
+    })
+
+    # Interval opened by the last transaction, running to the end of the month
+    days_end = (last_day[is_last] - dates[is_last]) // ONE_DAY + 1
+    stan_end = stan_after[is_last]
+    open_frame = pd.DataFrame({
+        'Odbiorca': work['Odbiorca'].to_numpy()[is_last],
+        'Nazwa': work['Nazwa'].to_numpy()[is_last],
+        'Nr dokumentu': nr_doc[is_last],
+        'Data początkowa': dates[is_last],
+        'Data końcowa': last_day[is_last],
+        'liczba dni': days_end,
+        'Stan': stan_end,
+        'Butlo-dni': np.where(days_end > 0, stan_end * days_end, 0),
+        'Miesiąc': work['Miesiąc'].to_numpy()[is_last],
+        '_group': group_id[is_last],
+        '_seq': position[is_last] + 1,
+    })
+
+    intervals = pd.concat([closed_frame, open_frame], ignore_index=True)
+    intervals = intervals.sort_values(['_group', '_seq'], kind='stable', ignore_index=True)
+    return intervals[INTERVAL_COLUMNS]
+
+
+DAILY_COLUMNS = ['Odbiorca', 'NIP', 'Nazwa', 'Data', 'Stan', 'Butlo-dni', 'rotacja',
+                 'rotacja miesięczna', 'Stan bieżący']
+
+
+def expand_daily(intervals: pd.DataFrame, transactions: pd.DataFrame,
+                 nip_map: pd.DataFrame, stan_biezacy_map: pd.DataFrame) -> pd.DataFrame:
+    """
+    Expands the intervals into one row per calendar day of every
+    (Odbiorca, Nazwa, Miesiąc) group ("Daily Data" sheet).
+
+    Args:
+        intervals: Output of build_intervals (dates may be datetime or date)
+        transactions: Raw rows with Odbiorca, Nazwa, Miesiąc, Data wystawienia
+            and Ilość zwrócona (source of daily and monthly rotacja)
+        nip_map: Odbiorca -> NIP pairs (first NIP per Odbiorca is used)
+        stan_biezacy_map: Odbiorca, Nazwa -> 'Stan bieżący'
+
+    Returns:
+        DataFrame with DAILY_COLUMNS; 'Data' stays datetime64
+    """
+    if intervals.empty:
+        return pd.DataFrame(columns=DAILY_COLUMNS)
+
+    spans = intervals[GROUP_KEYS + ['Data początkowa', 'Data końcowa', 'Stan']].copy()
+    spans['Data początkowa'] = pd.to_datetime(spans['Data początkowa']).astype('datetime64[ns]')
+    spans['Data końcowa'] = pd.to_datetime(spans['Data końcowa']).astype('datetime64[ns]')
+
+    # One row per day of each group's month: repeat the group, add day offsets
+    groups = spans[GROUP_KEYS].drop_duplicates().sort_values(GROUP_KEYS, kind='stable', ignore_index=True)
+    first_day = pd.to_datetime(groups['Miesiąc'], format='%Y-%m').to_numpy()
+    days_in_month = pd.DatetimeIndex(first_day).days_in_month.to_numpy()
+    group_idx = np.repeat(np.arange(len(groups)), days_in_month)
+    offsets = np.arange(len(group_idx)) - np.repeat(np.cumsum(days_in_month) - days_in_month, days_in_month)
+
+    daily = groups.iloc[group_idx].reset_index(drop=True)
+    daily['Data'] = (first_day[group_idx] + offsets * ONE_DAY).astype('datetime64[ns]')
+
+    # Stan: the latest interval starting on or before the day, if it still covers it
+    spans = spans.sort_values('Data początkowa', kind='stable')
+    daily = pd.merge_asof(
+        daily.sort_values('Data', kind='stable'), spans,
+        left_on='Data', right_on='Data początkowa', by=GROUP_KEYS, direction='backward'
+    )
+    daily['Stan'] = daily['Stan'].where(daily['Data'] <= daily['Data końcowa'])
+    daily['Butlo-dni'] = daily['Stan'].fillna(0)
+
+    # Rotacja: returns on that exact day, and the monthly total
+    returns = transactions[GROUP_KEYS + ['Data wystawienia', 'Ilość zwrócona']].copy()
+    returns['Data'] = pd.to_datetime(returns['Data wystawienia']).dt.normalize().astype('datetime64[ns]')
+    by_day = returns.groupby(GROUP_KEYS + ['Data'], as_index=False)['Ilość zwrócona'].sum()
+    by_month = returns.groupby(GROUP_KEYS, as_index=False)['Ilość zwrócona'].sum()
+    daily = daily.merge(by_day.rename(columns={'Ilość zwrócona': 'rotacja'}),
+                        on=GROUP_KEYS + ['Data'], how='left')
+    daily = daily.merge(by_month.rename(columns={'Ilość zwrócona': 'rotacja miesięczna'}),
+                        on=GROUP_KEYS, how='left')
+    daily['rotacja'] = daily['rotacja'].fillna(0)
+    daily['rotacja miesięczna'] = daily['rotacja miesięczna'].fillna(0)
+
+    # Per-company NIP and per-product current state
+    first_nip = nip_map.drop_duplicates(subset='Odbiorca')[['Odbiorca', 'NIP']]
+    daily = daily.merge(first_nip, on='Odbiorca', how='left')
+    daily = daily.merge(stan_biezacy_map[['Odbiorca', 'Nazwa', 'Stan bieżący']].drop_duplicates(subset=['Odbiorca', 'Nazwa']),
+                        on=['Odbiorca', 'Nazwa'], how='left')
+
+    daily = daily.sort_values(GROUP_KEYS + ['Data'], kind='stable', ignore_index=True)
+    return daily[DAILY_COLUMNS]
+
+
+ROTACJA_COLUMNS = ['Odbiorca', 'NIP', 'Nazwa', 'Miesiąc', 'Stan', 'Butlo-dni', 'rotacja']
+
+
+def summarize_rotacja(intervals: pd.DataFrame, sum_rot: pd.DataFrame, nip_map: pd.DataFrame) -> pd.DataFrame:
+    """
+    Monthly totals per (Odbiorca, Nazwa, Miesiąc) for the "Rotacja Source" sheet.
+
+    Args:
+        intervals: Output of build_intervals
+        sum_rot: Monthly 'Ilość zwrócona' sums per GROUP_KEYS
+        nip_map: Odbiorca -> NIP pairs
+
+    Returns:
+        DataFrame with ROTACJA_COLUMNS: Stan of the last interval of the month,
+        summed Butlo-dni and the month's rotacja (0 when there were no returns)
+    """
+    if intervals.empty:
+        return pd.DataFrame(columns=ROTACJA_COLUMNS)
+
+    totals = intervals.groupby(GROUP_KEYS, as_index=False)['Butlo-dni'].sum()
+    last_stan = (intervals.sort_values('Data końcowa', kind='stable')
+                 .drop_duplicates(subset=GROUP_KEYS, keep='last')[GROUP_KEYS + ['Stan']])
+    summary = totals.merge(last_stan, on=GROUP_KEYS, how='left')
+
+    rotacja = sum_rot.groupby(GROUP_KEYS, as_index=False)['Ilość zwrócona'].sum()
+    summary = summary.merge(rotacja.rename(columns={'Ilość zwrócona': 'rotacja'}), on=GROUP_KEYS, how='left')
+    summary['rotacja'] = summary['rotacja'].fillna(0)
+
+    summary = summary.merge(nip_map, on='Odbiorca', how='left')
+    return summary[ROTACJA_COLUMNS]
@@ -1,9 +1,16 @@
 import json
 import os
+import threading
 
 from core.database_handler import DatabaseHandler
 from config import DATABASE_FILE
 
+# Company names for the Odbiorca selector, per company db file. The list only
+# changes when the company database is saved, so it is read once and kept
+# until save_company_db (or an import) invalidates it.
+_names_cache = {}
+_names_cache_lock = threading.Lock()
+
 
 def normalize_nip(value):
     if value is None:
@@ -44,6 +51,24 @@ def load_company_db(file_path):
     return [{"name": c.get("name", ""), "nip": c.get("nip", "")} for c in companies]
 
 
+def get_company_names(file_path):
+    """Sorted distinct company names, from memory after the first call."""
+    with _names_cache_lock:
+        names = _names_cache.get(file_path)
+    if names is None:
+        companies = load_company_db(file_path)
+        names = sorted({c["name"] for c in companies if c.get("name")}, key=lambda value: value.lower())
+        with _names_cache_lock:
+            _names_cache[file_path] = names
+    return list(names)
+
+
+def invalidate_company_cache():
+    """Forget the cached company names (call after changing the companies)."""
+    with _names_cache_lock:
+        _names_cache.clear()
+
+
 def save_company_db(file_path, companies):
     try:
         print(f"[SAVE] Starting save with {len(companies)} companies")
@@ -57,6 +82,7 @@ def save_company_db(file_path, companies):
         print(f"[SAVE] Cleaned: {cleaned}")
         db = DatabaseHandler(DATABASE_FILE)
         db.replace_companies(cleaned)
+        invalidate_company_cache()
         print(f"[SAVE] Success - saved {len(cleaned)} companies")
         return True
     except Exception as e:
@@ -5,147 +5,852 @@ Manages SQLite database for approved records and reporting data.
 
 import sqlite3
 import os
-from datetime import datetime
+import threading
+import time
+import weakref
+from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 from contextlib import contextmanager
 
 
+# ==================== DATES ====================
+# Dates are stored as ISO text (YYYY-MM-DD), so comparisons and half-open
+# ranges (date >= start AND date < end) can use the date indexes.
+
+ISO_DATE_GLOB = "[0-9][0-9][0-9][0-9]-[0-1][0-9]-[0-3][0-9]"
+_DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y/%m/%d", "%Y.%m.%d",
+                 "%d.%m.%Y", "%d.%m.%y", "%d-%m-%Y", "%d/%m/%Y")
+
+
+def normalize_date(value) -> str:
+    """
+    Convert a date value to the stored form YYYY-MM-DD.
+
+    Accepts date/datetime objects, Excel serial numbers and the text formats
+    found in reports (e.g. "14.02.2026", "2026-02-14 00:00:00").
+
+    Raises:
+        ValueError: If the value is not a recognizable date
+    """
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if 20000 <= value < 80000:  # Excel serial day number (1954-2118)
+            return (datetime(1899, 12, 30) + timedelta(days=int(value))).strftime('%Y-%m-%d')
+    elif isinstance(value, str):
+        text = value.strip()
+        for date_format in _DATE_FORMATS:
+            try:
+                return datetime.strptime(text, date_format).strftime('%Y-%m-%d')
+            except ValueError:
+                continue
+        try:
+            return datetime.fromisoformat(text).strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+    raise ValueError(f"Nieprawidłowa data: {value!r} (oczekiwany format RRRR-MM-DD)")
+
+
+def month_range(year_month: str) -> Tuple[str, str]:
+    """
+    Half-open date range of a month: "2026-02" -> ("2026-02-01", "2026-03-01").
+
+    Raises:
+        ValueError: If year_month is not in YYYY-MM format
+    """
+    try:
+        start = datetime.strptime(year_month.strip(), "%Y-%m")
+    except (AttributeError, ValueError):
+        raise ValueError(f"Nieprawidłowy miesiąc: {year_month!r} (oczekiwany format RRRR-MM)")
+    end = datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+
+
+def _next_day(value) -> str:
+    """Exclusive upper bound for an inclusive end date."""
+    day = datetime.strptime(normalize_date(value), '%Y-%m-%d') + timedelta(days=1)
+    return day.strftime('%Y-%m-%d')
+
+
+# ==================== SCHEMA MIGRATIONS ====================
+# The schema version is stored in PRAGMA user_version. DatabaseHandler applies
+# the pending MIGRATIONS once per database file and process; every migration
+# runs in its own transaction together with the user_version bump.
+# To change the schema, append to MIGRATIONS - never edit a shipped migration.
+
+def _create_schema(cursor: sqlite3.Cursor):
+    """Create tables if they don't exist with proper foreign key relationships."""
+    # Create companies table (no dependencies)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS companies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            nip TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_companies_name
+        ON companies(name)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_companies_nip
+        ON companies(nip)
+    """)
+
+    # Create products table (no dependencies)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            code TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_products_name
+        ON products(name)
+    """)
+
+    # Create orders table (depends on companies)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            company_id INTEGER NOT NULL,
+            date_issued TEXT NOT NULL,
+            document_number TEXT,
+            FOREIGN KEY (company_id) REFERENCES companies(id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_orders_company
+        ON orders(company_id)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_orders_date
+        ON orders(date_issued)
+    """)
+
+    # Create approved_records table (depends on orders)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS approved_records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            filename TEXT UNIQUE NOT NULL,
+            filepath TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_approved_date 
+        ON approved_records(date)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_approved_filename 
+        ON approved_records(filename)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_approved_order
+        ON approved_records(order_id)
+    """)
+
+    # Create order_items table (depends on orders and products)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS order_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity_delivery REAL DEFAULT 0,
+            quantity_return REAL DEFAULT 0,
+            previous_state REAL DEFAULT 0,
+            state_after REAL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE,
+            FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_order_items_order
+        ON order_items(order_id)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_order_items_product
+        ON order_items(product_id)
+    """)
+
+
+def _read_legacy_data(cursor: sqlite3.Cursor) -> Optional[Dict]:
+    """
+    Read the pre-normalization schema, if this database still has it.
+
+    Old schema:
+    - approved_records (date, company, filename, filepath)
+    - reporting_data (date_issued, recipient, product_name, quantities, source_filename)
+
+    Returns:
+        Dict with 'approved_records' and 'reporting_data' rows, or None
+    """
+    cursor.execute("SELECT name FROM pragma_table_info('approved_records')")
+    columns = [row[0] for row in cursor.fetchall()]
+    if 'company' not in columns:
+        return None
+
+    cursor.execute("SELECT * FROM approved_records")
+    old_approved = [dict(row) for row in cursor.fetchall()]
+
+    old_reporting = []
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='reporting_data'")
+    if cursor.fetchone():
+        cursor.execute("SELECT * FROM reporting_data")
+        old_reporting = [dict(row) for row in cursor.fetchall()]
+
+    print(f"✓ Found {len(old_approved)} approved records")
+    print(f"✓ Found {len(old_reporting)} reporting data records")
+    return {'approved_records': old_approved, 'reporting_data': old_reporting}
+
+
+def _backup_database(conn: sqlite3.Connection, db_path: str) -> Optional[str]:
+    """Create a backup of the database before converting it."""
+    if db_path == ":memory:":
+        return None
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    backup_path = f"{db_path}.backup_{timestamp}"
+    target = sqlite3.connect(backup_path)
+    try:
+        conn.backup(target)
+    finally:
+        target.close()
+    print(f"✓ Database backed up to: {backup_path}")
+    return backup_path
+
+
+def _migrate_legacy_data(cursor: sqlite3.Cursor, old_data: Dict):
+    """Move the old flat records into companies/products/orders/order_items."""
+    company_map = {}
+    for record in old_data['approved_records'] + old_data['reporting_data']:
+        name = (record.get('company') or record.get('recipient') or '').strip()
+        if name and name not in company_map:
+            cursor.execute("INSERT OR IGNORE INTO companies (name, nip) VALUES (?, NULL)", (name,))
+            cursor.execute("SELECT id FROM companies WHERE name = ?", (name,))
+            company_map[name] = cursor.fetchone()[0]
+
+    product_map = {}
+    for name in sorted({(r.get('product_name') or '').strip() for r in old_data['reporting_data']} - {''}):
+        cursor.execute("INSERT OR IGNORE INTO products (name, code) VALUES (?, NULL)", (name,))
+        cursor.execute("SELECT id FROM products WHERE name = ?", (name,))
+        product_map[name] = cursor.fetchone()[0]
+    print(f"✓ Extracted {len(company_map)} companies and {len(product_map)} products")
+
+    # Group reporting_data by source file; every approved file becomes one order
+    items_by_file = {}
+    for record in old_data['reporting_data']:
+        items_by_file.setdefault(record.get('source_filename', ''), []).append(record)
+
+    migrated = 0
+    for approved in old_data['approved_records']:
+        company_id = company_map.get((approved.get('company') or '').strip())
+        if not company_id:
+            print(f"  ⚠ Warning: Company '{approved.get('company')}' not found, skipping {approved['filename']}")
+            continue
+
+        items = items_by_file.get(approved['filename'], [])
+        date_issued = items[0].get('date_issued') if items else None
+        document_number = items[0].get('document_number') if items else None
+
+        cursor.execute("""
+            INSERT INTO orders (company_id, date_issued, document_number)
+            VALUES (?, ?, ?)
+        """, (company_id, date_issued or approved['date'], document_number))
+        order_id = cursor.lastrowid
+
+        cursor.execute("""
+            INSERT INTO approved_records (order_id, date, filename, filepath, created_at, updated_at)
+            VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP))
+        """, (order_id, approved['date'], approved['filename'], approved['filepath'],
+              approved.get('created_at'), approved.get('updated_at')))
+
+        for item in items:
+            product_id = product_map.get((item.get('product_name') or '').strip())
+            if not product_id:
+                continue
+            cursor.execute("""
+                INSERT INTO order_items
+                (order_id, product_id, quantity_delivery, quantity_return,
+                 previous_state, state_after, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+            """, (order_id, product_id,
+                  item.get('quantity_delivery', 0),
+                  item.get('quantity_return', 0),
+                  item.get('previous_state', 0),
+                  item.get('state_after', 0),
+                  item.get('created_at')))
+        migrated += 1
+
+    print(f"✓ Migrated {migrated} orders with their items and approved records")
+
+
+def migration_1_normalized_schema(conn: sqlite3.Connection, db_path: str):
+    """
+    Create the normalized schema. Databases still using the old flat schema
+    (formerly converted with migrate_to_new_schema.py) are backed up and converted.
+    """
+    cursor = conn.cursor()
+    old_data = _read_legacy_data(cursor)
+    if old_data is not None:
+        _backup_database(conn, db_path)
+        cursor.execute("ALTER TABLE approved_records RENAME TO approved_records_old")
+        # The renamed table keeps its index names; drop them so the new ones can be created
+        for index in ('idx_approved_date', 'idx_approved_filename'):
+            cursor.execute(f"DROP INDEX IF EXISTS {index}")
+
+    _create_schema(cursor)
+
+    if old_data is not None:
+        _migrate_legacy_data(cursor, old_data)
+        cursor.execute("DROP TABLE IF EXISTS reporting_data")
+        cursor.execute("DROP TABLE IF EXISTS approved_records_old")
+
+
+# Date columns kept in ISO form (normalized on write, guarded by triggers)
+DATE_COLUMNS = (('orders', 'date_issued'), ('approved_records', 'date'))
+
+
+def migration_2_iso_dates_and_indexes(conn: sqlite3.Connection, db_path: str):
+    """
+    Normalize stored dates to YYYY-MM-DD, guard them with triggers and replace
+    single-column indexes with composite ones for the hot queries.
+    """
+    cursor = conn.cursor()
+    for table, column in DATE_COLUMNS:
+        cursor.execute(f"""
+            SELECT id, {column} FROM {table}
+            WHERE {column} IS NULL OR {column} NOT GLOB ?
+        """, (ISO_DATE_GLOB,))
+        updates = []
+        invalid = []
+        for row_id, value in cursor.fetchall():
+            try:
+                updates.append((normalize_date(value), row_id))
+            except ValueError:
+                invalid.append(row_id)
+        cursor.executemany(f"UPDATE {table} SET {column} = ? WHERE id = ?", updates)
+        print(f"✓ Normalized {len(updates)} dates in {table}.{column}")
+        if invalid:
+            print(f"  ⚠ Warning: {len(invalid)} unrecognized dates left in {table}.{column} (ids: {invalid[:10]})")
+
+        for event, suffix in (("INSERT", "insert"), (f"UPDATE OF {column}", "update")):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{column}_iso_{suffix}
+                BEFORE {event} ON {table}
+                WHEN NEW.{column} NOT GLOB '{ISO_DATE_GLOB}'
+                BEGIN
+                    SELECT RAISE(ABORT, '{table}.{column} must be YYYY-MM-DD');
+                END
+            """)
+
+    # (company_id, date_issued) serves company filters with or without a date range,
+    # (order_id, product_id) the item lookups per order; they cover the old single-column ones
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_orders_company_date
+        ON orders(company_id, date_issued)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_order_items_order_product
+        ON order_items(order_id, product_id)
+    """)
+    cursor.execute("DROP INDEX IF EXISTS idx_orders_company")
+    cursor.execute("DROP INDEX IF EXISTS idx_order_items_order")
+
+
+def migration_3_report_file_index(conn: sqlite3.Connection, db_path: str):
+    """
+    Index of the report files on disk (see FileManager): one row per report
+    and per scanned directory, paths relative to REPORTS_ROOT. The approved
+    flag follows approved_records through triggers, so listing reports needs
+    no join or rescan.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS report_dirs (
+            path TEXT PRIMARY KEY,
+            parent TEXT,
+            mtime_ns INTEGER
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_report_dirs_parent
+        ON report_dirs(parent)
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS report_files (
+            path TEXT PRIMARY KEY,
+            directory TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            size INTEGER,
+            mtime_ns INTEGER,
+            approved INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_report_files_approved_path
+        ON report_files(approved, path)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_report_files_directory
+        ON report_files(directory)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_report_files_filename
+        ON report_files(filename)
+    """)
+
+    for event, statements in (
+        ("INSERT", "UPDATE report_files SET approved = 1 WHERE filename = NEW.filename;"),
+        ("DELETE", "UPDATE report_files SET approved = 0 WHERE filename = OLD.filename;"),
+        ("UPDATE OF filename", "UPDATE report_files SET approved = 0 WHERE filename = OLD.filename; "
+                               "UPDATE report_files SET approved = 1 WHERE filename = NEW.filename;"),
+    ):
+        suffix = event.split()[0].lower()
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_approved_records_index_{suffix}
+            AFTER {event} ON approved_records
+            BEGIN
+                {statements}
+            END
+        """)
+
+
+MIGRATIONS: List[Dict] = [
+    {'version': 1, 'description': 'normalized schema', 'apply': migration_1_normalized_schema},
+    {'version': 2, 'description': 'ISO dates and composite indexes', 'apply': migration_2_iso_dates_and_indexes},
+    {'version': 3, 'description': 'report file index', 'apply': migration_3_report_file_index},
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1]['version']
+
+
+def pending_migrations(current_version: int) -> List[Dict]:
+    """Migrations newer than current_version, in order."""
+    return [m for m in MIGRATIONS if m['version'] > current_version]
+
+
+# Seconds a pooled connection is reused before it is reopened (0 = open/close per call)
+DEFAULT_CONNECTION_LIFETIME = 300
+# Size of the per-connection prepared statement cache
+DEFAULT_CACHED_STATEMENTS = 256
+
+# Journal and cache tuning per database file, see DatabaseHandler.configure()
+DEFAULT_DATABASE_OPTIONS = {
+    'wal': False,                  # opt-in: readers don't block writers (and vice versa)
+    'allow_network_wal': False,    # WAL needs shared memory, so network drives fall back
+    'synchronous': None,           # 'OFF' | 'NORMAL' | 'FULL' | 'EXTRA' (None = SQLite default)
+    'cache_size_kb': None,         # page cache per connection
+    'mmap_size_mb': None,          # memory-mapped I/O (0 = off)
+    'busy_timeout_ms': 5000,       # how long a writer waits for a lock
+    'wal_autocheckpoint': 1000,    # pages in the WAL before SQLite checkpoints on commit
+    'checkpoint_interval_s': 300,  # passive checkpoint after a commit at most this often (0 = never)
+}
+SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+
+class _PooledConnection:
+    """A thread's connection to one database file, plus its transaction depth."""
+
+    __slots__ = ('conn', 'opened_at', 'depth', '__weakref__')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.opened_at = time.monotonic()
+        self.depth = 0
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except sqlite3.Error:
+                pass
+            self.conn = None
+        self.depth = 0
+
+
+# Connection pool: one connection per (thread, database path).
+# Thread-local storage owns the connections (they go away with their thread);
+# the registry only keeps weak references so close_all() can reach them.
+_pool_local = threading.local()
+_pool_registry = {}
+_pool_lock = threading.Lock()
+
+
+# Database files whose schema is up to date in this process
+_bootstrapped_paths = set()
+_bootstrap_lock = threading.RLock()
+
+
+# Options per database file, WAL state and time of the last scheduled checkpoint
+_database_options = {}
+_wal_active = set()
+_wal_fallback = set()
+_last_checkpoint = {}
+
+
+def _pool_key(db_path: str) -> str:
+    if db_path == ":memory:":
+        return db_path
+    return os.path.normcase(os.path.abspath(db_path))
+
+
+def _is_network_path(db_path: str) -> bool:
+    """True for UNC paths and mapped network drives."""
+    path = os.path.abspath(db_path)
+    if path.startswith('\\\\') or path.startswith('//'):
+        return True
+    if os.name == 'nt':
+        drive = os.path.splitdrive(path)[0]
+        if drive:
+            try:
+                import ctypes
+                return ctypes.windll.kernel32.GetDriveTypeW(drive + '\\') == 4  # DRIVE_REMOTE
+            except Exception:
+                return False
+    return False
+
+
 class DatabaseHandler:
     """Handles all database operations for the application."""
-    
-    def __init__(self, db_path: str = "excelverifier.db"):
+
+    def __init__(self, db_path: str = "excelverifier.db",
+                 connection_lifetime: float = DEFAULT_CONNECTION_LIFETIME,
+                 cached_statements: int = DEFAULT_CACHED_STATEMENTS):
         """
         Initialize database handler.
-        
+
         Args:
             db_path: Path to SQLite database file
+            connection_lifetime: Seconds a pooled per-thread connection is reused
+                before being reopened; 0 opens a new connection for every call
+            cached_statements: Prepared statement cache size per connection
         """
         self.db_path = db_path
-        self._initialize_database()
-    
-    @contextmanager
-    def _get_connection(self):
-        """Context manager for database connections."""
-        conn = sqlite3.connect(self.db_path)
+        self.connection_lifetime = connection_lifetime
+        self.cached_statements = cached_statements
+        self._pool_key = _pool_key(db_path)
+        self._ensure_schema()
+
+    # ==================== CONNECTIONS ====================
+
+    @staticmethod
+    def configure(db_path: str, options: Optional[Dict] = None):
+        """
+        Set journal/cache options for a database file (see DEFAULT_DATABASE_OPTIONS).
+        Open connections are closed so every thread picks the options up.
+
+        Args:
+            db_path: Path to SQLite database file
+            options: Overrides of DEFAULT_DATABASE_OPTIONS, e.g. settings.json "database"
+        """
+        merged = dict(DEFAULT_DATABASE_OPTIONS)
+        unknown = set(options or {}) - set(merged)
+        if unknown:
+            print(f"⚠ Warning: Unknown database options ignored: {', '.join(sorted(unknown))}")
+        merged.update({k: v for k, v in (options or {}).items() if k in merged})
+
+        key = _pool_key(db_path)
+        DatabaseHandler.close_all(db_path)
+        with _pool_lock:
+            _database_options[key] = merged
+            _wal_active.discard(key)
+            _wal_fallback.discard(key)
+
+    @property
+    def options(self) -> Dict:
+        """Options in effect for this database file."""
+        return _database_options.get(self._pool_key, DEFAULT_DATABASE_OPTIONS)
+
+    def _open_connection(self):
+        options = self.options
+        conn = sqlite3.connect(self.db_path, timeout=options['busy_timeout_ms'] / 1000,
+                               cached_statements=self.cached_statements, check_same_thread=False)
         conn.row_factory = sqlite3.Row  # Enable column access by name
         conn.execute("PRAGMA foreign_keys = ON")  # Enable foreign key constraints
+        self._apply_pragmas(conn, options)
+        return conn
+
+    def _apply_pragmas(self, conn, options: Dict):
+        """Journal mode and cache pragmas for a new connection."""
+        if options['wal'] and self._pool_key not in _wal_fallback:
+            reason = None
+            if self.db_path == ":memory:":
+                reason = "in-memory database"
+            elif _is_network_path(self.db_path) and not options['allow_network_wal']:
+                reason = "database is on a network drive"
+            else:
+                try:
+                    mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+                    if str(mode).lower() != 'wal':
+                        reason = f"journal_mode stayed '{mode}'"
+                except sqlite3.OperationalError as e:
+                    reason = str(e)
+
+            if reason is None:
+                conn.execute(f"PRAGMA wal_autocheckpoint = {int(options['wal_autocheckpoint'])}")
+                _wal_active.add(self._pool_key)
+            else:
+                # Rollback journal with a busy timeout: writers wait for readers instead of failing
+                print(f"⚠ Warning: WAL unavailable for {self.db_path} ({reason}), using rollback journal")
+                _wal_fallback.add(self._pool_key)
+
+        if self._pool_key not in _wal_active and self.db_path != ":memory:":
+            # WAL is persistent in the file; switch back when it is off or unusable here
+            if str(conn.execute("PRAGMA journal_mode").fetchone()[0]).lower() == 'wal':
+                try:
+                    conn.execute("PRAGMA journal_mode = DELETE")
+                except sqlite3.OperationalError:
+                    pass  # other connections still open; the next one will retry
+
+        synchronous = options['synchronous']
+        if synchronous:
+            if str(synchronous).upper() not in SYNCHRONOUS_MODES:
+                raise ValueError(f"Nieprawidłowa wartość synchronous: {synchronous}")
+            conn.execute(f"PRAGMA synchronous = {str(synchronous).upper()}")
+        if options['cache_size_kb']:
+            conn.execute(f"PRAGMA cache_size = -{int(options['cache_size_kb'])}")
+        if options['mmap_size_mb'] is not None:
+            conn.execute(f"PRAGMA mmap_size = {int(options['mmap_size_mb']) * 1024 * 1024}")
+
+    def is_wal(self) -> bool:
+        """True if connections to this database use WAL journaling."""
+        return self._pool_key in _wal_active
+
+    def checkpoint(self, mode: str = "PASSIVE") -> Optional[Tuple[int, int, int]]:
+        """
+        Copy WAL content back into the database file.
+
+        Args:
+            mode: PASSIVE (never waits), FULL, RESTART or TRUNCATE (also empties the WAL file)
+
+        Returns:
+            (busy, wal pages, checkpointed pages), or None when WAL is not in use
+        """
+        if not self.is_wal():
+            return None
+        mode = mode.upper()
+        if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+            raise ValueError(f"Nieprawidłowy tryb checkpoint: {mode}")
+        with self._get_connection() as conn:
+            row = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        _last_checkpoint[self._pool_key] = time.monotonic()
+        return tuple(row)
+
+    def snapshot(self, target_path: str):
+        """
+        Write a consistent copy of the whole database to target_path, taken
+        with SQLite's online backup API (committed WAL content included,
+        other connections may keep writing), e.g. for an export.
+        """
+        with self._get_connection() as conn:
+            target = sqlite3.connect(target_path)
+            try:
+                conn.backup(target)
+            finally:
+                target.close()
+        # Header bytes 18/19 (file format versions) are copied from a WAL
+        # database as 2; 1 = rollback journal, so the copy opens anywhere
+        with open(target_path, 'r+b') as f:
+            f.seek(18)
+            f.write(b"\x01\x01")
+
+    def _maybe_checkpoint(self, conn):
+        """Scheduled passive checkpoint after a commit, at most every checkpoint_interval_s."""
+        interval = self.options['checkpoint_interval_s']
+        if not interval or self._pool_key not in _wal_active:
+            return
+        now = time.monotonic()
+        last = _last_checkpoint.setdefault(self._pool_key, now)
+        if now - last >= interval:
+            _last_checkpoint[self._pool_key] = now
+            try:
+                conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            except sqlite3.OperationalError:
+                pass  # best effort, SQLite's auto-checkpoint still runs
+
+    def _pooled(self) -> _PooledConnection:
+        """Get (or open) this thread's pooled connection for the database."""
+        connections = getattr(_pool_local, 'connections', None)
+        if connections is None:
+            connections = _pool_local.connections = {}
+
+        pooled = connections.get(self._pool_key)
+        if pooled is not None and pooled.conn is not None and pooled.depth == 0:
+            # Recycle connections past their lifetime (never inside a transaction)
+            if time.monotonic() - pooled.opened_at > self.connection_lifetime:
+                pooled.close()
+
+        if pooled is None or pooled.conn is None:
+            pooled = _PooledConnection(self._open_connection())
+            connections[self._pool_key] = pooled
+            with _pool_lock:
+                _pool_registry.setdefault(self._pool_key, weakref.WeakSet()).add(pooled)
+        return pooled
+
+    @contextmanager
+    def _get_connection(self):
+        """
+        Context manager for database connections.
+
+        Reuses the calling thread's pooled connection and commits when the
+        block ends. Inside transaction() the block runs in a savepoint instead,
+        so a failing call only undoes its own changes and the commit is left
+        to the outermost transaction.
+        """
+        if self.connection_lifetime <= 0 and not self.in_transaction():
+            conn = self._open_connection()
+            try:
+                yield conn
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                conn.close()
+            return
+
+        pooled = self._pooled()
+        conn = pooled.conn
+        if pooled.depth > 0:
+            savepoint = f"dbh_{pooled.depth}"
+            conn.execute(f"SAVEPOINT {savepoint}")
+            pooled.depth += 1
+            try:
+                yield conn
+            except Exception:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+                raise
+            else:
+                conn.execute(f"RELEASE {savepoint}")
+            finally:
+                pooled.depth -= 1
+            return
+
         try:
             yield conn
             conn.commit()
         except Exception as e:
             conn.rollback()
             raise e
-        finally:
-            conn.close()
-    
-    def _initialize_database(self):
-        """Create tables if they don't exist with proper foreign key relationships."""
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Create companies table (no dependencies)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS companies (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE NOT NULL,
-                    nip TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_companies_name
-                ON companies(name)
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_companies_nip
-                ON companies(nip)
-            """)
-            
-            # Create products table (no dependencies)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS products (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL UNIQUE,
-                    code TEXT
-                )
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_products_name
-                ON products(name)
-            """)
-            
-            # Create orders table (depends on companies)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS orders (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    company_id INTEGER NOT NULL,
-                    date_issued TEXT NOT NULL,
-                    document_number TEXT,
-                    FOREIGN KEY (company_id) REFERENCES companies(id) ON DELETE CASCADE
-                )
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_orders_company
-                ON orders(company_id)
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_orders_date
-                ON orders(date_issued)
-            """)
-            
-            # Create approved_records table (depends on orders)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS approved_records (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    order_id INTEGER NOT NULL,
-                    date TEXT NOT NULL,
-                    filename TEXT UNIQUE NOT NULL,
-                    filepath TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE
-                )
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_approved_date 
-                ON approved_records(date)
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_approved_filename 
-                ON approved_records(filename)
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_approved_order
-                ON approved_records(order_id)
-            """)
-            
-            # Create order_items table (depends on orders and products)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS order_items (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    order_id INTEGER NOT NULL,
-                    product_id INTEGER NOT NULL,
-                    quantity_delivery REAL DEFAULT 0,
-                    quantity_return REAL DEFAULT 0,
-                    previous_state REAL DEFAULT 0,
-                    state_after REAL DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE,
-                    FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE
-                )
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_order_items_order
-                ON order_items(order_id)
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_order_items_product
-                ON order_items(product_id)
-            """)
-            
+        self._maybe_checkpoint(conn)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run several handler calls as one atomic unit on the calling thread.
+
+        All DatabaseHandler instances for the same database file share the
+        thread's connection, so their calls join the transaction too. Nested
+        transaction() blocks become savepoints.
+
+        Example:
+            with db.transaction():
+                company_id = db.add_company("Firma")
+                order_id = db.add_order(company_id, "2026-02-14")
+        """
+        if self.in_transaction():
+            with self._get_connection():
+                yield self
+            return
+
+        pooled = self._pooled()
+        conn = pooled.conn
+        if conn.in_transaction:
             conn.commit()
-    
+        conn.execute("BEGIN")
+        pooled.depth = 1
+        try:
+            yield self
+        except Exception:
+            pooled.depth = 0
+            if pooled.conn is not None:
+                conn.rollback()
+            raise
+        else:
+            pooled.depth = 0
+            conn.commit()
+            self._maybe_checkpoint(conn)
+        finally:
+            if self.connection_lifetime <= 0:
+                self.close()
+
+    def in_transaction(self) -> bool:
+        """True if the calling thread is inside transaction() for this database."""
+        connections = getattr(_pool_local, 'connections', None)
+        pooled = connections.get(self._pool_key) if connections else None
+        return bool(pooled is not None and pooled.conn is not None and pooled.depth > 0)
+
+    def close(self):
+        """Close the calling thread's pooled connection for this database."""
+        connections = getattr(_pool_local, 'connections', None)
+        pooled = connections.pop(self._pool_key, None) if connections else None
+        if pooled is not None:
+            pooled.close()
+
+    @staticmethod
+    def close_all(db_path: Optional[str] = None):
+        """
+        Close pooled connections of all threads, e.g. before the database
+        file is replaced or deleted (import). Threads reopen on next use and
+        the schema is checked again by the next DatabaseHandler.
+
+        Args:
+            db_path: Only close connections to this database (default: all)
+        """
+        with _pool_lock:
+            if db_path is None:
+                keys = list(_pool_registry.keys())
+            else:
+                keys = [_pool_key(db_path)]
+            holders = []
+            for key in keys:
+                holders.extend(_pool_registry.pop(key, ()))
+            # The file may be replaced, so check its schema again on next use
+            if db_path is None:
+                _bootstrapped_paths.clear()
+            else:
+                _bootstrapped_paths.discard(keys[0])
+        for pooled in holders:
+            pooled.close()
+
+    def _ensure_schema(self):
+        """
+        Apply pending schema migrations (PRAGMA user_version), once per
+        database file and process. Later handlers for the same file skip this.
+        """
+        if self._pool_key in _bootstrapped_paths:
+            return
+
+        with _bootstrap_lock:
+            if self._pool_key in _bootstrapped_paths:
+                return
+
+            with self._get_connection() as conn:
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+            if version > SCHEMA_VERSION:
+                print(f"⚠ Warning: Database schema version {version} is newer than supported ({SCHEMA_VERSION})")
+
+            for migration in pending_migrations(version):
+                with self.transaction():
+                    with self._get_connection() as conn:
+                        migration['apply'](conn, self.db_path)
+                        conn.execute(f"PRAGMA user_version = {int(migration['version'])}")
+                print(f"✓ Database schema migrated to version {migration['version']} ({migration['description']})")
+
+            # Every connection to an in-memory database is a separate database
+            if self._pool_key != ":memory:":
+                _bootstrapped_paths.add(self._pool_key)
+
     # ==================== COMPANIES ====================
     
     def add_company(self, name: str, nip: str = None) -> Optional[int]:
@@ -270,6 +975,38 @@ class DatabaseHandler:
                 row = cursor.fetchone()
                 return row['id'] if row else None
     
+    def add_products(self, names: List[str]) -> Dict[str, int]:
+        """
+        Add many products at once, keeping existing ones.
+
+        Args:
+            names: Product names (duplicates and empty names are ignored)
+
+        Returns:
+            Dict mapping product name to product ID
+        """
+        unique_names = list(dict.fromkeys(name for name in names if name))
+        if not unique_names:
+            return {}
+
+        product_ids = {}
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("""
+                INSERT INTO products (name) VALUES (?)
+                ON CONFLICT(name) DO NOTHING
+            """, [(name,) for name in unique_names])
+
+            # Stay below SQLite's host parameter limit
+            for start in range(0, len(unique_names), 500):
+                chunk = unique_names[start:start + 500]
+                cursor.execute(f"""
+                    SELECT id, name FROM products
+                    WHERE name IN ({','.join('?' * len(chunk))})
+                """, chunk)
+                product_ids.update({row['name']: row['id'] for row in cursor.fetchall()})
+        return product_ids
+
     def get_product_by_id(self, product_id: int) -> Optional[Dict]:
         """Get product by ID."""
         with self._get_connection() as conn:
@@ -300,18 +1037,21 @@ class DatabaseHandler:
         
         Args:
             company_id: Foreign key to companies table
-            date_issued: Date in yyyy-MM-dd format
+            date_issued: Date (stored as yyyy-MM-dd, see normalize_date)
             document_number: Optional document/order number
             
         Returns:
             Order ID
+
+        Raises:
+            ValueError: If date_issued is not a recognizable date
         """
         with self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT INTO orders (company_id, date_issued, document_number)
                 VALUES (?, ?, ?)
-            """, (company_id, date_issued, document_number))
+            """, (company_id, normalize_date(date_issued), document_number))
             return cursor.lastrowid
     
     def get_order_by_id(self, order_id: int) -> Optional[Dict]:
@@ -361,13 +1101,17 @@ class DatabaseHandler:
         
         Args:
             order_id: Foreign key to orders table
-            date: Date in yyyy-MM-dd format
+            date: Date (stored as yyyy-MM-dd, see normalize_date)
             filename: Excel filename (unique)
             filepath: Full path to Excel file
             
         Returns:
             Record ID or None if duplicate filename
+
+        Raises:
+            ValueError: If date is not a recognizable date
         """
+        date = normalize_date(date)
         try:
             with self._get_connection() as conn:
                 cursor = conn.cursor()
@@ -386,11 +1130,12 @@ class DatabaseHandler:
         
         Args:
             filename: Excel filename
-            new_date: New date in yyyy-MM-dd format
+            new_date: New date (stored as yyyy-MM-dd, see normalize_date)
             
         Returns:
             True if updated, False if not found
         """
+        new_date = normalize_date(new_date)
         with self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
@@ -544,9 +1289,9 @@ class DatabaseHandler:
                 FROM approved_records ar
                 JOIN orders o ON ar.order_id = o.id
                 JOIN companies c ON o.company_id = c.id
-                WHERE ar.date LIKE ?
+                WHERE ar.date >= ? AND ar.date < ?
                 ORDER BY ar.date ASC, c.name ASC
-            """, (f"{year_month}%",))
+            """, month_range(year_month))
             return [dict(row) for row in cursor.fetchall()]
     
     def get_approved_records_filtered(self, month: Optional[str] = None, company_name: Optional[str] = None) -> List[Dict]:
@@ -573,8 +1318,8 @@ class DatabaseHandler:
         params = []
         
         if month:
-            query += " AND ar.date LIKE ?"
-            params.append(f"{month}%")
+            query += " AND ar.date >= ? AND ar.date < ?"
+            params.extend(month_range(month))
         
         if company_name:
             query += " AND c.name = ?"
@@ -604,7 +1349,90 @@ class DatabaseHandler:
                 ORDER BY c.name ASC
             """)
             return [row['name'] for row in cursor.fetchall()]
-    
+
+    def get_report_snapshots(self) -> List[Dict]:
+        """
+        Get the order_items snapshot state of every approved record.
+
+        Used by report generation to decide whether the rows stored in
+        order_items can be used or the workbook has to be parsed again
+        (file edited after approval, or no items stored at all).
+
+        Returns:
+            List of dictionaries with order_id, filename, filepath,
+            company_name, item_count and snapshot_at (UTC timestamp text
+            of the newest order item, None when there are no items)
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT ar.order_id, ar.filename, ar.filepath,
+                       c.name as company_name,
+                       COUNT(oi.id) as item_count,
+                       MAX(oi.created_at) as snapshot_at
+                FROM approved_records ar
+                JOIN orders o ON ar.order_id = o.id
+                JOIN companies c ON o.company_id = c.id
+                LEFT JOIN order_items oi ON oi.order_id = ar.order_id
+                GROUP BY ar.id
+            """)
+            return [dict(row) for row in cursor.fetchall()]
+
+    # ==================== REPORT FILE INDEX ====================
+
+    def get_indexed_directories(self) -> Dict[str, Tuple[Optional[str], Optional[int]]]:
+        """
+        Directories in the report file index.
+
+        Returns:
+            Dictionary relative path -> (parent relative path, mtime_ns when it was scanned; None = rescan)
+        """
+        with self._get_connection() as conn:
+            rows = conn.execute("SELECT path, parent, mtime_ns FROM report_dirs").fetchall()
+            return {path: (parent, mtime_ns) for path, parent, mtime_ns in rows}
+
+    def replace_indexed_directory(self, directory: str, parent: Optional[str],
+                                  mtime_ns: Optional[int], files: List[Tuple[str, int, int]]):
+        """
+        Store the result of scanning one directory, replacing its previous files.
+
+        Args:
+            directory: Directory path relative to REPORTS_ROOT, '/'-separated ('' = the root)
+            parent: Parent directory relative path (None for the root)
+            mtime_ns: Directory mtime the scan saw (None = scan it again next time)
+            files: (filename, size, mtime_ns) of the reports directly in it
+        """
+        with self._get_connection() as conn:
+            conn.execute("""
+                INSERT INTO report_dirs (path, parent, mtime_ns) VALUES (?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET parent = excluded.parent, mtime_ns = excluded.mtime_ns
+            """, (directory, parent, mtime_ns))
+            conn.execute("DELETE FROM report_files WHERE directory = ?", (directory,))
+            conn.executemany("""
+                INSERT INTO report_files (path, directory, filename, size, mtime_ns, approved)
+                VALUES (?, ?, ?, ?, ?, EXISTS (SELECT 1 FROM approved_records WHERE filename = ?))
+            """, [(f"{directory}/{name}" if directory else name, directory, name, size, mtime, name)
+                  for name, size, mtime in files])
+
+    def remove_indexed_directories(self, directories: List[str]):
+        """Drop directories (and their files) that no longer exist from the report file index."""
+        with self._get_connection() as conn:
+            params = [(d,) for d in directories]
+            conn.executemany("DELETE FROM report_files WHERE directory = ?", params)
+            conn.executemany("DELETE FROM report_dirs WHERE path = ?", params)
+
+    def get_indexed_reports(self, approved: bool) -> List[str]:
+        """
+        Paths of the indexed reports relative to REPORTS_ROOT, sorted.
+
+        Args:
+            approved: True for reports with an approved record, False for the others
+        """
+        with self._get_connection() as conn:
+            rows = conn.execute("SELECT path FROM report_files WHERE approved = ? ORDER BY path",
+                                (int(bool(approved)),)).fetchall()
+            return [row[0] for row in rows]
+
     # ==================== ORDER ITEMS ====================
     
     def add_order_items(self, items: List[Dict]) -> int:
@@ -668,11 +1496,14 @@ class DatabaseHandler:
                 - company_name: Company name
                 - start_date: yyyy-MM-dd
                 - end_date: yyyy-MM-dd
-        
+                - company_ids: List of company IDs
+                - approved_only: Only items of approved records
+
         Returns:
             List of dictionaries with complete item data
         """
-        query = """
+        approved_join = "JOIN" if filters and filters.get('approved_only') else "LEFT JOIN"
+        query = f"""
             SELECT oi.id, oi.order_id, oi.product_id,
                    oi.quantity_delivery, oi.quantity_return,
                    oi.previous_state, oi.state_after, oi.created_at,
@@ -684,15 +1515,22 @@ class DatabaseHandler:
             JOIN orders o ON oi.order_id = o.id
             JOIN companies c ON o.company_id = c.id
             JOIN products p ON oi.product_id = p.id
-            LEFT JOIN approved_records ar ON ar.order_id = o.id
+            {approved_join} approved_records ar ON ar.order_id = o.id
             WHERE 1=1
         """
         params = []
-        
+
         if filters:
+            if filters.get('company_ids') is not None:
+                company_ids = list(filters['company_ids'])
+                if not company_ids:
+                    return []
+                query += f" AND c.id IN ({', '.join('?' * len(company_ids))})"
+                params.extend(company_ids)
+
             if filters.get('month'):
-                query += " AND o.date_issued LIKE ?"
-                params.append(f"{filters['month']}%")
+                query += " AND o.date_issued >= ? AND o.date_issued < ?"
+                params.extend(month_range(filters['month']))
             
             if filters.get('company_name'):
                 query += " AND c.name = ?"
@@ -700,11 +1538,11 @@ class DatabaseHandler:
             
             if filters.get('start_date'):
                 query += " AND o.date_issued >= ?"
-                params.append(filters['start_date'])
+                params.append(normalize_date(filters['start_date']))
             
             if filters.get('end_date'):
-                query += " AND o.date_issued <= ?"
-                params.append(filters['end_date'])
+                query += " AND o.date_issued < ?"
+                params.append(_next_day(filters['end_date']))
         
         query += " ORDER BY o.date_issued DESC, c.name ASC, p.name ASC"
         
@@ -6,8 +6,12 @@ from openpyxl.utils import get_column_letter
 from datetime import datetime
 from config import APPROVED_FILE, REPORTING_DATA_FILE, COMPANY_DB_FILE, DATABASE_FILE, APPROVED_DIRECTORY
 from core.image_transformer import ImageTransformer
-from core.company_db import load_company_db, normalize_nip
-from core.database_handler import DatabaseHandler
+from core.company_db import load_company_db, normalize_nip, invalidate_company_cache
+from core.database_handler import DatabaseHandler, normalize_date
+from core.image_resolver import find_image
+from core.butlodni import annotate_transactions, build_intervals, expand_daily, summarize_rotacja
+from core.pivot_writer import write_pivot_sheets
+from core.validation import expected_stock, stock_mismatches, table_columns
 
 class ExcelHandler:
     def __init__(self):
@@ -29,9 +33,27 @@ class ExcelHandler:
         self.current_df = pd.DataFrame(ws.values)
         return self.current_df
 
-    def save_data(self, ui_table_data):
+    def read_report(self, file_path):
         """
-        Receives raw data from UI, updates workbook, 
+        Parses a report without making it the current one.
+        Returns (workbook, df, style_map); touches no handler state, so the
+        report prefetcher runs it in a worker thread.
+        """
+        workbook = load_workbook(file_path)
+        df = pd.DataFrame(workbook.active.values)
+        return workbook, df, self.get_formatting(workbook)
+
+    def use_report(self, file_path, workbook, df):
+        """Makes a report parsed by read_report the current one (like load_file)."""
+        self.file_path = file_path
+        self.current_workbook = workbook
+        self.current_df = df
+        return df
+
+    def save_data(self, changes):
+        """
+        Receives the cells edited in the UI as {(row, col): text} (0-based;
+        a full table as a list of rows is accepted too), updates workbook, 
         runs the math validation logic (red coloring),
         and saves the file.
         Detects if 'Odbiorca' (row 1, col 2) changed and reorganizes files accordingly.
@@ -60,12 +82,15 @@ class ExcelHandler:
             source_fill = ws.cell(row=row_idx, column=7).fill
             self.original_fills[row_idx] = clone_fill(source_fill)
 
-        # 2. Update Workbook with data from UI
-        for i, row_data in enumerate(ui_table_data):
-            for j, text_val in enumerate(row_data):
-                cell = ws.cell(row=i+1, column=j+1)
-                new_val = self._convert_type(text_val, cell.value)
-                cell.value = new_val
+        # 2. Update Workbook with the changed cells from UI
+        if not isinstance(changes, dict):
+            changes = {(i, j): text_val
+                       for i, row_data in enumerate(changes)
+                       for j, text_val in enumerate(row_data)}
+        for (i, j), text_val in changes.items():
+            cell = ws.cell(row=i+1, column=j+1)
+            new_val = self._convert_type(text_val, cell.value)
+            cell.value = new_val
 
         # Check if Odbiorca changed
         new_odbiorca = ws.cell(row=1, column=2).value or "UNKNOWN"
@@ -100,23 +125,29 @@ class ExcelHandler:
         # 6. Sync with reportingData.xlsx
         self._update_reporting_data()
 
-    def get_formatting(self):
+    def get_formatting(self, workbook=None):
         """
         Returns a dictionary mapping coordinates to colors:
         { (row_idx, col_idx): {'bg': '#FF0000', 'fg': '#000000'} }
+        of the given workbook (default: the current one).
         """
-        if not self.current_workbook:
+        if workbook is None:
+            workbook = self.current_workbook
+        if not workbook:
             return {}
 
         # Import helper here to prevent circular import issues
         from ui.utils import resolve_excel_color 
         
-        ws = self.current_workbook.active
+        ws = workbook.active
         styles = {}
 
         # Scan all cells that have data or formatting
         for row in ws.iter_rows():
             for cell in row:
+                # Cells without a style id have the default (empty) formatting
+                if not cell.has_style:
+                    continue
                 # Convert 1-based Excel index to 0-based UI index
                 r = cell.row - 1
                 c = cell.column - 1
@@ -143,11 +174,48 @@ class ExcelHandler:
 
     def approve_report(self, filename, date_part, company_part, full_path):
         """
+        Approves the currently loaded report as one atomic unit:
         1. Move file from Niezatwierdzone to Zatwierdzone
         2. Move linked image (if exists) to Zatwierdzone
-        3. Write metadata to database with new path
-        4. Append detailed rows to database
+        3. Write company, order, approved record and all rows to the database
+           in a single transaction
+
+        If the database write fails, the moved files are put back.
+        """
+        approval = self._collect_approval_data(self.current_workbook.active, date_part)
+        self._approve_file(filename, company_part, full_path, approval)
+
+    def approve_reports(self, reports, progress_callback=None):
         """
+        Approves several reports; each file is its own transaction, so a failing
+        file is rolled back (database and moved files) without affecting the others.
+
+        Args:
+            reports: List of (filename, date_part, company_part, full_path) tuples
+            progress_callback: Optional callable(done, total, filename)
+
+        Returns:
+            List of (filename, error) tuples; error is None for approved files
+        """
+        results = []
+        for index, (filename, date_part, company_part, full_path) in enumerate(reports, start=1):
+            try:
+                wb = load_workbook(full_path, read_only=True)
+                try:
+                    approval = self._collect_approval_data(wb.active, date_part)
+                finally:
+                    wb.close()
+                self._approve_file(filename, company_part, full_path, approval)
+                results.append((filename, None))
+            except Exception as e:
+                print(f"[APPROVE] ✗ {filename}: {e}")
+                results.append((filename, str(e)))
+            if progress_callback:
+                progress_callback(index, len(reports), filename)
+        return results
+
+    def _approve_file(self, filename, company_part, full_path, approval):
+        """Moves the report (and its image) to Zatwierdzone and writes it to the database."""
         import shutil
         import os
         
@@ -160,12 +228,14 @@ class ExcelHandler:
         
         # Create the destination file path
         approved_path = os.path.join(approved_dir, filename)
+        moved = []  # (source, destination) pairs, to undo on failure
         
         # Move the Excel file from Niezatwierdzone to Zatwierdzone
         try:
             print(f"[APPROVE] Moving Excel from: {full_path}")
             print(f"[APPROVE] Moving Excel to: {approved_path}")
             shutil.move(full_path, approved_path)
+            moved.append((full_path, approved_path))
             print(f"[APPROVE] Excel file moved successfully")
         except Exception as e:
             print(f"[APPROVE] Error moving Excel file: {e}")
@@ -173,32 +243,31 @@ class ExcelHandler:
         
         # Move the linked image if it exists
         try:
-            excel_dir = os.path.dirname(full_path)
-            excel_base = os.path.splitext(filename)[0]
-            
-            image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff']
-            for ext in image_extensions:
-                source_image = os.path.join(excel_dir, excel_base + ext)
-                if os.path.exists(source_image):
-                    dest_image = os.path.join(approved_dir, excel_base + ext)
-                    print(f"[APPROVE] Moving image from: {source_image}")
-                    print(f"[APPROVE] Moving image to: {dest_image}")
-                    shutil.move(source_image, dest_image)
-                    print(f"[APPROVE] Image moved successfully")
-                    break
+            source_image = find_image(full_path)
+            if source_image:
+                dest_image = os.path.join(approved_dir, os.path.basename(source_image))
+                print(f"[APPROVE] Moving image from: {source_image}")
+                print(f"[APPROVE] Moving image to: {dest_image}")
+                shutil.move(source_image, dest_image)
+                moved.append((source_image, dest_image))
+                print(f"[APPROVE] Image moved successfully")
         except Exception as e:
             print(f"[APPROVE] Warning: Could not move image: {e}")
             # Don't fail the approval if image move fails
         
-        # A. Update database with the new approved path
-        self._write_approval_metadata(filename, date_part, company_part, approved_path)
-        
-        # B. Append details to database
-        self._append_detailed_records()
-        self._write_approval_metadata(filename, date_part, company_part, approved_path)
-        
-        # B. Append details to database
-        self._append_detailed_records()
+        try:
+            with self.db.transaction():
+                self._write_approval_records(filename, company_part, approved_path, approval)
+        except Exception as e:
+            # Database changes were rolled back; put the files back as well
+            for source, destination in reversed(moved):
+                try:
+                    shutil.move(destination, source)
+                except Exception as move_error:
+                    print(f"[APPROVE] Warning: Could not move back {destination}: {move_error}")
+            raise Exception(f"Nie udało się zatwierdzić raportu {filename}: {e}")
+        # The approval may have added the company
+        invalidate_company_cache()
 
     # =========================================
     # INTERNAL HELPER METHODS
@@ -239,22 +308,6 @@ class ExcelHandler:
             return trimmed[:-3] + "FVS"
         return trimmed
 
-    def _to_num(self, x):
-        """
-        User-provided helper: robustly converts string/mix to float.
-        Handles commas and empty strings.
-        """
-        if x is None or (isinstance(x, str) and x.strip() == ""):
-            return None
-        # Handle em dash (—) and hyphen (-) as None
-        if isinstance(x, str) and x.strip() in ("—", "-", "–"):
-            return None
-        try:
-            # Replace comma with dot for Polish/European decimals
-            return float(str(x).replace(",", "."))
-        except:  
-            return None
-
     def extract_nip(self, text):
         """
         Extracts NIP from text. Searches for patterns like:
@@ -305,14 +358,19 @@ class ExcelHandler:
         if not nip_map:
             return df
 
-        def resolve_nip(row):
-            existing_raw = row.get('NIP', '')
-            if normalize_nip(existing_raw):
-                return existing_raw
-            key = self._normalize_company_name(row.get('Odbiorca', ''))
-            return nip_map.get(key, existing_raw)
-
-        df['NIP'] = df.apply(resolve_nip, axis=1)
+        # Resolve once per distinct company / NIP value, then map onto all rows
+        db_nip = {
+            name: nip_map.get(self._normalize_company_name(name))
+            for name in df['Odbiorca'].dropna().unique()
+        }
+        has_nip = {
+            value: bool(normalize_nip(value))
+            for value in df['NIP'].dropna().unique()
+        }
+        lookup = df['Odbiorca'].map(db_nip)
+        keep_existing = df['NIP'].map(has_nip).fillna(False).astype(bool) | lookup.isna()
+
+        df['NIP'] = df['NIP'].where(keep_existing, lookup)
         return df
 
     def _apply_validation_coloring(self, ws):
@@ -327,36 +385,19 @@ class ExcelHandler:
         highlighted_count = 0
         print(f"--- Validating rows 4 to {ws.max_row} ---")
 
-        for row_idx in range(4, ws.max_row + 1):
-            # 1. Get Values
-            c = self._to_num(ws.cell(row=row_idx, column=3).value)  # Col C (Dostawa)
-            e = self._to_num(ws.cell(row=row_idx, column=5).value)  # Col E (Zwrot)
-            f = self._to_num(ws.cell(row=row_idx, column=6).value)  # Col F (Stan Prev)
-            g = self._to_num(ws.cell(row=row_idx, column=7).value)  # Col G (Stan Act)
-
-            # 2. Calculate Expected
-            # Treat None as 0.0 for math, but keep None if column is completely empty
-            safe_f = f if f is not None else 0.0
-            expected = None
-
-            if c is None and e is None:
-                expected = f 
-            elif c is not None and e is None:
-                expected = safe_f + c
-            elif c is not None and e is not None:
-                # Logic: Previous + Delivery - Return
-                expected = safe_f + c - e
-            elif c is None and e is not None:
-                expected = safe_f - e
-
-            # 3. Compare (Round to 2 decimals to prevent 10.0 != 10.00001 errors)
-            is_error = False
-            if expected is not None and g is not None:
-                if round(float(g), 2) != round(float(expected), 2):
-                    is_error = True
-                    print(f"Row {row_idx} Error: Exp {expected} != Act {g}")
-
-            # 4. Apply Colors
+        # 1. Read columns C..G of the data rows and check them in one pass
+        rows = list(ws.iter_rows(min_row=4, max_row=ws.max_row, min_col=1, max_col=7, values_only=True))
+        delivery, returned, previous, current = table_columns(rows)
+        expected = expected_stock(delivery, returned, previous)
+        mismatched = set(stock_mismatches(delivery, returned, previous, current).tolist())
+
+        for offset in range(len(rows)):
+            row_idx = offset + 4
+            is_error = offset in mismatched
+            if is_error:
+                print(f"Row {row_idx} Error: Exp {expected[offset]} != Act {current[offset]}")
+
+            # 2. Apply Colors
             cell_g = ws.cell(row=row_idx, column=7)
 
             if is_error:
@@ -464,118 +505,226 @@ class ExcelHandler:
         except Exception as e:
             print(f"Failed to sync reporting data: {e}")
 
-    def _write_approval_metadata(self, filename, date_part, company_part, full_path):
-        """Writes approval record to database using new schema"""
+    @staticmethod
+    def _line_product_name(nazwa, stan_po):
+        """
+        Product name of a report line, or None for a line that is skipped.
+        A line without a name still counts when it has a Stan po wymianie
+        value; approval and the report read it the same way.
+        """
+        name = str(nazwa).strip() if nazwa is not None else ""
+        if name:
+            return name
+        return None if stan_po is None else "Nieokreślony"
+
+    def _collect_approval_data(self, ws, date_part):
+        """
+        Reads what approval stores from a report worksheet: header values and
+        one (product, delivery, return, previous state, state after) tuple per row.
+        """
+        document_number = self._normalize_invoice_number(ws['F1'].value) if ws['F1'].value else None
         try:
-            # Get or create company
-            company_id = self.db.add_company(name=company_part, nip=None)
-            if not company_id:
-                raise Exception(f"Failed to create/get company: {company_part}")
-            
-            # Get document number and date from current workbook
-            ws = self.current_workbook.active
-            document_number = self._normalize_invoice_number(ws['F1'].value) if ws['F1'].value else None
-            date_issued = ws['D1'].value if ws['D1'].value else date_part
-            
-            # Create order
-            order_id = self.db.add_order(
-                company_id=company_id,
-                date_issued=date_issued,
-                document_number=document_number
-            )
-            if not order_id:
-                raise Exception("Failed to create order")
-            
-            # Create approved_record linked to order
-            record_id = self.db.add_approved_record(
-                order_id=order_id,
-                date=date_part,
-                filename=filename,
-                filepath=full_path
-            )
-            if not record_id:
-                print(f"Note: Record already exists for {filename}")
-                return
-            
-            print(f"✓ Created approved record (Order #{order_id}, Record #{record_id})")
-            
-        except Exception as e:
-            raise Exception(f"Failed to write approval metadata: {e}")
-    
-    def _append_detailed_records(self):
-        """Appends ALL rows from current file to database (Used on Approval)"""
-        from datetime import datetime
-        
-        ws_curr = self.current_workbook.active
-        
-        nr_dok = self._normalize_invoice_number(ws_curr['F1'].value)
-        data_wyst = ws_curr['D1'].value
-        odbiorca = ws_curr['B1'].value
-        filename = os.path.basename(self.file_path) if self.file_path else ""
+            date_issued = normalize_date(ws['D1'].value)
+        except ValueError:
+            date_issued = date_part  # empty or unreadable D1: fall back to the file name date
+
+        rows = []
+        for row in ws.iter_rows(min_row=4, max_col=7, values_only=True):
+            row = tuple(row) + (None,) * (7 - len(row))
+            nazwa, dost, zwrot, prev, po = row[1], row[2], row[4], row[5], row[6]
+            product_name = self._line_product_name(nazwa, po)
+            if product_name is None:
+                continue
+
+            rows.append((
+                product_name,
+                float(dost) if dost else 0.0,
+                float(zwrot) if zwrot else 0.0,
+                float(prev) if prev else 0.0,
+                float(po) if po else 0.0
+            ))
+
+        return {
+            'date': date_part,
+            'date_issued': date_issued,
+            'document_number': document_number,
+            'rows': rows
+        }
+
+    def _write_approval_records(self, filename, company_part, full_path, approval):
+        """
+        Writes company, order, approved record and order items for one report.
+        Must run inside self.db.transaction() so it commits (or rolls back) as a whole.
+        """
+        if self.db.get_approved_record(filename):
+            print(f"Note: Record already exists for {filename}")
+            return
+
+        # Get or create company
+        company_id = self.db.add_company(name=company_part, nip=None)
+        if not company_id:
+            raise Exception(f"Failed to create/get company: {company_part}")
         
-        # Normalize date to yyyy-MM-dd
-        if isinstance(data_wyst, str):
-            try:
-                parsed = datetime.strptime(data_wyst.strip(), '%d.%m.%Y')
-                data_wyst = parsed.strftime('%Y-%m-%d')
-            except:
+        # Create order
+        order_id = self.db.add_order(
+            company_id=company_id,
+            date_issued=approval['date_issued'],
+            document_number=approval['document_number']
+        )
+        if not order_id:
+            raise Exception("Failed to create order")
+        
+        # Create approved_record linked to order
+        record_id = self.db.add_approved_record(
+            order_id=order_id,
+            date=approval['date'],
+            filename=filename,
+            filepath=full_path
+        )
+        if not record_id:
+            raise Exception(f"Failed to create approved record for {filename}")
+
+        # All products in one statement, then all items in one executemany
+        product_ids = self.db.add_products([row[0] for row in approval['rows']])
+        order_items = [{
+            'order_id': order_id,
+            'product_id': product_ids[product_name],
+            'quantity_delivery': dost,
+            'quantity_return': zwrot,
+            'previous_state': prev,
+            'state_after': po
+        } for product_name, dost, zwrot, prev, po in approval['rows']]
+
+        count = self.db.add_order_items(order_items) if order_items else 0
+        print(f"✓ Created approved record (Order #{order_id}, Record #{record_id}) with {count} order items")
+
+    REPORT_COLUMNS = ['Odbiorca', 'NIP', 'Data wystawienia', 'Nr dokumentu', 'Nazwa',
+                      'Ilość zamówiona', 'Ilość zwrócona', 'stan poprzedni', 'stan po wymianie']
+
+    def _read_approved_workbook(self, file_path, company_filter=None):
+        """
+        Reads report rows straight from an approved workbook.
+        Used only when the order_items snapshot in the database is missing or stale.
+        """
+        wb = load_workbook(file_path, data_only=True, read_only=True)
+        try:
+            ws = wb.active
+
+            odbiorca = str(ws['B1'].value).strip() if ws['B1'].value else None
+            data_wyst = ws['D1'].value
+            nr_dok = self._normalize_invoice_number(str(ws['F1'].value)) if ws['F1'].value else None
+
+            if isinstance(data_wyst, str):
                 try:
-                    parsed = datetime.strptime(data_wyst.strip(), '%d.%m.%y')
-                    data_wyst = parsed.strftime('%Y-%m-%d')
-                except:
-                    data_wyst = str(data_wyst)
-        elif hasattr(data_wyst, 'strftime'):
-            data_wyst = data_wyst.strftime('%Y-%m-%d')
-        else:
-            data_wyst = str(data_wyst)
+                    data_wyst = datetime.strptime(data_wyst.strip(), '%d.%m.%Y').date()
+                except: pass
+            elif isinstance(data_wyst, datetime):
+                data_wyst = data_wyst.date()
+
+            if company_filter:
+                if not odbiorca or company_filter.lower() not in odbiorca.lower():
+                    return []
+
+            nip = self.extract_nip(odbiorca)
+            rows = []
+            for row in ws.iter_rows(min_row=4, max_col=7, values_only=True):
+                row = tuple(row) + (None,) * (7 - len(row))
+                stan_po = row[6]
+                product_name = self._line_product_name(row[1], stan_po)
+                if product_name is None: continue
+
+                rows.append((
+                    odbiorca, nip, data_wyst, nr_dok, product_name,
+                    row[2], row[4], row[5], stan_po
+                ))
+            return rows
+        finally:
+            wb.close()
 
-        # Get the approved_record for this filename to get order_id
-        approved_rec = self.db.get_approved_record(filename)
-        if not approved_rec:
-            raise Exception(f"Cannot find approved record for {filename}. Please approve the file first.")
-        
-        order_id = approved_rec['order_id']
-        order_items = []
-        
-        for r in range(4, ws_curr.max_row + 1):
-            nazwa = ws_curr.cell(row=r, column=2).value
-            # Skip empty rows
-            if not nazwa and not ws_curr.cell(row=r, column=3).value: 
-                continue
-            
-            dost = ws_curr.cell(row=r, column=3).value
-            zwrot = ws_curr.cell(row=r, column=5).value
-            prev = ws_curr.cell(row=r, column=6).value
-            po = ws_curr.cell(row=r, column=7).value
-            
-            # Get or create product
-            product_name = str(nazwa).strip() if nazwa else ""
-            if not product_name:
+    def _load_report_data(self, db, filters):
+        """
+        Builds the raw report DataFrame (one row per product line of every approved report).
+
+        Rows come from order_items, which were stored on approval. A workbook is only
+        parsed again when its file was modified after the snapshot was taken (e.g. edited
+        in review mode) or when no items were stored for it.
+
+        Date filters are deliberately not pushed into SQL: carry-forward of missing
+        months and 'Stan bieżący' need the full history of each company/product.
+        """
+        from datetime import timezone
+
+        company_filter = filters.get('company') if filters.get('mode') in [2, 3] else None
+
+        snapshots = db.get_report_snapshots()
+        print(f"[REPORT] Found {len(snapshots)} approved records in database")
+        if not snapshots:
+            raise Exception("Nie znaleziono zatwierdzonych raportów.")
+
+        # Decide per approved record: database snapshot or workbook fallback
+        stale_orders = set()
+        stale_files = []
+        for snap in snapshots:
+            filepath = snap.get('filepath')
+            try:
+                mtime = os.path.getmtime(filepath) if filepath else None
+            except OSError:
+                mtime = None
+
+            if not snap.get('item_count') or not snap.get('snapshot_at'):
+                is_stale = mtime is not None
+            elif mtime is None:
+                is_stale = False
+            else:
+                try:
+                    snapshot_ts = datetime.strptime(snap['snapshot_at'], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc).timestamp()
+                    is_stale = int(mtime) > snapshot_ts
+                except (TypeError, ValueError):
+                    is_stale = True
+
+            if is_stale:
+                stale_orders.add(snap['order_id'])
+                stale_files.append(filepath)
+
+        # A. Rows stored in the database (company filter resolved to IDs in SQL)
+        item_filters = {'approved_only': True}
+        if company_filter:
+            needle = company_filter.lower()
+            item_filters['company_ids'] = [
+                c['id'] for c in db.get_all_companies()
+                if c.get('name') and needle in c['name'].lower()
+            ]
+        items = db.get_all_order_items_with_details(item_filters)
+
+        nip_cache = {}
+        rows = []
+        for item in items:
+            if item['order_id'] in stale_orders:
                 continue
-            
-            product_id = self.db.add_product(name=product_name, code=None)
-            if not product_id:
-                print(f"  ⚠ Warning: Failed to create product '{product_name}'")
+            odbiorca = item['company_name']
+            if odbiorca not in nip_cache:
+                nip_cache[odbiorca] = self.extract_nip(odbiorca)
+            rows.append((
+                odbiorca, nip_cache[odbiorca], item['date_issued'], item['document_number'],
+                item['product_name'], item['quantity_delivery'], item['quantity_return'],
+                item['previous_state'], item['state_after']
+            ))
+        print(f"[REPORT] Loaded {len(rows)} rows from database snapshot")
+
+        # B. Workbooks changed after approval (or without stored items)
+        for file_path in stale_files:
+            try:
+                rows.extend(self._read_approved_workbook(file_path, company_filter))
+            except Exception as e:
+                print(f"Błąd przy pliku {file_path}: {e}")
                 continue
-            
-            order_items.append({
-                'order_id': order_id,
-                'product_id': product_id,
-                'quantity_delivery': float(dost) if dost else 0.0,
-                'quantity_return': float(zwrot) if zwrot else 0.0,
-                'previous_state': float(prev) if prev else 0.0,
-                'state_after': float(po) if po else 0.0
-            })
+        if stale_files:
+            print(f"[REPORT] Re-read {len(stale_files)} workbooks newer than their database snapshot")
 
-        if not order_items:
-            return
+        if not rows:
+            raise Exception(f"Brak danych. Przeszukano {len(snapshots)} zatwierdzonych raportów.")
 
-        # Insert into database
-        try:
-            count = self.db.add_order_items(order_items)
-            print(f"✓ Added {count} order items to database")
-        except Exception as e:
-            raise Exception(f"Failed to append detailed records: {e}")
+        return pd.DataFrame.from_records(rows, columns=self.REPORT_COLUMNS)
 
     def generate_report(self, filters, output_path=None):
         """
@@ -585,8 +734,8 @@ class ExcelHandler:
         1. Get data from approved files (from database).
         2. Sort: Company -> Product -> Date.
         3. Calculate logic (Next Date, Days, Butlo-dni).
-        4. Generate Excel with 3 sheets.
-        5. Create Pivot Table using Win32 COM (Isolated Instance).
+        4. Generate Excel with the source sheets.
+        5. Add pre-aggregated pivot sheets (openpyxl, no Excel needed).
         
         Args:
             filters: Dictionary with filter criteria
@@ -600,80 +749,10 @@ class ExcelHandler:
         from openpyxl.utils import get_column_letter
         import os
         
-        # Get approved files from database instead of file system
+        # Load report rows from the database (workbooks only for stale snapshots)
         db = DatabaseHandler(DATABASE_FILE)
-        approved_records = db.get_all_approved_records()
-        print(f"[REPORT] Found {len(approved_records) if approved_records else 0} approved records in database")
         print(f"[REPORT] Filters: {filters}")
-        
-        if not approved_records:
-            raise Exception("Nie znaleziono zatwierdzonych raportów.")
-        
-        # Build list of file paths from database records
-        approved_files = []
-        for record in approved_records:
-            filepath = record.get('filepath')
-            if filepath and os.path.exists(filepath):
-                approved_files.append(filepath)
-        
-        print(f"[REPORT] Found {len(approved_files)} existing approved files")
-        if not approved_files:
-            raise Exception("Nie znaleziono zatwierdzonych raportów (pliki nie istnieją).")
-        
-        all_data = []
-        
-        # --- 1. DATA LOADING (Unchanged) ---
-        for file_path in approved_files:
-            try:
-                wb = load_workbook(file_path, data_only=True)
-                ws = wb.active
-                
-                odbiorca = str(ws['B1'].value).strip() if ws['B1'].value else None
-                data_wyst = ws['D1'].value
-                nr_dok = self._normalize_invoice_number(str(ws['F1'].value)) if ws['F1'].value else None
-                
-                if isinstance(data_wyst, str):
-                    try:
-                        data_wyst = datetime.strptime(data_wyst.strip(), '%d.%m.%Y').date()
-                    except: pass
-                elif isinstance(data_wyst, datetime):
-                    data_wyst = data_wyst.date()
-
-                if filters['mode'] in [2, 3] and filters['company']:
-                    if not odbiorca or filters['company'].lower() not in odbiorca.lower():
-                        continue
-
-                rows = []
-                for r in range(4, ws.max_row + 1):
-                    nazwa = ws.cell(row=r, column=2).value
-                    stan_po = ws.cell(row=r, column=7).value
-                    
-                    if not nazwa and stan_po is None: continue
-                        
-                    row_dict = {
-                        'Odbiorca': odbiorca,
-                        'NIP': self.extract_nip(odbiorca),
-                        'Data wystawienia': data_wyst,
-                        'Nr dokumentu': nr_dok,
-                        'Nazwa': str(nazwa).strip() if nazwa else "Nieokreślony",
-                        'Ilość zamówiona': ws.cell(row=r, column=3).value,
-                        'Ilość zwrócona': ws.cell(row=r, column=5).value,
-                        'stan poprzedni': ws.cell(row=r, column=6).value,
-                        'stan po wymianie': stan_po
-                    }
-                    rows.append(row_dict)
-                
-                if rows:
-                    all_data.append(pd.DataFrame(rows))
-                    
-            except Exception as e:
-                print(f"Błąd przy pliku {file_path}: {e}")
-                continue
-
-        if not all_data:
-            raise Exception(f"Brak danych. Przeszukano {len(approved_files)} plików.")
-
-        df = pd.concat(all_data, ignore_index=True)
+        df = self._load_report_data(db, filters)
         print(f"[REPORT] Raw df shape: {df.shape}")
         print(f"[REPORT] Sample data_wystawienia values: {df['Data wystawienia'].head(10).tolist()}")
 
@@ -819,17 +898,8 @@ class ExcelHandler:
 
         # --- 3. BUTLO-DNI LOGIC (Unchanged) ---
         df.sort_values(by=['Odbiorca', 'Nazwa', 'Data wystawienia'], ascending=[True, True, True], inplace=True)
-        df['Data następna'] = df.groupby(['Odbiorca', 'Nazwa'])['Data wystawienia'].shift(-1)
         today = pd.Timestamp(datetime.now().date())
-        df['Data następna'] = df['Data następna'].fillna(today)
-        df['Liczba dni'] = (df['Data następna'] - df['Data wystawienia']).dt.days
-        df['Liczba dni'] = df['Liczba dni'].apply(lambda x: x if x >= 0 else 0)
-        df['Miesiąc'] = df['Data wystawienia'].dt.strftime('%Y-%m')
-        df['Is_first_of_month'] = df.groupby(['Odbiorca', 'Nazwa', 'Miesiąc']).cumcount() == 0
-        df['Butlo-dni'] = df.apply(
-            lambda row: row['stan poprzedni'] * row['Liczba dni'] if row['Is_first_of_month'] else row['stan po wymianie'] * row['Liczba dni'],
-            axis=1
-        )
+        df = annotate_transactions(df, today)
 
         # --- 4. EXCEL EXPORT (Unchanged) ---
         df = self._fill_missing_nip_from_db(df)
@@ -851,45 +921,7 @@ class ExcelHandler:
             if 'Data wystawienia' in frame.columns:
                 frame['Data wystawienia'] = pd.to_datetime(frame['Data wystawienia'], errors='coerce').dt.date
 
-        calc_rows = []
-        for (odbiorca, nazwa, miesiac), group in df.groupby(['Odbiorca', 'Nazwa', 'Miesiąc']):
-            year, month = map(int, miesiac.split('-'))
-            first_day = pd.Timestamp(year=year, month=month, day=1)
-            last_day = pd.Timestamp(year=year, month=month, day=monthrange(year, month)[1])
-            
-            group = group.sort_values('Data wystawienia').reset_index(drop=True)
-            current_start = first_day
-            
-            for idx, row in group.iterrows():
-                report_date = row['Data wystawienia']
-                if idx == 0:
-                    days = (report_date - current_start).days
-                    stan = row['stan poprzedni']
-                    nr_doc = row['Nr dokumentu']
-                else:
-                    days = (report_date - current_start).days
-                    stan = group.loc[idx - 1, 'stan po wymianie']
-                    nr_doc = group.loc[idx - 1, 'Nr dokumentu']
-
-                if days > 0:
-                    calc_rows.append({
-                        'Odbiorca': odbiorca, 'Nazwa': nazwa, 'Nr dokumentu': nr_doc,
-                        'Data początkowa': current_start, 'Data końcowa': report_date - pd.Timedelta(days=1),
-                        'liczba dni': days, 'Stan': stan,
-                        'Butlo-dni': stan * days, 'Miesiąc': miesiac
-                    })
-                current_start = report_date
-            
-            last_row = group.iloc[-1]
-            days_end = (last_day - current_start).days + 1
-            stan_end = last_row['stan po wymianie']
-            calc_rows.append({
-                'Odbiorca': odbiorca, 'Nazwa': nazwa, 'Nr dokumentu': last_row['Nr dokumentu'],
-                'Data początkowa': current_start, 'Data końcowa': last_day, 'liczba dni': days_end, 'Stan': stan_end,
-                'Butlo-dni': stan_end * days_end if days_end > 0 else 0, 'Miesiąc': miesiac
-            })
-        
-        df_calc = pd.DataFrame(calc_rows)
+        df_calc = build_intervals(df)
 
         # Remove time from calculation dates for Excel output
         for col in ['Data początkowa', 'Data końcowa']:
@@ -931,713 +963,23 @@ class ExcelHandler:
             summary_butlodni.to_excel(writer, sheet_name='Podsumowanie butlodni', index=False)
             
             # Create Rotacja summary - monthly totals with last-day Stan
-            rotacja_rows = []
-            for (odbiorca, nazwa, miesiac), group in df_calc.groupby(['Odbiorca', 'Nazwa', 'Miesiąc']):
-                # Get the last row (end of month) for Stan
-                last_row = group.sort_values('Data końcowa').iloc[-1]
-                
-                # Sum Butlo-dni for the month
-                total_butlodni = group['Butlo-dni'].sum()
-                
-                # Get rotacja for this company/product/month
-                rotacja_val = sum_rot[
-                    (sum_rot['Odbiorca'] == odbiorca) & 
-                    (sum_rot['Nazwa'] == nazwa) & 
-                    (sum_rot['Miesiąc'] == miesiac)
-                ]['Ilość zwrócona'].sum() if not sum_rot.empty else 0
-                
-                rotacja_rows.append({
-                    'Odbiorca': odbiorca,
-                    'Nazwa': nazwa,
-                    'Miesiąc': miesiac,
-                    'Stan': last_row['Stan'],
-                    'Butlo-dni': total_butlodni,
-                    'rotacja': rotacja_val
-                })
-            
-            rotacja_summary = pd.DataFrame(rotacja_rows)
-            rotacja_summary = rotacja_summary.merge(nip_map, on='Odbiorca', how='left')
-            rotacja_summary = rotacja_summary[['Odbiorca', 'NIP', 'Nazwa', 'Miesiąc', 'Stan', 'Butlo-dni', 'rotacja']]
+            rotacja_summary = summarize_rotacja(df_calc, sum_rot, nip_map)
             rotacja_summary.to_excel(writer, sheet_name='Rotacja Source', index=False)
             
             # Create Daily breakdown - one row per day for each Odbiorca-Nazwa pair
-            daily_rows = []
-            for (odbiorca, nazwa, miesiac), group in df_calc.groupby(['Odbiorca', 'Nazwa', 'Miesiąc']):
-                # Parse the month to get the date range
-                year, month = map(int, miesiac.split('-'))
-                first_day = pd.Timestamp(year=year, month=month, day=1)
-                last_day = (first_day + pd.DateOffset(months=1)) - pd.DateOffset(days=1)
-                
-                # Get NIP for this company
-                nip_val = nip_map[nip_map['Odbiorca'] == odbiorca]['NIP'].iloc[0] if len(nip_map[nip_map['Odbiorca'] == odbiorca]) > 0 else None
-                
-                # Get Stan bieżący from the mapped values (latest state for this company-product pair)
-                matching = stan_biezacy_map[(stan_biezacy_map['Odbiorca'] == odbiorca) & (stan_biezacy_map['Nazwa'] == nazwa)]
-                stan_biezacy = matching['Stan bieżący'].iloc[0] if len(matching) > 0 else None
-                
-                # Get actual rotacja transactions for this company/product/month from df_raw
-                rotacja_transactions = df_raw[
-                    (df_raw['Odbiorca'] == odbiorca) & 
-                    (df_raw['Nazwa'] == nazwa) & 
-                    (df_raw['Miesiąc'] == miesiac)
-                ].copy()
-                
-                # Convert Data wystawienia to datetime if it's not already
-                if not rotacja_transactions.empty:
-                    rotacja_transactions['Data wystawienia'] = pd.to_datetime(rotacja_transactions['Data wystawienia'])
-                
-                # Group rotacja by date (sum all returns that happened on same date)
-                # Convert to date only (without time) for matching with current_date
-                if not rotacja_transactions.empty:
-                    rotacja_by_date = rotacja_transactions.groupby(rotacja_transactions['Data wystawienia'].dt.date)['Ilość zwrócona'].sum().to_dict()
-                    total_rotacja = sum(rotacja_by_date.values())
-                    print(f"✓ {odbiorca} - {nazwa} - {miesiac}: Found {len(rotacja_by_date)} return dates, total rotacja = {total_rotacja}")
-                else:
-                    rotacja_by_date = {}
-                    print(f"✗ {odbiorca} - {nazwa} - {miesiac}: No return data (df_raw has {len(df_raw)} rows total)")
-                
-                # Pre-compute Stan values for each day (much faster than nested loop)
-                stan_by_date = {}
-                for _, row in group.iterrows():
-                    date_range_start = pd.Timestamp(row['Data początkowa'])
-                    date_range_end = pd.Timestamp(row['Data końcowa'])
-                    stan_val = row['Stan']
-                    
-                    # Fill in stan for each day in the range
-                    current = date_range_start
-                    while current <= date_range_end:
-                        stan_by_date[current.date()] = stan_val
-                        current += pd.DateOffset(days=1)
-                
-                # Create a row for each day in the month
-                current_date = first_day
-                while current_date <= last_day:
-                    date_key = current_date if not hasattr(current_date, 'date') else current_date.date()
-                    # Look up stan from pre-computed dictionary
-                    stan_on_date = stan_by_date.get(date_key)
-                    butlodni_on_date = stan_on_date if stan_on_date is not None else 0
-                    
-                    # Get rotacja only if there was a return on this specific date
-                    rotacja_on_date = rotacja_by_date.get(date_key, 0)
-                    
-                    daily_rows.append({
-                        'Odbiorca': odbiorca,
-                        'NIP': nip_val,
-                        'Nazwa': nazwa,
-                        'Data': date_key,
-                        'Stan': stan_on_date,
-                        'Butlo-dni': butlodni_on_date,
-                        'rotacja': rotacja_on_date,
-                        'rotacja miesięczna': total_rotacja,
-                        'Stan bieżący': stan_biezacy
-                    })
-                    
-                    current_date += pd.DateOffset(days=1)
-            
-            daily_df = pd.DataFrame(daily_rows)
-            daily_df = daily_df[['Odbiorca', 'NIP', 'Nazwa', 'Data', 'Stan', 'Butlo-dni', 'rotacja', 'rotacja miesięczna', 'Stan bieżący']]
-            daily_df.to_excel(writer, sheet_name='Daily Data', index=False)
-
-        # ---------------------------------------------------------
-        # PIVOT GENERATION (THREAD-SAFE & ROBUST)
-        # ---------------------------------------------------------
-        excel = None
-        wb_com = None
-        
-        import pythoncom 
-        import win32com.client as win32
-        import time
-        import gc
-
-        try:
-            # 1. Initialize COM for the current thread
-            pythoncom.CoInitialize()
-
-            # 2. Give the OS a moment to release the file handle from Pandas
-            time.sleep(1.5)
-            
-            abs_path = os.path.abspath(output_path)
-            
-            # Constants
-            xlDatabase, xlRowField, xlColumnField, xlPageField = 1, 1, 2, 3
-            xlSum, xlUp, xlToLeft = -4157, -4162, -4159
-
-            # 3. Create Excel Instance with Error Handling
-            try:
-                # DispatchEx forces a NEW process, preventing "Zombie" interference
-                excel = win32.DispatchEx("Excel.Application")
-            except Exception as com_err:
-                print(f"Failed to start Excel via DispatchEx: {com_err}")
-                # Fallback
-                excel = win32.GetActiveObject("Excel.Application")
-            
-            excel.Visible = False
-            excel.DisplayAlerts = False 
-
-            # 4. Open Workbook with a retry loop
-            for attempt in range(3):
-                try:
-                    wb_com = excel.Workbooks.Open(abs_path)
-                    break
-                except Exception as e:
-                    if attempt == 2: raise e
-                    time.sleep(1)
-
-            ws_src = wb_com.Sheets('Podsumowanie')
-            
-            # 5. Define Range for first source
-            lastRow = ws_src.Cells(ws_src.Rows.Count, 1).End(xlUp).Row
-            lastCol = ws_src.Cells(1, ws_src.Columns.Count).End(xlToLeft).Column
-            src_range = ws_src.Range(ws_src.Cells(1, 1), ws_src.Cells(lastRow, lastCol))
-
-            # Define Range for second source
-            ws_src2 = wb_com.Sheets('Podsumowanie butlodni')
-            lastRow2 = ws_src2.Cells(ws_src2.Rows.Count, 1).End(xlUp).Row
-            lastCol2 = ws_src2.Cells(1, ws_src2.Columns.Count).End(xlToLeft).Column
-            src_range2 = ws_src2.Range(ws_src2.Cells(1, 1), ws_src2.Cells(lastRow2, lastCol2))
-            
-            # 6. Create rotacja_1 pivot from Podsumowanie butlodni
-            # Delete if exists
-            try:
-                wb_com.Sheets("rotacja_1").Delete()
-            except:
-                pass
-            
-            ws_pivot1 = wb_com.Sheets.Add()
-            ws_pivot1.Name = "rotacja_1"
-            
-            pc1 = wb_com.PivotCaches().Create(SourceType=xlDatabase, SourceData=src_range2)
-            pt1 = pc1.CreatePivotTable(TableDestination=ws_pivot1.Range("A3"), TableName="Rotacja1Pivot")
-            
-            pt1.PivotFields('Miesiąc').Orientation = xlPageField
-            pt1.PivotFields('NIP').Orientation = xlPageField
-            pt1.PivotFields('Odbiorca').Orientation = xlPageField
-            
-            row_fields_3 = ['Nazwa', 'Stan bieżący', 'Stan']
-            for i, f in enumerate(row_fields_3, start=1):
-                pf = pt1.PivotFields(f)
-                pf.Orientation = xlRowField
-                pf.Position = i
-                pf.Subtotals = [False] * 12
-            
-            f1 = pt1.AddDataField(pt1.PivotFields('Butlo-dni'), "Suma Butlo-dni", xlSum)
-            f1.NumberFormat = "0.00"
-            f2 = pt1.AddDataField(pt1.PivotFields('rotacja'), "Sum of rotacja", xlSum)
-            f2.NumberFormat = "0"
-            
-            try:
-                pt1.DataPivotField.Orientation = xlColumnField
-            except:
-                pass
-            
-            pt1.RowAxisLayout(1)
-            ws_pivot1.Activate()
-            wb_com.Save()
-            print("✓ rotacja_1 pivot table created successfully.")
-            
-            # 7. Create Raport butlodni pivot from Podsumowanie butlodni
-            try:
-                wb_com.Sheets("Raport butlodni").Delete()
-            except:
-                pass
-            
-            ws_pivot2 = wb_com.Sheets.Add()
-            ws_pivot2.Name = 'Raport butlodni'
-            
-            pc2 = wb_com.PivotCaches().Create(SourceType=xlDatabase, SourceData=src_range2)
-            pt2 = pc2.CreatePivotTable(TableDestination=ws_pivot2.Range("A3"), TableName="RaportButlodni")
-            
-            pt2.ManualUpdate = True
-            pt2.PivotFields('Odbiorca').Orientation = xlPageField
-            pt2.PivotFields('NIP').Orientation = xlPageField
-            pt2.PivotFields('Miesiąc').Orientation = xlPageField
-            
-            row_fields = ['Nazwa', 'Data początkowa', 'Data końcowa', 'Stan']
-            for i, f in enumerate(row_fields, start=1):
-                pf = pt2.PivotFields(f)
-                pf.Orientation = xlRowField
-                pf.Position = i
-                pf.Subtotals = [False] * 12
-                pf.LayoutForm = 1
-                try:
-                    pf.Width = 50
-                except:
-                    pass
-            
-            pt2.RowAxisLayout(1)
-            pt2.RepeatAllLabels(2)
-            pt2.ManualUpdate = False
-            
-            f3 = pt2.AddDataField(pt2.PivotFields('Butlo-dni'), "Suma Butlo-dni", xlSum)
-            f3.NumberFormat = "0.00"
-            f4 = pt2.AddDataField(pt2.PivotFields('rotacja'), "Suma rotacja", xlSum)
-            f4.NumberFormat = "0"
-            
-            try:
-                pt2.DataPivotField.Orientation = xlColumnField
-            except:
-                pass
-            
-            pt2.RowAxisLayout(1)
-            pt2.RefreshTable()
-            
-            # Set column widths to auto-fit instead of fixed 80
-            for col_idx in range(1, 20):
-                try:
-                    ws_pivot2.Columns(col_idx).ColumnWidth = 18
-                except:
-                    pass
-            
-            ws_pivot2.Activate()
-            wb_com.Save()
-            print("✓ Raport butlodni pivot table created successfully.")
-            
-            # 8. Create Rotacja pivot from Rotacja Source
-            try:
-                wb_com.Sheets("Rotacja").Delete()
-            except:
-                pass
-            
-            ws_src3 = wb_com.Sheets('Rotacja Source')
-            lastRow3 = ws_src3.Cells(ws_src3.Rows.Count, 1).End(xlUp).Row
-            lastCol3 = ws_src3.Cells(1, ws_src3.Columns.Count).End(xlToLeft).Column
-            src_range3 = ws_src3.Range(ws_src3.Cells(1, 1), ws_src3.Cells(lastRow3, lastCol3))
-            
-            ws_pivot3 = wb_com.Sheets.Add()
-            ws_pivot3.Name = 'Rotacja'
-            
-            pc3 = wb_com.PivotCaches().Create(SourceType=xlDatabase, SourceData=src_range3)
-            pt3 = pc3.CreatePivotTable(TableDestination=ws_pivot3.Range("A3"), TableName="RotacjaPivot")
-            
-            pt3.PivotFields('Miesiąc').Orientation = xlPageField
-            pt3.PivotFields('NIP').Orientation = xlPageField
-            pt3.PivotFields('Odbiorca').Orientation = xlPageField
-            
-            # Row fields: just Nazwa and Stan
-            pt3.PivotFields('Nazwa').Orientation = xlRowField
-            pt3.PivotFields('Nazwa').Position = 1
-            pt3.PivotFields('Nazwa').Subtotals = [False] * 12
-            
-            pt3.PivotFields('Stan').Orientation = xlRowField
-            pt3.PivotFields('Stan').Position = 2
-            pt3.PivotFields('Stan').Subtotals = [False] * 12
-            
-            # Add data fields
-            f6 = pt3.AddDataField(pt3.PivotFields('Butlo-dni'), "Suma Butlo-dni", xlSum)
-            f6.NumberFormat = "0.00"
-            f7 = pt3.AddDataField(pt3.PivotFields('rotacja'), "Sum of rotacja", xlSum)
-            f7.NumberFormat = "0"
-            
-            pt3.DataPivotField.Orientation = xlColumnField
-            pt3.RowAxisLayout(1)
-            ws_pivot3.Activate()
-            wb_com.Save()
-            print("✓ Rotacja pivot table created successfully.")
-            
-            # 8.5. Create Rotacja_2 pivot from Daily Data
-            try:
-                wb_com.Sheets("Rotacja_2").Delete()
-            except:
-                pass
-            
-            ws_src_daily = wb_com.Sheets('Daily Data')
-            lastRow_daily = ws_src_daily.Cells(ws_src_daily.Rows.Count, 1).End(xlUp).Row
-            lastCol_daily = ws_src_daily.Cells(1, ws_src_daily.Columns.Count).End(xlToLeft).Column
-            src_range_daily = ws_src_daily.Range(ws_src_daily.Cells(1, 1), ws_src_daily.Cells(lastRow_daily, lastCol_daily))
-            
-            ws_pivot_daily = wb_com.Sheets.Add()
-            ws_pivot_daily.Name = 'Rotacja_2'
-            
-            pc_daily = wb_com.PivotCaches().Create(SourceType=xlDatabase, SourceData=src_range_daily)
-            pt_daily = pc_daily.CreatePivotTable(TableDestination=ws_pivot_daily.Range("A3"), TableName="Rotacja2Pivot")
-            
-            # Page fields (filters)
-            pt_daily.PivotFields('Odbiorca').Orientation = xlPageField
-            pt_daily.PivotFields('NIP').Orientation = xlPageField
-            pt_daily.PivotFields('Data').Orientation = xlPageField
-            
-            # Row fields: Nazwa, Stan, Stan bieżący
-            pt_daily.PivotFields('Nazwa').Orientation = xlRowField
-            pt_daily.PivotFields('Nazwa').Position = 1
-            pt_daily.PivotFields('Nazwa').Subtotals = [False] * 12
-            
-            pt_daily.PivotFields('Stan').Orientation = xlRowField
-            pt_daily.PivotFields('Stan').Position = 2
-            pt_daily.PivotFields('Stan').Subtotals = [False] * 12
-            
-            pt_daily.PivotFields('Stan bieżący').Orientation = xlRowField
-            pt_daily.PivotFields('Stan bieżący').Position = 3
-            pt_daily.PivotFields('Stan bieżący').Subtotals = [False] * 12
-            
-            # Add data fields
-            f_rot = pt_daily.AddDataField(pt_daily.PivotFields('rotacja'), "Sum of rotacja", xlSum)
-            f_rot.NumberFormat = "0"
-            
-            try:
-                pt_daily.DataPivotField.Orientation = xlColumnField
-            except Exception as e:
-                print(f"Warning: Could not set DataPivotField orientation: {e}")
-            
-            pt_daily.RowAxisLayout(1)
-            pt_daily.RefreshTable()  # Refresh to ensure all fields display
-            ws_pivot_daily.Activate()
-            wb_com.Save()
-            print("✓ Rotacja_2 pivot table created successfully.")
-            
-            # 9. Hide source sheets
-            wb_com.Sheets('Podsumowanie').Visible = False
-            wb_com.Sheets('Podsumowanie butlodni').Visible = False
-            wb_com.Sheets('Rotacja Source').Visible = False
-            wb_com.Sheets('Daily Data').Visible = False
-            wb_com.Save()
-            print("✓ Source sheets hidden.")
-
-        except Exception as e:
-            print(f"Critical Pivot Error: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        finally:
-            # 8. Aggressive Cleanup to prevent memory leaks/zombies
-            if wb_com:
-                try: wb_com.Close(SaveChanges=True)
-                except: pass
-                del wb_com
-            
-            if excel:
-                try: excel.Quit()
-                except: pass
-                del excel
-            
-            # Force Windows to clear COM hooks
-            gc.collect()
-            pythoncom.CoUninitialize()
-
-        return output_path
-
-    def update_approved_date(self, filename, new_date):
-        """
-        Update the date for a specific filename in database.
-        Used when the date in the Excel file is edited after approval.
-        """
-        try:
-            success = self.db.update_approved_date(filename, new_date)
-            if success:
-                print(f"✓ Updated date in database for '{filename}' to '{new_date}'")
-            else:
-                print(f"Warning: Record not found for '{filename}'")
-        except Exception as e:
-            print(f"Warning: Could not update date in database: {e}")
-
-        import pandas as pd
-        from calendar import monthrange
-        from core.file_manager import FileManager
-        from openpyxl.utils import get_column_letter
-        
-        file_manager = FileManager()
-        approved_files = file_manager.get_approved_reports()
-        
-        if not approved_files:
-            raise Exception("Nie znaleziono zatwierdzonych raportów.")
-        
-        all_data = []
-        
-        # --- 1. DATA LOADING (Unchanged) ---
-        for file_path in approved_files:
-            try:
-                wb = load_workbook(file_path, data_only=True)
-                ws = wb.active
-                
-                odbiorca = str(ws['B1'].value).strip() if ws['B1'].value else None
-                data_wyst = ws['D1'].value
-                nr_dok = self._normalize_invoice_number(str(ws['F1'].value)) if ws['F1'].value else None
-                
-                if isinstance(data_wyst, str):
-                    try:
-                        data_wyst = datetime.strptime(data_wyst.strip(), '%d.%m.%Y').date()
-                    except:
-                        try:
-                            data_wyst = datetime.strptime(data_wyst.strip(), '%d.%m.%y').date()
-                        except: pass
-                elif isinstance(data_wyst, datetime):
-                    data_wyst = data_wyst.date()
-
-                if filters['mode'] in [2, 3] and filters['company']:
-                    if not odbiorca or filters['company'].lower() not in odbiorca.lower():
-                        continue
-
-                rows = []
-                for r in range(4, ws.max_row + 1):
-                    nazwa = ws.cell(row=r, column=2).value
-                    stan_po = ws.cell(row=r, column=7).value
-                    
-                    if not nazwa and stan_po is None: continue
-                        
-                    row_dict = {
-                        'Odbiorca': odbiorca,
-                        'NIP': self.extract_nip(odbiorca),
-                        'Data wystawienia': data_wyst,
-                        'Nr dokumentu': nr_dok,
-                        'Nazwa': str(nazwa).strip() if nazwa else "Nieokreślony",
-                        'Ilość zamówiona': ws.cell(row=r, column=3).value,
-                        'Ilość zwrócona': ws.cell(row=r, column=5).value,
-                        'stan poprzedni': ws.cell(row=r, column=6).value,
-                        'stan po wymianie': stan_po
-                    }
-                    rows.append(row_dict)
-                
-                if rows:
-                    all_data.append(pd.DataFrame(rows))
-                    
-            except Exception as e:
-                print(f"Błąd przy pliku {file_path}: {e}")
-                continue
-
-        if not all_data:
-            raise Exception(f"Brak danych. Przeszukano {len(approved_files)} plików.")
-
-        df = pd.concat(all_data, ignore_index=True)
-
-        # --- 2. CLEANING & FORMATTING (Unchanged) ---
-        df['Data wystawienia'] = pd.to_datetime(df['Data wystawienia'], errors='coerce')
-        numeric_cols = ['stan po wymianie', 'stan poprzedni', 'Ilość zamówiona', 'Ilość zwrócona']
-        for col in numeric_cols:
-            df[col] = pd.to_numeric(df[col].astype(str).str.replace(',', '.'), errors='coerce').fillna(0)
-
-        if filters['mode'] == 1 and filters.get('month'):
-            df['Miesiąc_temp'] = df['Data wystawienia'].dt.strftime('%Y-%m')
-            df = df[df['Miesiąc_temp'] == filters['month']].drop(columns=['Miesiąc_temp'])
-        elif filters['mode'] in [1, 2] and filters.get('from_date') and filters.get('to_date'):
-            f_start = pd.Timestamp(filters['from_date'])
-            f_end = pd.Timestamp(filters['to_date'])
-            df = df[(df['Data wystawienia'] >= f_start) & (df['Data wystawienia'] <= f_end)]
-
-        if df.empty:
-            raise Exception("Brak danych po przefiltrowaniu dat.")
-
-        # --- 3. BUTLO-DNI LOGIC (Unchanged) ---
-        df.sort_values(by=['Odbiorca', 'Nazwa', 'Data wystawienia'], ascending=[True, True, True], inplace=True)
-        df['Data następna'] = df.groupby(['Odbiorca', 'Nazwa'])['Data wystawienia'].shift(-1)
-        today = pd.Timestamp(datetime.now().date())
-        df['Data następna'] = df['Data następna'].fillna(today)
-        df['Liczba dni'] = (df['Data następna'] - df['Data wystawienia']).dt.days
-        df['Liczba dni'] = df['Liczba dni'].apply(lambda x: x if x >= 0 else 0)
-        df['Miesiąc'] = df['Data wystawienia'].dt.strftime('%Y-%m')
-        df['Is_first_of_month'] = df.groupby(['Odbiorca', 'Nazwa', 'Miesiąc']).cumcount() == 0
-        df['Butlo-dni'] = df.apply(
-            lambda row: row['stan poprzedni'] * row['Liczba dni'] if row['Is_first_of_month'] else row['stan po wymianie'] * row['Liczba dni'],
-            axis=1
-        )
-
-        # --- 4. EXCEL EXPORT (Unchanged) ---
-        df = self._fill_missing_nip_from_db(df)
-        raw_cols = ['Odbiorca', 'NIP', 'Nazwa', 'Nr dokumentu', 'Data wystawienia', 'Ilość zamówiona', 'Ilość zwrócona', 'stan poprzedni', 'stan po wymianie', 'Miesiąc']
-        df_raw = df[raw_cols].copy()
-
-        calc_rows = []
-        for (odbiorca, nazwa, miesiac), group in df.groupby(['Odbiorca', 'Nazwa', 'Miesiąc']):
-            year, month = map(int, miesiac.split('-'))
-            first_day = pd.Timestamp(year=year, month=month, day=1)
-            last_day = pd.Timestamp(year=year, month=month, day=monthrange(year, month)[1])
-            
-            group = group.sort_values('Data wystawienia').reset_index(drop=True)
-            current_start = first_day
-            
-            for idx, row in group.iterrows():
-                report_date = row['Data wystawienia']
-                if idx == 0:
-                    days = (report_date - current_start).days + 1
-                    stan = row['stan poprzedni']
-                else:
-                    days = (report_date - current_start).days
-                    stan = group.loc[idx - 1, 'stan po wymianie']
-                
-                calc_rows.append({
-                    'Odbiorca': odbiorca, 'Nazwa': nazwa, 'Nr dokumentu': row['Nr dokumentu'] if idx == 0 else group.loc[idx - 1, 'Nr dokumentu'],
-                    'Data początkowa': current_start, 'Data końcowa': report_date, 'liczba dni': days, 'Stan': stan,
-                    'Butlo-dni': stan * days if days > 0 else 0, 'Miesiąc': miesiac
-                })
-                current_start = report_date
-            
-            last_row = group.iloc[-1]
-            days_end = (last_day - current_start).days
-            stan_end = last_row['stan po wymianie']
-            calc_rows.append({
-                'Odbiorca': odbiorca, 'Nazwa': nazwa, 'Nr dokumentu': last_row['Nr dokumentu'],
-                'Data początkowa': current_start, 'Data końcowa': last_day, 'liczba dni': days_end, 'Stan': stan_end,
-                'Butlo-dni': stan_end * days_end if days_end > 0 else 0, 'Miesiąc': miesiac
+            daily_df = expand_daily(df_calc, df_raw, nip_map, stan_biezacy_map)
+            print(f"[REPORT] Daily Data: {len(daily_df)} rows")
+            # Dates stay datetime64 until the write; Excel gets plain dates
+            daily_out = daily_df.assign(Data=daily_df['Data'].dt.date)
+            daily_out.to_excel(writer, sheet_name='Daily Data', index=False)
+
+            # Pivot sheets (pre-aggregated, no Excel/COM needed); source sheets get hidden
+            write_pivot_sheets(writer.book, {
+                'Podsumowanie': summary,
+                'Podsumowanie butlodni': summary_butlodni,
+                'Rotacja Source': rotacja_summary,
+                'Daily Data': daily_out,
             })
-        
-        df_calc = pd.DataFrame(calc_rows)
-        
-        # Use provided output_path or generate default
-        if not output_path:
-            output_filename = f"Raport_ButloDni_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-            output_path = os.path.join(os.path.dirname(APPROVED_FILE), output_filename)
-
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            df_raw.to_excel(writer, sheet_name='Dane Szczegółowe', index=False)
-            df_current_raw.to_excel(writer, sheet_name='bierzący miesiąc', index=False)
-            df_calc.to_excel(writer, sheet_name='Obliczenia', index=False)
-            
-            # Summary Logic
-            df_calc_pos = df_calc.copy()
-            df_calc_pos['Butlo-dni'] = df_calc_pos['Butlo-dni'].apply(lambda x: max(0, x))
-            sum_butlo = df_calc_pos.groupby(['Odbiorca', 'Nazwa', 'Miesiąc'], as_index=False)[['Butlo-dni']].sum()
-            sum_rot = df_raw.groupby(['Odbiorca', 'Nazwa', 'Miesiąc'], as_index=False)[['Ilość zwrócona']].sum()
-            summary = sum_butlo.merge(sum_rot, on=['Odbiorca', 'Nazwa', 'Miesiąc'], how='outer')
-            nip_map = df[['Odbiorca', 'NIP']].drop_duplicates()
-            summary = summary.merge(nip_map, on='Odbiorca', how='left')
-            summary = summary[['Odbiorca', 'NIP', 'Nazwa', 'Miesiąc', 'Butlo-dni', 'Ilość zwrócona']]
-            summary = summary.rename(columns={'Ilość zwrócona': 'rotacja'})
-            summary.to_excel(writer, sheet_name='Podsumowanie', index=False)
-            
-            # Date formatting and auto-width
-            for sn in ['Dane Szczegółowe', 'Obliczenia', 'bierzący miesiąc']:
-                ws = writer.sheets[sn]
-                for r in ws.iter_rows(min_row=2, max_row=ws.max_row):
-                     # Simple logic to format date columns (col 4 in Raw, col 4,5 in Calc)
-                    if sn in ['Dane Szczegółowe', 'bierzący miesiąc']:
-                        r[3].number_format = 'dd.mm.yyyy'
-                    else: 
-                        r[3].number_format = 'dd.mm.yyyy'
-                        r[4].number_format = 'dd.mm.yyyy'
-            
-            for sn in writer.sheets:
-                ws = writer.sheets[sn]
-                for col in ws.columns:
-                    width = 10
-                    for cell in col:
-                        try: width = max(width, len(str(cell.value)))
-                        except: pass
-                    ws.column_dimensions[get_column_letter(col[0].column)].width = width + 2
-
-        # ---------------------------------------------------------
-        # ROBUST PIVOT GENERATION (FIXED SECOND-RUN ISSUE)
-        # ---------------------------------------------------------
-        excel = None
-        wb_com = None
-        try:
-            import win32com.client as win32
-            
-            abs_path = os.path.abspath(output_path)
-            
-            # Constants
-            xlDatabase = 1
-            xlRowField = 1
-            xlColumnField = 2
-            xlPageField = 3
-            xlSum = -4157
-            xlUp = -4162
-            xlToLeft = -4159
-
-            # FORCE NEW INSTANCE: Use DispatchEx to ensure isolation from previous runs or zombies
-            # This prevents attaching to a "dead" excel process from a previous run
-            try:
-                excel = win32.DispatchEx("Excel.Application")
-            except:
-                # Fallback if DispatchEx fails
-                excel = win32.Dispatch("Excel.Application")
-
-            excel.Visible = False
-            excel.DisplayAlerts = False 
-
-            wb_com = excel.Workbooks.Open(abs_path)
-            ws_src = wb_com.Sheets('Podsumowanie')
-            
-            lastRow = ws_src.Cells(ws_src.Rows.Count, 1).End(xlUp).Row
-            lastCol = ws_src.Cells(1, ws_src.Columns.Count).End(xlToLeft).Column
-            src_range = ws_src.Range(ws_src.Cells(1, 1), ws_src.Cells(lastRow, lastCol))
-
-            ws_pivot = wb_com.Sheets.Add()
-            ws_pivot.Name = 'Pivot'
-
-            pc = wb_com.PivotCaches().Create(SourceType=xlDatabase, SourceData=src_range)
-            pt = pc.CreatePivotTable(TableDestination=ws_pivot.Range("A3"), TableName="RaportPivot")
-
-            # Filters
-            pt.PivotFields('Odbiorca').Orientation = xlPageField
-            pt.PivotFields('NIP').Orientation = xlPageField
-            pt.PivotFields('Miesiąc').Orientation = xlPageField 
-
-            # Rows
-            pt.PivotFields('Nazwa').Orientation = xlRowField
-
-            # Values (Sums)
-            df1 = pt.AddDataField(pt.PivotFields('Butlo-dni'), "Suma Butlo-dni", xlSum)
-            df1.NumberFormat = "0.00"
-            df2 = pt.AddDataField(pt.PivotFields('rotacja'), "Suma rotacja", xlSum)
-            df2.NumberFormat = "0"
-
-            # rotacja_1 pivot table from Podsumowanie butlodni
-            ws_src2 = wb_com.Sheets('Podsumowanie butlodni')
-            lastRow2 = ws_src2.Cells(ws_src2.Rows.Count, 1).End(xlUp).Row
-            lastCol2 = ws_src2.Cells(1, ws_src2.Columns.Count).End(xlToLeft).Column
-            src_range2 = ws_src2.Range(ws_src2.Cells(1, 1), ws_src2.Cells(lastRow2, lastCol2))
-
-            try:
-                wb_com.Sheets('rotacja_1').Delete()
-            except Exception:
-                pass
-            ws_pivot2 = wb_com.Sheets.Add()
-            ws_pivot2.Name = 'rotacja_1'
-
-            pc2 = wb_com.PivotCaches().Create(SourceType=xlDatabase, SourceData=src_range2)
-            pt2 = pc2.CreatePivotTable(TableDestination=ws_pivot2.Range("A3"), TableName="Rotacja1Pivot")
-
-            pt2.PivotFields('Miesiąc').Orientation = xlPageField
-            pt2.PivotFields('NIP').Orientation = xlPageField
-            pt2.PivotFields('Odbiorca').Orientation = xlPageField
-
-            row_fields_2 = ['Nazwa', 'Stan bieżący', 'Stan']
-            for i, f in enumerate(row_fields_2, start=1):
-                pf = pt2.PivotFields(f)
-                pf.Orientation = xlRowField
-                pf.Position = i
-                pf.Subtotals = [False] * 12
-
-            g1 = pt2.AddDataField(pt2.PivotFields('Butlo-dni'), "Suma Butlo-dni", xlSum)
-            g1.NumberFormat = "0.00"
-            g2 = pt2.AddDataField(pt2.PivotFields('rotacja'), "Sum of rotacja", xlSum)
-            g2.NumberFormat = "0"
-
-            try:
-                pt2.DataPivotField.Orientation = xlColumnField
-            except Exception:
-                pass
-            pt2.RowAxisLayout(1)
-
-            ws_pivot2.Activate()
-
-            # Columns (Values)
-            pt.DataPivotField.Orientation = xlColumnField
-            pt.RowAxisLayout(1)
-            
-            ws_pivot.Activate()
-            
-            wb_com.Save()
-            print("Pivot table created successfully.")
-
-        except Exception as e:
-            print(f"Pivot creation failed: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        finally:
-            # ROBUST CLEANUP
-            # Ensure we close and quit regardless of success/fail
-            if wb_com:
-                try:
-                    wb_com.Close(SaveChanges=True)
-                except: pass
-                wb_com = None
-            
-            if excel:
-                try:
-                    excel.Quit()
-                except: pass
-                # Explicitly delete the object to release COM handle
-                del excel 
 
         return output_path
 
@@ -0,0 +1,144 @@
+"""
+On-disk cache of Gemini extraction results.
+
+Entries are keyed by the SHA-256 of the exact image bytes sent to the API plus
+the prompt, the requested model and CACHE_FORMAT, so re-running the same photo
+(reprocessing a report, importing it twice) returns the stored
+odbiorca/nr_dokumentu/data_wystawienia/dane dict without a network call. A
+rotated or re-trimmed photo has different bytes and therefore a new key.
+
+The cache lives in its own SQLite file (not excelverifier.db, which is
+exported and merged between computers) and is trimmed to max_bytes by evicting
+the least recently used entries.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Bump when the stored result layout or the response parser changes
+CACHE_FORMAT = 1
+
+DEFAULT_CACHE_OPTIONS = {
+    'enabled': True,
+    'max_size_mb': 64,
+}
+
+
+def cache_key(image_bytes: bytes, prompt: str, model: str) -> str:
+    """SHA-256 hex key of the image bytes, prompt, model and cache format."""
+    digest = hashlib.sha256()
+    digest.update(hashlib.sha256(image_bytes).digest())
+    digest.update(prompt.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(f"{model}\0{CACHE_FORMAT}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """SQLite-backed, size-bounded LRU cache of extraction result dicts."""
+
+    def __init__(self, db_path: str, max_bytes: int = DEFAULT_CACHE_OPTIONS['max_size_mb'] * 1024 * 1024):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL" if db_path != ":memory:" else "PRAGMA journal_mode=MEMORY")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS extraction_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                result TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_extraction_cache_last_used ON extraction_cache(last_used)"
+        )
+
+    def get(self, key: str):
+        """Return the cached result dict for key (marking it recently used), or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM extraction_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE extraction_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key: str, result: dict, model: str = None):
+        """Store a result dict, then evict least recently used entries above max_bytes."""
+        payload = json.dumps(result, ensure_ascii=False)
+        size = len(payload.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    """INSERT OR REPLACE INTO extraction_cache (key, model, result, size, created_at, last_used)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    (key, model, payload, size, now, now)
+                )
+                self._evict()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extraction_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM extraction_cache ORDER BY last_used, created_at"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM extraction_cache WHERE key = ?", doomed)
+
+    def stats(self) -> dict:
+        """Number of entries and total payload size in bytes."""
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extraction_cache"
+            ).fetchone()
+        return {'entries': count, 'bytes': size}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM extraction_cache")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(db_path: str, options: dict = None):
+    """
+    The shared ExtractionCache for db_path, or None when disabled in options
+    ({"enabled": false} in the "extraction_cache" settings section).
+    """
+    settings = dict(DEFAULT_CACHE_OPTIONS)
+    settings.update(options or {})
+    if not settings['enabled']:
+        return None
+    with _caches_lock:
+        cache = _caches.get(db_path)
+        if cache is None:
+            cache = _caches[db_path] = ExtractionCache(db_path)
+        cache.max_bytes = int(settings['max_size_mb'] * 1024 * 1024)
+        return cache
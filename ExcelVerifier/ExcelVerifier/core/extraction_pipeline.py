@@ -0,0 +1,271 @@
+"""
+Concurrent Gemini extraction for batches of delivery-note photos.
+
+ImageTransformer.query_gemini_combined blocks its thread on the upload, the
+model call and time.sleep between retries, so a thread pool of 3 keeps at most
+3 photos in flight. ExtractionPipeline runs every photo as an asyncio task
+instead:
+
+- uploads run in worker threads (genai.upload_file has no async variant),
+  model calls use generate_content_async;
+- one TokenBucket per process limits the requests sent to the API, whatever
+  model they go to, so a large batch does not turn into a burst of 429s;
+- a 503/429 puts only the affected request to sleep (exponential backoff with
+  jitter) before it retries or falls back to the next model.
+
+Images are sent as bytes. A `prepare` callable (e.g.
+core.image_preprocess.prepare_for_upload in a process pool) can produce them,
+overlapping preprocessing of one photo with the API calls of others, and
+upload_stats records how many bytes that saved.
+
+TransformWorker is a QThread with no event loop, so run() is a synchronous
+facade that starts one with asyncio.run().
+"""
+
+import asyncio
+import io
+import mimetypes
+import os
+import random
+import threading
+import time
+
+import google.generativeai as genai
+from google.api_core.exceptions import ServiceUnavailable, TooManyRequests
+
+from core.image_transformer import COMBINED_PROMPT, DEFAULT_MODEL, empty_result, fallback_models
+
+
+# Prefix of the error reported for images whose `prepare` step failed
+PREPROCESSING_ERROR = "Preprocessing error"
+
+# Errors after which the same model is retried (after a backoff)
+RETRYABLE_ERRORS = (ServiceUnavailable, TooManyRequests)
+
+DEFAULT_PIPELINE_OPTIONS = {
+    'max_in_flight': 16,          # photos processed at the same time
+    'requests_per_minute': 60,    # shared by all models
+    'burst': 8,                   # requests allowed at once before the rate applies
+    'max_retries': 3,             # attempts per model on 503/429
+    'backoff_s': 1.0,             # first backoff, doubled on every retry
+    'max_backoff_s': 30.0,
+}
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter usable from any thread and event loop.
+
+    acquire() reserves a token immediately (the balance may go negative) and
+    then sleeps until that token has been refilled, so waiting callers are
+    served in the order they arrived and no asyncio primitive is tied to a
+    single event loop.
+    """
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        if rate_per_second <= 0 or capacity < 1:
+            raise ValueError("rate_per_second must be > 0 and capacity >= 1")
+        self.rate = float(rate_per_second)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return how many seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter(requests_per_minute: float, burst: int) -> TokenBucket:
+    """
+    The process-wide TokenBucket shared by every pipeline.
+
+    Re-created when the limits change (e.g. after editing settings).
+    """
+    global _rate_limiter
+    with _rate_limiter_lock:
+        rate = requests_per_minute / 60.0
+        if _rate_limiter is None or _rate_limiter.rate != rate or _rate_limiter.capacity != burst:
+            _rate_limiter = TokenBucket(rate, burst)
+        return _rate_limiter
+
+
+class ExtractionPipeline:
+    """Runs query_gemini_combined-equivalent extractions for many images concurrently."""
+
+    def __init__(self, transformer, options: dict = None, model: str = DEFAULT_MODEL):
+        """
+        Args:
+            transformer: ImageTransformer used to parse responses (and already
+                configured with the API key).
+            options: Overrides for DEFAULT_PIPELINE_OPTIONS.
+            model: Preferred model; the usual fallbacks follow it.
+        """
+        self.transformer = transformer
+        self.options = dict(DEFAULT_PIPELINE_OPTIONS)
+        self.options.update({k: v for k, v in (options or {}).items() if k in DEFAULT_PIPELINE_OPTIONS})
+        self.models = fallback_models(model)
+        self.rate_limiter = get_rate_limiter(self.options['requests_per_minute'], self.options['burst'])
+
+    # ------------------------------------------------------------------
+    # API calls (overridden in tests)
+    # ------------------------------------------------------------------
+
+    async def _upload(self, image_path: str, data: bytes, mime_type: str = None):
+        await self.rate_limiter.acquire()
+        mime_type = mime_type or mimetypes.guess_type(image_path)[0] or "image/jpeg"
+        return await asyncio.to_thread(genai.upload_file, path=io.BytesIO(data), mime_type=mime_type,
+                                       display_name=os.path.basename(image_path))
+
+    async def _generate(self, model_name: str, image_file) -> str:
+        await self.rate_limiter.acquire()
+        model_obj = genai.GenerativeModel(model_name)
+        response = await model_obj.generate_content_async([COMBINED_PROMPT, image_file])
+        return response.text
+
+    # ------------------------------------------------------------------
+    # Extraction
+    # ------------------------------------------------------------------
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter for the given retry attempt (0-based)."""
+        ceiling = min(self.options['max_backoff_s'], self.options['backoff_s'] * (2 ** attempt))
+        return random.uniform(ceiling / 2, ceiling)
+
+    async def extract(self, image_path: str, data: bytes = None, mime_type: str = None) -> dict:
+        """
+        Extract one image. Returns the same dict as query_gemini_combined,
+        with 'error' set when every model failed. Cached images skip the API
+        (and the rate limiter) entirely.
+
+        Args:
+            image_path: Image name (and file to read when data is None).
+            data: Image bytes to send, e.g. the preprocessed photo.
+            mime_type: Type of data (default: guessed from image_path).
+        """
+        try:
+            if data is None:
+                data = await asyncio.to_thread(_read_bytes, image_path)
+            key, cached = await asyncio.to_thread(self.transformer.cache_lookup, data, self.models[0])
+            if cached is not None:
+                return cached
+            image_file = await self._upload(image_path, data, mime_type)
+        except Exception as e:
+            return empty_result(f"API query error: {e}")
+
+        max_retries = self.options['max_retries']
+        for model_name in self.models:
+            for attempt in range(max_retries):
+                try:
+                    text = await self._generate(model_name, image_file)
+                    result = self.transformer.parse_combined_response(text)
+                    self.transformer.cache_store(key, result, model_name)
+                    return result
+                except RETRYABLE_ERRORS as e:
+                    if attempt < max_retries - 1:
+                        delay = self._backoff(attempt)
+                        print(f"Model {model_name} {getattr(e, 'code', '')}. Retrying in {delay:.1f}s...")
+                        await asyncio.sleep(delay)
+                    else:
+                        print(f"Model {model_name} unavailable")
+                except Exception as e:
+                    print(f"Model {model_name} failed: {e}")
+                    break
+
+        return empty_result('All models failed')
+
+    async def run_async(self, image_paths, on_result=None, progress_callback=None,
+                        prepare=None, executor=None) -> list:
+        """
+        Extract all images, at most max_in_flight at a time.
+
+        Args:
+            image_paths: Images to extract.
+            on_result: Optional callable(image_path, result, image_data) run
+                in a worker thread as soon as an image is extracted (e.g.
+                writing the Excel report); image_data is the prepared photo or
+                None. Its return value is collected.
+            progress_callback: Optional callable(done, total) called from the
+                pipeline thread after every image.
+            prepare: Optional callable(image_path) run in executor before
+                extraction, returning the bytes to send or a dict with 'data'
+                and optionally 'mime_type', 'image' (kept for on_result instead
+                of data) and 'original_bytes'. A failure is reported as
+                "Preprocessing error: ..." and the image is not sent.
+            executor: Executor for prepare (default: the loop's thread pool).
+
+        Returns:
+            List of (image_path, value, error) in input order, where value is
+            on_result's return value (or the extraction dict without
+            on_result) and error is the exception message or None.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.options['max_in_flight'])
+        total = len(image_paths)
+        done = 0
+        self.upload_stats = {'images': 0, 'original_bytes': 0, 'upload_bytes': 0}
+
+        async def process(image_path):
+            nonlocal done
+            try:
+                async with semaphore:
+                    prepared = {'data': None}
+                    if prepare is not None:
+                        try:
+                            prepared = await loop.run_in_executor(executor, prepare, image_path)
+                        except Exception as e:
+                            raise RuntimeError(f"{PREPROCESSING_ERROR}: {e}") from e
+                        if isinstance(prepared, bytes):
+                            prepared = {'data': prepared}
+                        self._count_upload(prepared)
+                    result = await self.extract(image_path, prepared['data'], prepared.get('mime_type'))
+                image_data = prepared.get('image', prepared['data'])
+                value = await asyncio.to_thread(on_result, image_path, result, image_data) if on_result else result
+                outcome = (image_path, value, None)
+            except Exception as e:
+                outcome = (image_path, None, str(e))
+            done += 1
+            if progress_callback:
+                progress_callback(done, total)
+            return outcome
+
+        return list(await asyncio.gather(*(process(p) for p in image_paths)))
+
+    def _count_upload(self, prepared: dict):
+        stats = self.upload_stats
+        stats['images'] += 1
+        stats['original_bytes'] += prepared.get('original_bytes', len(prepared['data']))
+        stats['upload_bytes'] += len(prepared['data'])
+
+    def upload_summary(self) -> str:
+        """One line about the bytes sent in the last run (for the log)."""
+        stats = getattr(self, 'upload_stats', None)
+        if not stats or not stats['images']:
+            return "[UPLOAD] brak przygotowanych zdjęć"
+        saved = stats['original_bytes'] - stats['upload_bytes']
+        percent = 100.0 * saved / stats['original_bytes'] if stats['original_bytes'] else 0.0
+        return (f"[UPLOAD] {stats['images']} zdjęć: {stats['original_bytes'] / 1e6:.1f} MB → "
+                f"{stats['upload_bytes'] / 1e6:.1f} MB (zaoszczędzono {percent:.0f}%)")
+
+    def run(self, image_paths, on_result=None, progress_callback=None, prepare=None, executor=None) -> list:
+        """Synchronous facade for run_async (for threads without an event loop)."""
+        return asyncio.run(self.run_async(image_paths, on_result, progress_callback, prepare, executor))
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
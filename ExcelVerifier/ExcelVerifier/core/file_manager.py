@@ -1,49 +1,171 @@
 import os
+import time
+from collections import defaultdict
 from openpyxl import load_workbook
 # Make sure your config.py actually defines these variables
 from config import REPORTS_ROOT, APPROVED_FILE, DATABASE_FILE
 
+from core.file_stamp import settled_mtime
+
+REPORT_EXTENSIONS = ('.xlsx', '.xlsm', '.xls')
+
+
+def _is_report(fname):
+    # Skip temporary Excel lock files
+    return not fname.startswith('~$') and fname.lower().endswith(REPORT_EXTENSIONS)
+
+
+def _child_key(key, name):
+    """Index key of a subdirectory or file: its path relative to REPORTS_ROOT, '/'-separated."""
+    return f"{key}/{name}" if key else name
+
+
+def _parent_key(key):
+    return key.rpartition('/')[0]
+
+
+def _scan_directory(directory):
+    """([(filename, size, mtime_ns)] of the reports, [subdirectory names]) directly in directory."""
+    files = []
+    subdirs = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif _is_report(entry.name) and entry.is_file():
+                    st = entry.stat()
+                    files.append((entry.name, st.st_size, st.st_mtime_ns))
+            except OSError:
+                continue  # Removed while scanning
+    return files, subdirs
+
+
 class FileManager:
+    """
+    Lists the reports under REPORTS_ROOT.
+
+    The reports are kept in a file index in the database (report_files and
+    report_dirs). A refresh only stats the directories and rescans the ones
+    whose mtime changed (a file was added, removed or renamed in them), so
+    listing thousands of reports does not walk the whole tree. Edits inside
+    an existing file do not change its directory; the index only tracks
+    which reports exist.
+
+    Paths in the index are relative to REPORTS_ROOT ('/'-separated, '' is the
+    root itself): the database sits on the shared drive, and users reaching
+    the share by different paths (Z:\\ vs \\\\server\\share) share one index.
+    """
+
+    def __init__(self, reports_root=None, db_path=None):
+        self.reports_root = reports_root or REPORTS_ROOT
+        self.db_path = db_path or DATABASE_FILE
+
     def get_unapproved_reports(self):
         """
-        Recursively scans REPORTS_ROOT for Excel files and returns a list 
-        of absolute paths for files that are NOT listed in APPROVED_FILE.
+        Returns a sorted list of absolute paths of the Excel files under
+        REPORTS_ROOT that have no approved record.
         """
+        try:
+            return self._indexed_reports(approved=False)
+        except Exception as e:
+            print(f"⚠ Warning: Report index unavailable, scanning folders: {e}")
         approved_names = self._get_approved_filenames()
-        print(f"DEBUG: Approved filenames: {approved_names}")
-        
-        unapproved_paths = []
-        all_excel_files = []
-
-        # Walk the reports folder and collect .xlsx/.xlsm/.xls files
-        if os.path.exists(REPORTS_ROOT):
-            for dirpath, dirnames, filenames in os.walk(REPORTS_ROOT):
-                for fname in filenames:
-                    # Skip temporary Excel lock files
-                    if fname.startswith('~$'):
-                        print(f"DEBUG: Skipping temp lock file: {fname}")
-                        continue
-                    
-                    # Check extension
-                    low = fname.lower()
-                    if low.endswith(('.xlsx', '.xlsm', '.xls')):
-                        all_excel_files.append(fname)
-                        full_path = os.path.join(dirpath, fname)
-                        
-                        # Check if already approved
-                        if fname in approved_names:
-                            print(f"DEBUG: Skipping approved file: {fname}")
-                            continue
-                        
-                        unapproved_paths.append(full_path)
-                        print(f"DEBUG: Found unapproved report: {full_path}")
+        return [p for p in self._walk_reports() if os.path.basename(p) not in approved_names]
 
-        # Sort results for consistent order (A-Z)
-        unapproved_paths.sort()
-        print(f"DEBUG: Total Excel files found: {len(all_excel_files)}")
-        print(f"DEBUG: Total approved files: {len(approved_names)}")
-        print(f"DEBUG: Total unapproved reports: {len(unapproved_paths)}")
-        return unapproved_paths
+    def get_approved_reports(self):
+        """
+        Returns a sorted list of absolute paths of the Excel files under
+        REPORTS_ROOT that have an approved record.
+        """
+        try:
+            return self._indexed_reports(approved=True)
+        except Exception as e:
+            print(f"⚠ Warning: Report index unavailable, scanning folders: {e}")
+        approved_names = self._get_approved_filenames()
+        return [p for p in self._walk_reports() if os.path.basename(p) in approved_names]
+
+    def refresh_index(self, full=False):
+        """
+        Bring the report file index up to date with REPORTS_ROOT.
+
+        Args:
+            full: Rescan every directory, not only the ones whose mtime changed
+
+        Returns:
+            Number of directories that were rescanned
+        """
+        from core.database_handler import DatabaseHandler
+        db = DatabaseHandler(self.db_path)
+        known = db.get_indexed_directories()
+        children = defaultdict(list)
+        for key, (parent, _) in known.items():
+            children[parent].append(key)
+
+        stack = [''] if os.path.isdir(self.reports_root) else []
+        visited = set()
+        rescanned = 0
+        now = time.time_ns()
+        with db.transaction():
+            while stack:
+                key = stack.pop()
+                directory = self._absolute(key)
+                try:
+                    mtime = os.stat(directory).st_mtime_ns
+                except OSError:
+                    continue  # Removed since its parent was scanned
+                visited.add(key)
+
+                indexed = known.get(key)
+                if not full and indexed is not None and indexed[1] == mtime:
+                    stack.extend(children[key])
+                    continue
+
+                try:
+                    files, subdirs = _scan_directory(directory)
+                except OSError as e:
+                    print(f"⚠ Warning: Could not scan {directory}: {e}")
+                    visited.discard(key)
+                    continue
+                stored_mtime = settled_mtime(mtime, now)
+                parent = _parent_key(key) if key else None
+                db.replace_indexed_directory(key, parent, stored_mtime, files)
+                stack.extend(_child_key(key, name) for name in subdirs)
+                rescanned += 1
+
+            # Only directories deleted from disk (or indexed under an older layout)
+            db.remove_indexed_directories([key for key in known if key not in visited])
+        return rescanned
+
+    def indexed_directories(self):
+        """Directories under REPORTS_ROOT known to the index, e.g. to watch them for changes."""
+        from core.database_handler import DatabaseHandler
+        return sorted(self._absolute(key) for key in DatabaseHandler(self.db_path).get_indexed_directories())
+
+    def _indexed_reports(self, approved):
+        from core.database_handler import DatabaseHandler
+        self.refresh_index()
+        keys = DatabaseHandler(self.db_path).get_indexed_reports(approved)
+        prefix = os.path.join(os.path.abspath(self.reports_root), '')
+        if os.sep != '/':
+            keys = [key.replace('/', os.sep) for key in keys]
+        paths = [prefix + key for key in keys]
+        paths.sort()
+        return paths
+
+    def _absolute(self, key):
+        """Path on this machine of an index key (relative to REPORTS_ROOT)."""
+        root = os.path.abspath(self.reports_root)
+        return os.path.join(root, *key.split('/')) if key else root
+
+    def _walk_reports(self):
+        """All report paths under REPORTS_ROOT by walking the tree (fallback without the index)."""
+        paths = []
+        if os.path.exists(self.reports_root):
+            for dirpath, dirnames, filenames in os.walk(self.reports_root):
+                paths.extend(os.path.join(dirpath, f) for f in filenames if _is_report(f))
+        paths.sort()
+        return paths
 
     def _get_approved_filenames(self):
         """
@@ -56,15 +178,14 @@ class FileManager:
         try:
             # Try to load from database
             from core.database_handler import DatabaseHandler
-            db = DatabaseHandler(DATABASE_FILE)
+            db = DatabaseHandler(self.db_path)
             approved_records = db.get_all_approved_records()
             
             for record in approved_records:
                 filename = record.get('filename')
                 if filename:
                     approved_names.add(str(filename))
-                    
-            print(f"DEBUG: Loaded {len(approved_names)} approved filenames from database")
+
             return approved_names
             
         except Exception as e:
@@ -115,31 +236,3 @@ class FileManager:
             print(f"Warning: Could not read legacy approved records: {e2}")
             
         return approved_names
-    
-    def get_approved_reports(self):
-        """
-        Returns a list of absolute paths for all approved reports.
-        Reads from APPROVED_FILE and finds the actual files in REPORTS_ROOT.
-        """
-        approved_names = self._get_approved_filenames()
-        approved_paths = []
-        
-        # Walk the reports folder and collect approved files
-        if os.path.exists(REPORTS_ROOT):
-            for dirpath, dirnames, filenames in os.walk(REPORTS_ROOT):
-                for fname in filenames:
-                    # Skip temporary Excel lock files
-                    if fname.startswith('~$'):
-                        continue
-                    
-                    # Check extension
-                    low = fname.lower()
-                    if low.endswith(('.xlsx', '.xlsm', '.xls')):
-                        # Only include if it's in approved list
-                        if fname in approved_names:
-                            full_path = os.path.join(dirpath, fname)
-                            approved_paths.append(full_path)
-        
-        # Sort results for consistent order
-        approved_paths.sort()
-        return approved_paths
\ No newline at end of file
@@ -0,0 +1,29 @@
+"""
+Change stamps of files and directories, for the caches that have to notice
+when something on disk changed (report index, photo listings, prefetch and
+image caches).
+"""
+
+import os
+import time
+from typing import Optional, Tuple
+
+# A directory that changed this recently may change again without getting a
+# new mtime (coarse timestamps on FAT/network drives), so its mtime is not
+# trusted yet and it is read again next time
+RACY_WINDOW_NS = 5 * 1_000_000_000
+
+
+def file_stamp(path) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a file, None when it does not exist."""
+    try:
+        st = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def settled_mtime(mtime_ns: int, now_ns: Optional[int] = None) -> Optional[int]:
+    """mtime_ns when it is outside the racy window, else None (= check again next time)."""
+    now_ns = time.time_ns() if now_ns is None else now_ns
+    return mtime_ns if now_ns - mtime_ns > RACY_WINDOW_NS else None
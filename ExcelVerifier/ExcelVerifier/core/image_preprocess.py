@@ -0,0 +1,216 @@
+"""
+In-memory preprocessing of photos before they are sent to Gemini.
+
+Rotation (from the Transform page), whitespace trimming and re-encoding are
+one step on decoded pixels: the photo is read once and the bytes to upload
+are returned, with no temporary files. The work is CPU-bound (PIL holds the
+GIL for most of it), so TransformWorker runs it in a process pool shared by
+the whole application.
+"""
+
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+# Borders are detected on a copy reduced to at most this size
+TRIM_ANALYSIS_MAX_SIZE = 2000
+
+
+def find_content_bbox(img, bg_threshold: int = 250, margin: int = 0):
+    """
+    Bounding box (left, top, right, bottom) of the non-white content of an RGB
+    (or L) image, in img coordinates, or None when the image is entirely white.
+
+    A pixel is content when any channel is darker than bg_threshold. The image
+    is box-reduced by an integer factor, collapsed to its darkest channel and
+    projected onto rows and columns; the box is the first/last row and column
+    whose darkest pixel is below the threshold, scaled back outwards.
+    """
+    width, height = img.size
+    factor = -(-max(width, height) // TRIM_ANALYSIS_MAX_SIZE)  # ceil
+    small = img.reduce(factor) if factor > 1 else img
+
+    pixels = np.asarray(small)
+    if pixels.ndim == 3:
+        # Elementwise over the channel planes; .min(axis=2) is ~20x slower
+        pixels = np.minimum(np.minimum(pixels[..., 0], pixels[..., 1]), pixels[..., 2])
+
+    rows = np.flatnonzero(pixels.min(axis=1) < bg_threshold)
+    if rows.size == 0:
+        return None
+    cols = np.flatnonzero(pixels.min(axis=0) < bg_threshold)
+
+    return (
+        max(int(cols[0]) * factor - margin, 0),
+        max(int(rows[0]) * factor - margin, 0),
+        min((int(cols[-1]) + 1) * factor + margin, width),
+        min((int(rows[-1]) + 1) * factor + margin, height),
+    )
+
+
+def _rotate_and_trim(image_path: str, rotation: int, bg_threshold: int, margin: int):
+    """
+    Returns (original_bytes, image_format, rgb_image, changed); changed is False
+    when there was nothing to rotate or trim.
+    """
+    with open(image_path, 'rb') as f:
+        original = f.read()
+
+    img = Image.open(io.BytesIO(original))
+    image_format = img.format or "JPEG"
+    rotation = rotation % 360
+    if rotation:
+        # Negative because the UI rotation is clockwise, PIL's counter-clockwise
+        img = img.rotate(-rotation, expand=True)
+
+    img = img.convert("RGB")
+    bbox = find_content_bbox(img, bg_threshold, margin)
+    if bbox is not None and bbox != (0, 0) + img.size:
+        return original, image_format, img.crop(bbox), True
+    return original, image_format, img, bool(rotation)
+
+
+def _encode(img, image_format: str, **params) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, format=image_format, **params)
+    return buffer.getvalue()
+
+
+def preprocess_image(image_path: str, rotation: int = 0, bg_threshold: int = 250, margin: int = 0) -> bytes:
+    """
+    Rotate, trim white borders and re-encode a photo in memory.
+
+    Args:
+        image_path: Source photo.
+        rotation: Clockwise rotation in degrees as shown on the Transform page.
+        bg_threshold: Pixels brighter than this count as background.
+        margin: Extra pixels kept around the detected content.
+
+    Returns:
+        Encoded image bytes in the source format. The original file bytes are
+        returned unchanged when there is nothing to rotate or trim.
+    """
+    original, image_format, img, changed = _rotate_and_trim(image_path, rotation, bg_threshold, margin)
+    return _encode(img, image_format) if changed else original
+
+
+# Pre-upload stage ("upload" section of settings.json). Gemini reads a
+# delivery note just as well from a 2560 px grayscale JPEG as from an 8 MB
+# colour original; check changes with bench_upload_ab.py.
+DEFAULT_UPLOAD_OPTIONS = {
+    'enabled': True,
+    'max_long_edge': 2560,      # px, 0 = keep the size
+    'grayscale': 'auto',        # 'auto' (when the photo has no colour content), 'always' or 'never'
+    'format': 'JPEG',           # 'JPEG' or 'WEBP'
+    'quality': 85,
+}
+
+# 'auto' keeps colour when more than this share of pixels is clearly coloured
+# (stamps, coloured pen, highlighted cells)
+COLOUR_PIXEL_CHROMA = 48
+COLOUR_PIXEL_SHARE = 0.005
+
+MIME_TYPES = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'WEBP': 'image/webp', 'GIF': 'image/gif', 'BMP': 'image/bmp'}
+
+
+def has_colour_content(img) -> bool:
+    """True when enough pixels of an RGB image have a strong colour cast."""
+    pixels = np.asarray(img.reduce(4) if min(img.size) >= 400 else img)
+    r, g, b = (pixels[..., i].astype(np.int16) for i in range(3))
+    chroma = np.maximum(np.maximum(r, g), b) - np.minimum(np.minimum(r, g), b)
+    return np.count_nonzero(chroma > COLOUR_PIXEL_CHROMA) > COLOUR_PIXEL_SHARE * chroma.size
+
+
+def optimize_for_upload(img, options: dict = None):
+    """
+    Downsample and recompress an RGB image for the API.
+
+    Returns (bytes, mime_type).
+    """
+    settings = dict(DEFAULT_UPLOAD_OPTIONS)
+    settings.update(options or {})
+
+    max_edge = settings['max_long_edge']
+    if max_edge and max(img.size) > max_edge:
+        scale = max_edge / max(img.size)
+        size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        img = img.resize(size, Image.LANCZOS, reducing_gap=2.0)
+
+    grayscale = settings['grayscale']
+    if grayscale == 'always' or (grayscale == 'auto' and not has_colour_content(img)):
+        img = img.convert("L")
+
+    image_format = str(settings['format']).upper()
+    if image_format == 'WEBP':
+        data = _encode(img, 'WEBP', quality=settings['quality'], method=4)
+    else:
+        image_format = 'JPEG'
+        data = _encode(img, 'JPEG', quality=settings['quality'])
+    return data, MIME_TYPES[image_format]
+
+
+def prepare_for_upload(image_path: str, rotations: dict = None, upload_options: dict = None,
+                       bg_threshold: int = 250, margin: int = 0) -> dict:
+    """
+    Preprocess one photo for the extraction pipeline (picklable for the process pool).
+
+    Args:
+        image_path: Source photo.
+        rotations: {path: clockwise degrees} from the Transform page.
+        upload_options: Overrides for DEFAULT_UPLOAD_OPTIONS.
+
+    Returns:
+        dict with 'data' and 'mime_type' (what is uploaded), 'image' (the
+        rotated/trimmed photo in its source format, saved with the report)
+        and 'original_bytes' (size of the source file).
+    """
+    rotation = (rotations or {}).get(image_path, 0)
+    original, image_format, img, changed = _rotate_and_trim(image_path, rotation, bg_threshold, margin)
+    image = _encode(img, image_format) if changed else original
+    prepared = {
+        'image': image,
+        'data': image,
+        'mime_type': MIME_TYPES.get(image_format, 'image/jpeg'),
+        'original_bytes': len(original),
+    }
+
+    settings = dict(DEFAULT_UPLOAD_OPTIONS)
+    settings.update(upload_options or {})
+    if settings['enabled']:
+        data, mime_type = optimize_for_upload(img, settings)
+        # Already small photos (e.g. scans) may not get any smaller
+        if len(data) < len(image):
+            prepared['data'] = data
+            prepared['mime_type'] = mime_type
+    return prepared
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_preprocess_pool():
+    """
+    The application-wide process pool for preprocessing.
+
+    Kept alive between batches: starting worker processes costs more than
+    preprocessing a few photos. Re-created if a worker process died.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or getattr(_pool, '_broken', False):
+            _pool = ProcessPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+        return _pool
+
+
+def shutdown_preprocess_pool():
+    """Stop the worker processes (called when the application exits)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
@@ -0,0 +1,111 @@
+"""
+Finds the photo saved next to a report: same file name, image extension.
+
+Probing every extension with os.path.exists costs up to six round trips per
+report on a network share. Instead each directory is listed once and its
+stem -> photo mapping is cached; a lookup only stats the directory to check
+its mtime (adding, removing or renaming a file changes it), and a batch
+lookup stats each directory once for all the reports in it.
+"""
+
+import os
+import threading
+from typing import Dict, Iterable, Optional
+
+from core.file_stamp import settled_mtime
+
+# In order of preference when a report has several photos
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff')
+
+
+class ImageResolver:
+    def __init__(self, extensions=IMAGE_EXTENSIONS):
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self._listings = {}        # directory -> (mtime_ns or None, {stem: photo file name})
+        self._lock = threading.Lock()
+
+    def find_image(self, report_path: str) -> Optional[str]:
+        """Path of the photo linked to report_path, or None."""
+        directory, stem = self._split(report_path)
+        return self._lookup(directory, self._listing(directory), stem)
+
+    def find_images(self, report_paths: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Linked photos of many reports: {report path: photo path or None}."""
+        listings = {}
+        result = {}
+        for path in report_paths:
+            directory, stem = self._split(path)
+            if directory not in listings:
+                listings[directory] = self._listing(directory)
+            result[path] = self._lookup(directory, listings[directory], stem)
+        return result
+
+    def invalidate(self, directory: Optional[str] = None):
+        """Forget one directory's listing or, with no directory, all of them."""
+        with self._lock:
+            if directory is None:
+                self._listings.clear()
+            else:
+                self._listings.pop(os.path.abspath(directory), None)
+
+    @staticmethod
+    def _split(report_path):
+        directory, name = os.path.split(os.path.abspath(report_path))
+        return directory, os.path.normcase(os.path.splitext(name)[0])
+
+    @staticmethod
+    def _lookup(directory, photos, stem):
+        name = photos.get(stem)
+        return os.path.join(directory, name) if name else None
+
+    def _listing(self, directory):
+        """{stem: photo file name} of a directory, listed again only when it changed."""
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return {}
+        with self._lock:
+            cached = self._listings.get(directory)
+        if cached is not None and cached[0] is not None and cached[0] == mtime:
+            return cached[1]
+
+        rank = {ext: i for i, ext in enumerate(self.extensions)}
+        photos = {}
+        best = {}
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    stem, ext = os.path.splitext(entry.name)
+                    i = rank.get(ext.lower())
+                    if i is None:
+                        continue
+                    stem = os.path.normcase(stem)
+                    if i < best.get(stem, len(rank)):
+                        best[stem] = i
+                        photos[stem] = entry.name
+        except OSError:
+            return {}
+
+        stored_mtime = settled_mtime(mtime)
+        with self._lock:
+            self._listings[directory] = (stored_mtime, photos)
+        return photos
+
+
+# Shared by the verification view, approval and import/export
+_resolver = ImageResolver()
+
+
+def find_image(report_path: str) -> Optional[str]:
+    """Path of the photo linked to a report, or None (see ImageResolver)."""
+    return _resolver.find_image(report_path)
+
+
+def find_images(report_paths: Iterable[str]) -> Dict[str, Optional[str]]:
+    """Linked photos of many reports: {report path: photo path or None}."""
+    return _resolver.find_images(report_paths)
+
+
+def invalidate_image_cache(directory: Optional[str] = None):
+    """Forget cached directory listings (all of them when directory is None)."""
+    _resolver.invalidate(directory)
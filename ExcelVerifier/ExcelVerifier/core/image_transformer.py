@@ -3,75 +3,109 @@ import re
 import json
 import shutil
 import time
-import pandas as pd
 from datetime import datetime
-from openpyxl import load_workbook
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment, PatternFill
 import google.generativeai as genai
 from google.api_core.exceptions import ServiceUnavailable
 import config
+from core.extraction_cache import cache_key, get_cache
+from core.validation import COL_CURRENT, table_mismatches
+
+
+DEFAULT_MODEL = "gemini-3-flash-preview"
+
+COMBINED_PROMPT = """Extract 4 pieces from this document:
+1. 'ODBIORCA' cell (company): "ODBIORCA: [text]" (take the content of the whole cell, but exclude 'ODBIORCA' label)
+2. 'Nr dokumentu' (document number): "Nr dokumentu: [text]"
+3. 'Data wystawienia' (date, DD.MM.YYYY): "Data wystawienia: [text]"
+4. All table data in pipe format: "|Lp|Nazwa|Ilość|Uwagi|Ilość|Stan poprzedni|Stan po wymianie|"
+
+Use EXACTLY these formats, one item per line, then output table rows only."""
+
+
+def fallback_models(model: str = DEFAULT_MODEL) -> list:
+    """Models tried for a combined extraction, in order and without duplicates."""
+    models_to_try = [model, "gemini-2.5-flash", "gemini-2.5-pro", "gemini-3-flash-preview"]
+    seen = set()
+    return [m for m in models_to_try if not (m in seen or seen.add(m))]
+
+
+def empty_result(error: str = None) -> dict:
+    """Extraction result used when nothing could be read from the image."""
+    result = {'odbiorca': 'UNKNOWN', 'nr_dokumentu': 'UNKNOWN', 'data_wystawienia': 'UNKNOWN', 'dane': ''}
+    if error:
+        result['error'] = error
+    return result
 
 
 class ImageTransformer:
     """Handles transformation of images to Excel reports using Gemini API."""
     
-    def __init__(self, api_key=None):
-        """Initialize the transformer with API key."""
+    def __init__(self, api_key=None, use_cache=True, cache=None):
+        """
+        Initialize the transformer with API key.
+
+        Extraction results are cached by image content (core/extraction_cache.py)
+        unless use_cache is False or the "extraction_cache" setting disables it.
+        """
         self.api_key = api_key or config.get_gemini_api_key()
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY not found in environment or settings")
         genai.configure(api_key=self.api_key)
-    
-    def query_gemini_combined(self, image_path: str, model: str = "gemini-3-flash-preview") -> dict:
+        if not use_cache:
+            self.cache = None
+        else:
+            self.cache = cache or get_cache(config.EXTRACTION_CACHE_FILE, config.EXTRACTION_CACHE_SETTINGS)
+
+    def cache_lookup(self, image_bytes: bytes, model: str = DEFAULT_MODEL):
+        """
+        Return (key, cached_result) for the image bytes sent to the API;
+        cached_result is None on a miss and key is None when caching is off.
+        """
+        if self.cache is None:
+            return None, None
+        key = cache_key(image_bytes, COMBINED_PROMPT, model)
+        return key, self.cache.get(key)
+
+    def cache_store(self, key, result: dict, model: str = None):
+        """Cache a successful extraction (failed or unreadable ones are retried next time)."""
+        if key is None or self.cache is None:
+            return
+        if result.get('error') or result.get('odbiorca') == 'UNKNOWN':
+            return
+        try:
+            self.cache.put(key, result, model)
+        except Exception as e:
+            print(f"⚠ Warning: Could not cache extraction result: {e}")
+
+    def query_gemini_combined(self, image_path: str, model: str = DEFAULT_MODEL, use_cache: bool = True) -> dict:
         """
         Send all 4 prompts in ONE API call (4x faster than separate calls).
         Returns dict with: odbiorca, nr_dokumentu, data_wystawienia, dane
+        A cached result for the same image bytes is returned without any API call
+        unless use_cache is False.
         """
-        image_file = genai.upload_file(path=image_path)
-
-        combined_prompt = """Extract 4 pieces from this document:
-1. 'ODBIORCA' cell (company): "ODBIORCA: [text]" (take the content of the whole cell, but exclude 'ODBIORCA' label)
-2. 'Nr dokumentu' (document number): "Nr dokumentu: [text]"
-3. 'Data wystawienia' (date, DD.MM.YYYY): "Data wystawienia: [text]"
-4. All table data in pipe format: "|Lp|Nazwa|Ilość|Uwagi|Ilość|Stan poprzedni|Stan po wymianie|"
+        key, cached = None, None
+        if use_cache and self.cache is not None:
+            with open(image_path, 'rb') as f:
+                key, cached = self.cache_lookup(f.read(), model)
+        if cached is not None:
+            return cached
 
-Use EXACTLY these formats, one item per line, then output table rows only."""
-
-        models_to_try = [model, "gemini-2.5-flash", "gemini-2.5-pro", "gemini-3-flash-preview"]
-        seen = set()
-        unique_models = [m for m in models_to_try if not (m in seen or seen.add(m))]
+        image_file = genai.upload_file(path=image_path)
 
-        for model_name in unique_models:
+        for model_name in fallback_models(model):
             max_retries = 2
             wait_time = 1
 
             for attempt in range(max_retries):
                 try:
                     model_obj = genai.GenerativeModel(model_name)
-                    response = model_obj.generate_content([combined_prompt, image_file])
-
-                    response_text = response.text
-                    lines = response_text.strip().split('\n')
-                    result = {
-                        'odbiorca': 'UNKNOWN',
-                        'nr_dokumentu': 'UNKNOWN',
-                        'data_wystawienia': 'UNKNOWN',
-                        'dane': ''
-                    }
-                    
-                    table_lines = []
-                    for line in lines:
-                        line = line.strip()
-                        if line.startswith('ODBIORCA:'):
-                            result['odbiorca'] = self.extract_after_colon(line)
-                        elif line.startswith('Nr dokumentu:'):
-                            result['nr_dokumentu'] = self.extract_after_colon(line)
-                        elif line.startswith('Data wystawienia:'):
-                            result['data_wystawienia'] = self.extract_after_colon(line)
-                        elif '|' in line:
-                            table_lines.append(line)
-                    
-                    result['dane'] = '\n'.join(table_lines)
+                    response = model_obj.generate_content([COMBINED_PROMPT, image_file])
+                    result = self.parse_combined_response(response.text)
+                    self.cache_store(key, result, model_name)
                     return result
 
                 except ServiceUnavailable as e:
@@ -86,9 +120,30 @@ Use EXACTLY these formats, one item per line, then output table rows only."""
                     print(f"Model {model_name} failed: {e}")
                     break
 
-        return {'odbiorca': 'UNKNOWN', 'nr_dokumentu': 'UNKNOWN', 'data_wystawienia': 'UNKNOWN', 'dane': '', 'error': 'All models failed'}
-    
-    def query_gemini_with_image(self, prompt: str, image_path: str, model: str = "gemini-3-flash-preview") -> str:
+        return empty_result('All models failed')
+
+    def parse_combined_response(self, response_text: str) -> dict:
+        """
+        Parse the reply to COMBINED_PROMPT into the extraction result dict.
+        Table rows are kept as pipe-formatted lines in 'dane'.
+        """
+        result = empty_result()
+        table_lines = []
+        for line in response_text.strip().split('\n'):
+            line = line.strip()
+            if line.startswith('ODBIORCA:'):
+                result['odbiorca'] = self.extract_after_colon(line)
+            elif line.startswith('Nr dokumentu:'):
+                result['nr_dokumentu'] = self.extract_after_colon(line)
+            elif line.startswith('Data wystawienia:'):
+                result['data_wystawienia'] = self.extract_after_colon(line)
+            elif '|' in line:
+                table_lines.append(line)
+
+        result['dane'] = '\n'.join(table_lines)
+        return result
+
+    def query_gemini_with_image(self, prompt: str, image_path: str, model: str = DEFAULT_MODEL) -> str:
         """
         Send a prompt and image to a Google Gemini multimodal model and return the full response text.
         Implements exponential backoff retry logic for 503 errors and falls back to alternate models.
@@ -212,24 +267,31 @@ Use EXACTLY these formats, one item per line, then output table rows only."""
         if not os.path.isfile(image_path):
             raise FileNotFoundError(f"Image not found: {image_path}")
 
-        errors = []
-
         # Use combined API call (1 call instead of 4 = 4x faster!)
         try:
             result = self.query_gemini_combined(image_path)
-            odbiorca = result.get('odbiorca', 'UNKNOWN')
-            nr_dokumentu = result.get('nr_dokumentu', 'UNKNOWN')
-            data_wystawienia = result.get('data_wystawienia', 'UNKNOWN')
-            dane = result.get('dane', '')
-            
-            if result.get('error'):
-                errors.append(f"API response: {result['error']}")
         except Exception as e:
-            errors.append(f"API query error: {e}")
-            odbiorca = "UNKNOWN"
-            nr_dokumentu = "UNKNOWN"
-            data_wystawienia = "UNKNOWN"
-            dane = ""
+            result = empty_result(f"API query error: {e}")
+
+        return self.write_report(image_path, result, base_folder)
+
+    def write_report(self, image_path: str, result: dict, base_folder: str = "Reports", image_data: bytes = None):
+        """
+        Write the Excel report for an extraction result and copy the image next to it.
+        `result` is the dict returned by query_gemini_combined (or the extraction pipeline).
+        `image_data` (e.g. the rotated/trimmed photo sent to the API) is saved instead
+        of copying image_path.
+        Returns (excel_path, highlighted_rows).
+        """
+        errors = []
+        odbiorca = result.get('odbiorca', 'UNKNOWN')
+        nr_dokumentu = result.get('nr_dokumentu', 'UNKNOWN')
+        data_wystawienia = result.get('data_wystawienia', 'UNKNOWN')
+        dane = result.get('dane', '')
+
+        if result.get('error'):
+            error = result['error']
+            errors.append(error if error.startswith("API query error") else f"API response: {error}")
 
         nr_dokumentu = self.normalize_invoice_number(nr_dokumentu)
 
@@ -325,9 +387,7 @@ Use EXACTLY these formats, one item per line, then output table rows only."""
             ]
             normalized_data.append(processed_row)
 
-        df_table = pd.DataFrame(normalized_data, columns=header)
-
-        # Meta sheet with possible errors
+        # Meta row with possible errors
         # Ensure all metadata values are strings to prevent NaN in output
         meta_row = [
             "Odbiorca",
@@ -337,71 +397,44 @@ Use EXACTLY these formats, one item per line, then output table rows only."""
             "Nr dokumentu",
             str(nr_dokumentu) if nr_dokumentu else ""
         ]
-        
-        df_meta = pd.DataFrame([meta_row])
-        if errors:
-            # Add an Errors row for visibility
-            df_meta = pd.concat([df_meta, pd.DataFrame([["Errors", " | ".join(errors)]])], ignore_index=True)
-
-        # Replace NaN with empty strings before writing to Excel
-        df_meta = df_meta.fillna('').astype(str)
-        df_table = df_table.fillna('').astype(str)
-
-        with pd.ExcelWriter(file_path, engine="openpyxl") as writer:
-            df_meta.to_excel(writer, sheet_name="Sheet1", index=False, header=False, startrow=0)
-            df_table.to_excel(writer, sheet_name="Sheet1", index=False, startrow=2)
-
-        wb = load_workbook(file_path)
-        ws = wb["Sheet1"]
-
-        for col in [1, 3, 5]:
-            ws.cell(row=1, column=col).font = Font(bold=True)
-
-        for col in [2, 4, 6]:
-            ws.cell(row=1, column=col).alignment = Alignment(wrap_text=True)
 
+        # Single write_only pass: meta row (row 1), errors (row 2), table header
+        # (row 3) and data with the validation fill - no second load/save
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Sheet1")
         ws.row_dimensions[1].height = 80
         ws.column_dimensions['B'].width = 15
         ws.column_dimensions['D'].width = 15
         ws.column_dimensions['F'].width = 15
 
+        bold = Font(bold=True)
+        wrap = Alignment(wrap_text=True)
         red_fill = PatternFill(start_color="FF9999", end_color="FF9999", fill_type="solid")
 
-        def to_num(x):
-            if x is None or (isinstance(x, str) and x.strip() == ""):
-                return None
-            try:
-                return float(str(x).replace(",", "."))
-            except:
-                return None
-
-        highlighted = 0
-
-        for row_idx in range(4, ws.max_row + 1):
-            c = to_num(ws.cell(row=row_idx, column=3).value)
-            e = to_num(ws.cell(row=row_idx, column=5).value)
-            f = to_num(ws.cell(row=row_idx, column=6).value)
-            g = to_num(ws.cell(row=row_idx, column=7).value)
-
-            # Treat None as 0.0 for math, but keep None if column is completely empty
-            safe_f = f if f is not None else 0.0
-            expected = None
-            
-            if c is None and e is None:
-                expected = f
-            elif c is not None and e is None:
-                expected = safe_f + c
-            elif c is not None and e is not None:
-                # Logic: Previous + Delivery - Return (validates even when C == E)
-                expected = safe_f + c - e
-            elif c is None and e is not None:
-                expected = safe_f - e
-
-            # Compare with rounding to prevent floating point errors
-            if expected is not None and g is not None:
-                if round(float(g), 2) != round(float(expected), 2):
-                    ws.cell(row=row_idx, column=7).fill = red_fill
-                    highlighted += 1
+        def cell(value, font=None, alignment=None, fill=None):
+            # Empty strings are written as empty cells, like pandas did
+            c = WriteOnlyCell(ws, value=value if value != "" else None)
+            if font:
+                c.font = font
+            if alignment:
+                c.alignment = alignment
+            if fill:
+                c.fill = fill
+            return c
+
+        ws.append([cell(value, font=bold) if col % 2 == 0 else cell(value, alignment=wrap)
+                   for col, value in enumerate(meta_row)])
+        # Add an Errors row for visibility
+        ws.append(["Errors", " | ".join(errors)] if errors else [])
+        ws.append([cell(value) for value in header])
+
+        mismatched = set(table_mismatches(normalized_data).tolist())
+        for index, row in enumerate(normalized_data):
+            cells = [cell(value) for value in row]
+            if index in mismatched:
+                cells[COL_CURRENT].fill = red_fill
+            ws.append(cells)
+        highlighted = len(mismatched)
 
         wb.save(file_path)
         
@@ -411,7 +444,11 @@ Use EXACTLY these formats, one item per line, then output table rows only."""
         excel_base = os.path.splitext(file_name)[0]
         image_copy_name = f"{excel_base}{image_extension}"
         image_copy_path = os.path.normpath(os.path.join(company_folder, image_copy_name))
-        shutil.copy2(image_path, image_copy_path)
+        if image_data is not None:
+            with open(image_copy_path, 'wb') as f:
+                f.write(image_data)
+        else:
+            shutil.copy2(image_path, image_copy_path)
         
         print(f"✓ Saved Excel: {file_name}")
         print(f"✓ Saved Image: {image_copy_name}")
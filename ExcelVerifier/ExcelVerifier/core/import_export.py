@@ -14,16 +14,60 @@ from openpyxl import load_workbook
 
 from core.database_handler import DatabaseHandler
 from core.company_db import load_company_db
+from core.image_resolver import IMAGE_EXTENSIONS, find_image, find_images
 from config import DATABASE_FILE, APPROVED_DIRECTORY, REPORTS_ROOT, COMPANY_DB_FILE
 
 
+# Top-level folder of export archives (import_all_data looks for it)
+EXPORT_ROOT = "ExcelVerifier_Data"
+# Chunk size when streaming files into an archive (progress is reported per chunk)
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def _write_zip(path: str, entries, progress_callback=None):
+    """
+    Stream entries ((source path or bytes, name in the archive)) into a new
+    zip file. Photos are stored, everything else deflated. progress_callback
+    gets (done_bytes, total_bytes) of the source data.
+    """
+    sizes = [len(source) if isinstance(source, bytes) else os.path.getsize(source) for source, _ in entries]
+    total = sum(sizes)
+    done = 0
+    if progress_callback:
+        progress_callback(done, total)
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+        archive.writestr(EXPORT_ROOT + "/", b"")
+        for (source, arcname), size in zip(entries, sizes):
+            stored = os.path.splitext(arcname)[1].lower() in IMAGE_EXTENSIONS
+            compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+            if isinstance(source, bytes):
+                archive.writestr(arcname, source, compress_type=compress_type)
+                done += size
+                if progress_callback:
+                    progress_callback(done, total)
+                continue
+
+            info = zipfile.ZipInfo.from_file(source, arcname)
+            info.compress_type = compress_type
+            with open(source, 'rb') as src, archive.open(info, 'w') as dest:
+                while True:
+                    chunk = src.read(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dest.write(chunk)
+                    done += len(chunk)
+                    if progress_callback:
+                        progress_callback(done, total)
+
+
 class ImportExportHandler:
     """Handles import/export operations for the application."""
     
     def __init__(self):
         self.db = DatabaseHandler(DATABASE_FILE)
     
-    def export_all_data(self, output_path: str) -> Tuple[bool, str]:
+    def export_all_data(self, output_path: str, progress_callback=None) -> Tuple[bool, str]:
         """
         Export all application data to a zip file.
         
@@ -33,132 +77,113 @@ class ImportExportHandler:
         - Company database (company_db.json)
         - Settings (settings.json)
         
+        Files are streamed into the archive from where they are (no staging
+        copy): workbooks and data are deflated, photos stored as they are
+        (already compressed). The database is a snapshot taken with SQLite's
+        online backup API into a temporary file next to output_path.
+        
         Args:
             output_path: Path where to save the zip file
+            progress_callback: Optional callable(done_bytes, total_bytes)
             
         Returns:
             Tuple of (success, message)
         """
+        partial_path = output_path + ".part"
+        snapshot_path = output_path + ".db.part"
         try:
-            # Create temporary directory for staging
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # Create directory structure
-                data_dir = os.path.join(temp_dir, "ExcelVerifier_Data")
-                os.makedirs(data_dir, exist_ok=True)
-                
-                files_added = 0
-                
-                # 1. Copy database
-                if os.path.exists(DATABASE_FILE):
-                    shutil.copy2(DATABASE_FILE, os.path.join(data_dir, "excelverifier.db"))
-                    files_added += 1
-                
-                # 2. Export companies from DB to JSON (optional backup)
-                companies = load_company_db(COMPANY_DB_FILE)
-                if companies:
-                    company_json_path = os.path.join(data_dir, "company_db.json")
-                    with open(company_json_path, "w", encoding="utf-8") as file_handle:
-                        json.dump(companies, file_handle, ensure_ascii=False, indent=2)
-                    files_added += 1
+            # (source path or bytes, path in the archive)
+            entries = []
+            archived = set()
+
+            def add(source, arcname):
+                arcname = arcname.replace(os.sep, "/")
+                if arcname not in archived:
+                    archived.add(arcname)
+                    entries.append((source, arcname))
+
+            # 1. Database snapshot
+            if os.path.exists(DATABASE_FILE):
+                self.db.snapshot(snapshot_path)
+                add(snapshot_path, f"{EXPORT_ROOT}/excelverifier.db")
+            
+            # 2. Export companies from DB to JSON (optional backup)
+            companies = load_company_db(COMPANY_DB_FILE)
+            if companies:
+                add(json.dumps(companies, ensure_ascii=False, indent=2).encode("utf-8"),
+                    f"{EXPORT_ROOT}/company_db.json")
+            
+            # 3. Settings
+            settings_file = "settings.json"
+            if os.path.exists(settings_file):
+                add(settings_file, f"{EXPORT_ROOT}/settings.json")
+            
+            # 4. All Excel files and images from Reports directory
+            approved_parent = os.path.dirname(APPROVED_DIRECTORY)
+            if os.path.exists(APPROVED_DIRECTORY):
+                # Get all approved records to know which files to backup
+                records = self.db.get_all_approved_records()
+                linked_images = find_images(record['filepath'] for record in records)
                 
-                # 3. Copy settings
-                settings_file = "settings.json"
-                if os.path.exists(settings_file):
-                    shutil.copy2(settings_file, os.path.join(data_dir, "settings.json"))
-                    files_added += 1
+                for record in records:
+                    filepath = record['filepath']
+                    if os.path.exists(filepath):
+                        # Preserve directory structure
+                        add(filepath, os.path.join(EXPORT_ROOT, "Reports", os.path.relpath(filepath, approved_parent)))
+                        
+                        # Also export linked image if exists
+                        img_path = linked_images[filepath]
+                        if img_path:
+                            add(img_path, os.path.join(EXPORT_ROOT, "Reports", os.path.relpath(img_path, approved_parent)))
                 
-                # 4. Copy all Excel files and images from Reports directory
-                reports_backup = os.path.join(data_dir, "Reports")
-                copied_paths = set()
-                if os.path.exists(APPROVED_DIRECTORY):
-                    # Get all approved records to know which files to backup
-                    records = self.db.get_all_approved_records()
-                    
-                    for record in records:
-                        filepath = record['filepath']
-                        if os.path.exists(filepath):
-                            # Preserve directory structure
-                            rel_path = os.path.relpath(filepath, os.path.dirname(APPROVED_DIRECTORY))
-                            dest_path = os.path.join(reports_backup, rel_path)
-                            if dest_path not in copied_paths:
-                                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-                                shutil.copy2(filepath, dest_path)
-                                copied_paths.add(dest_path)
-                                files_added += 1
-                            
-                            # Also copy linked image if exists
-                            excel_dir = os.path.dirname(filepath)
-                            excel_base = os.path.splitext(os.path.basename(filepath))[0]
-                            for ext in ['.jpg', '.jpeg', '.png', '.bmp']:
-                                img_path = os.path.join(excel_dir, excel_base + ext)
-                                if os.path.exists(img_path):
-                                    img_dest = os.path.join(reports_backup, os.path.relpath(img_path, os.path.dirname(APPROVED_DIRECTORY)))
-                                    if img_dest not in copied_paths:
-                                        os.makedirs(os.path.dirname(img_dest), exist_ok=True)
-                                        shutil.copy2(img_path, img_dest)
-                                        copied_paths.add(img_dest)
-                                        files_added += 1
-                                    break
-                    
-                    # Also scan approved directory in case database is empty
-                    for root, dirs, files in os.walk(APPROVED_DIRECTORY):
-                        for file in files:
-                            if not file.lower().endswith(('.xlsx', '.xls')):
-                                continue
+                # Also scan approved directory in case database is empty
+                for root, dirs, files in os.walk(APPROVED_DIRECTORY):
+                    for file in files:
+                        if not file.lower().endswith(('.xlsx', '.xls')):
+                            continue
+                        src = os.path.join(root, file)
+                        add(src, os.path.join(EXPORT_ROOT, "Reports", os.path.relpath(src, approved_parent)))
+                        
+                        img_path = find_image(src)
+                        if img_path:
+                            add(img_path, os.path.join(EXPORT_ROOT, "Reports", os.path.relpath(img_path, approved_parent)))
+            
+            # 5. Unapproved reports
+            if os.path.exists(REPORTS_ROOT):
+                reports_parent = os.path.dirname(REPORTS_ROOT)
+                for root, dirs, files in os.walk(REPORTS_ROOT):
+                    for file in files:
+                        if file.endswith('.xlsx'):
                             src = os.path.join(root, file)
-                            rel_path = os.path.relpath(src, os.path.dirname(APPROVED_DIRECTORY))
-                            dest_path = os.path.join(reports_backup, rel_path)
-                            if dest_path not in copied_paths:
-                                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-                                shutil.copy2(src, dest_path)
-                                copied_paths.add(dest_path)
-                                files_added += 1
+                            add(src, os.path.join(EXPORT_ROOT, os.path.relpath(src, reports_parent)))
                             
-                            base_name = os.path.splitext(file)[0]
-                            for ext in ['.jpg', '.jpeg', '.png', '.bmp']:
-                                img_path = os.path.join(root, base_name + ext)
-                                if os.path.exists(img_path):
-                                    img_dest = os.path.join(reports_backup, os.path.relpath(img_path, os.path.dirname(APPROVED_DIRECTORY)))
-                                    if img_dest not in copied_paths:
-                                        os.makedirs(os.path.dirname(img_dest), exist_ok=True)
-                                        shutil.copy2(img_path, img_dest)
-                                        copied_paths.add(img_dest)
-                                        files_added += 1
-                                    break
-                
-                # 5. Copy unapproved reports
-                if os.path.exists(REPORTS_ROOT):
-                    for root, dirs, files in os.walk(REPORTS_ROOT):
-                        for file in files:
-                            if file.endswith('.xlsx'):
-                                src = os.path.join(root, file)
-                                rel_path = os.path.relpath(src, os.path.dirname(REPORTS_ROOT))
-                                dest = os.path.join(data_dir, rel_path)
-                                os.makedirs(os.path.dirname(dest), exist_ok=True)
-                                shutil.copy2(src, dest)
-                                files_added += 1
-                                
-                                # Copy linked image
-                                base_name = os.path.splitext(file)[0]
-                                for ext in ['.jpg', '.jpeg', '.png', '.bmp']:
-                                    img_src = os.path.join(root, base_name + ext)
-                                    if os.path.exists(img_src):
-                                        img_dest = os.path.join(data_dir, os.path.relpath(img_src, os.path.dirname(REPORTS_ROOT)))
-                                        os.makedirs(os.path.dirname(img_dest), exist_ok=True)
-                                        shutil.copy2(img_src, img_dest)
-                                        files_added += 1
-                                        break
-                
-                # Create zip file
-                shutil.make_archive(output_path.replace('.zip', ''), 'zip', temp_dir)
-                
-                # Get file size
-                zip_size = os.path.getsize(output_path) / (1024 * 1024)  # MB
-                
-                return True, f"Eksport zakończony!\n\nPliki: {files_added}\nRozmiar: {zip_size:.1f} MB\nLokalizacja: {output_path}"
+                            # Linked image
+                            img_src = find_image(src)
+                            if img_src:
+                                add(img_src, os.path.join(EXPORT_ROOT, os.path.relpath(img_src, reports_parent)))
+            
+            # Write the zip file (renamed into place only when complete)
+            _write_zip(partial_path, entries, progress_callback)
+            os.replace(partial_path, output_path)
+            
+            # Get file size
+            zip_size = os.path.getsize(output_path) / (1024 * 1024)  # MB
+            
+            return True, f"Eksport zakończony!\n\nPliki: {len(entries)}\nRozmiar: {zip_size:.1f} MB\nLokalizacja: {output_path}"
                 
         except Exception as e:
+            if os.path.exists(partial_path):
+                try:
+                    os.remove(partial_path)
+                except OSError:
+                    pass
             return False, f"Błąd eksportu: {str(e)}"
+        finally:
+            if os.path.exists(snapshot_path):
+                try:
+                    os.remove(snapshot_path)
+                except OSError:
+                    pass
     
     def import_all_data(self, zip_path: str, merge: bool = False) -> Tuple[bool, str]:
         """
@@ -215,9 +240,12 @@ class ImportExportHandler:
                         # Merge databases
                         imported_items.append(self._merge_database(db_path))
                     else:
-                        # Replace database
-                        if os.path.exists(DATABASE_FILE):
-                            os.remove(DATABASE_FILE)
+                        # Replace database (pooled connections must not outlive the old file)
+                        DatabaseHandler.close_all(DATABASE_FILE)
+                        # A leftover WAL file would be replayed into the new database
+                        for path in (DATABASE_FILE, DATABASE_FILE + "-wal", DATABASE_FILE + "-shm"):
+                            if os.path.exists(path):
+                                os.remove(path)
                         shutil.copy2(db_path, DATABASE_FILE)
                         imported_items.append("Baza danych zastąpiona")
                 
@@ -385,8 +413,9 @@ class ImportExportHandler:
             # Open source database
             source_db = DatabaseHandler(source_db_path)
             
-            # Get all records from source
+            # Get all records from source (and release the temp file right away)
             approved_records = source_db.get_all_approved_records()
+            DatabaseHandler.close_all(source_db_path)
             
             # Import into current database
             added = 0
@@ -503,18 +532,15 @@ class ImportExportHandler:
                     
                     # Find and copy associated image
                     source_dir = os.path.dirname(filepath_str)
-                    base_name = os.path.splitext(filename_str)[0]
                     
                     image_copied = False
-                    for ext in ['.jpg', '.jpeg', '.png', '.bmp', '.JPG', '.JPEG', '.PNG', '.BMP']:
-                        img_src = os.path.join(source_dir, base_name + ext)
-                        if os.path.exists(img_src):
-                            img_dest = os.path.join(dest_dir, base_name + os.path.splitext(img_src)[1])
-                            if not os.path.exists(img_dest):
-                                shutil.copy2(img_src, img_dest)
-                                images_copied += 1
-                            image_copied = True
-                            break
+                    img_src = find_image(os.path.join(source_dir, filename_str))
+                    if img_src:
+                        img_dest = os.path.join(dest_dir, os.path.basename(img_src))
+                        if not os.path.exists(img_dest):
+                            shutil.copy2(img_src, img_dest)
+                            images_copied += 1
+                        image_copied = True
                     
                     # Add to database with normalized schema
                     # 1. Get or create company
@@ -582,6 +608,7 @@ class ImportExportHandler:
             
             if not excel_files:
                 return False, "Nie znaleziono plików Excel w folderze"
+            linked_images = find_images(excel_files)
             
             imported = 0
             errors = []
@@ -618,13 +645,9 @@ class ImportExportHandler:
                         shutil.copy2(excel_path, dest_path)
                         
                         # Copy linked image
-                        base_name = os.path.splitext(filename)[0]
-                        for ext in ['.jpg', '.jpeg', '.png', '.bmp']:
-                            img_src = os.path.join(os.path.dirname(excel_path), base_name + ext)
-                            if os.path.exists(img_src):
-                                img_dest = os.path.join(dest_dir, base_name + ext)
-                                shutil.copy2(img_src, img_dest)
-                                break
+                        img_src = linked_images[excel_path]
+                        if img_src:
+                            shutil.copy2(img_src, os.path.join(dest_dir, os.path.basename(img_src)))
                         
                         # Add to database
                         self.db.add_approved_record(
@@ -639,13 +662,9 @@ class ImportExportHandler:
                         shutil.copy2(excel_path, dest_path)
                         
                         # Copy linked image
-                        base_name = os.path.splitext(filename)[0]
-                        for ext in ['.jpg', '.jpeg', '.png', '.bmp']:
-                            img_src = os.path.join(os.path.dirname(excel_path), base_name + ext)
-                            if os.path.exists(img_src):
-                                img_dest = os.path.join(REPORTS_ROOT, base_name + ext)
-                                shutil.copy2(img_src, img_dest)
-                                break
+                        img_src = linked_images[excel_path]
+                        if img_src:
+                            shutil.copy2(img_src, os.path.join(REPORTS_ROOT, os.path.basename(img_src)))
                     
                     imported += 1
                     
@@ -0,0 +1,145 @@
+"""
+Pivot stage of the Butlo-dni report.
+Writes static, pre-aggregated equivalents of the report pivot tables with
+openpyxl, so report generation does not need Excel (win32com) and runs headless.
+
+Each pivot sheet is a flat table grouped by its page and row fields:
+- page fields become the leading columns, filterable through the autofilter
+  (the same role as the pivot's page-field drop-downs),
+- row 1 holds SUBTOTAL totals of the data fields, which follow the filter.
+"""
+
+import pandas as pd
+from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
+from openpyxl.utils import get_column_letter
+
+
+# Created in this order; each sheet is inserted in front of the previous one,
+# like Sheets.Add() did in Excel, so the last one ends up first and active.
+PIVOT_SPECS = [
+    {
+        'name': 'rotacja_1',
+        'source': 'Podsumowanie butlodni',
+        'page_fields': ['Miesiąc', 'NIP', 'Odbiorca'],
+        'row_fields': ['Nazwa', 'Stan bieżący', 'Stan'],
+        'data_fields': [('Butlo-dni', 'Suma Butlo-dni', '0.00'), ('rotacja', 'Sum of rotacja', '0')],
+        'column_width': None,
+    },
+    {
+        'name': 'Raport butlodni',
+        'source': 'Podsumowanie butlodni',
+        'page_fields': ['Odbiorca', 'NIP', 'Miesiąc'],
+        'row_fields': ['Nazwa', 'Data początkowa', 'Data końcowa', 'Stan'],
+        'data_fields': [('Butlo-dni', 'Suma Butlo-dni', '0.00'), ('rotacja', 'Suma rotacja', '0')],
+        'column_width': 18,
+    },
+    {
+        'name': 'Rotacja',
+        'source': 'Rotacja Source',
+        'page_fields': ['Miesiąc', 'NIP', 'Odbiorca'],
+        'row_fields': ['Nazwa', 'Stan'],
+        'data_fields': [('Butlo-dni', 'Suma Butlo-dni', '0.00'), ('rotacja', 'Sum of rotacja', '0')],
+        'column_width': None,
+    },
+    {
+        'name': 'Rotacja_2',
+        'source': 'Daily Data',
+        'page_fields': ['Odbiorca', 'NIP', 'Data'],
+        'row_fields': ['Nazwa', 'Stan', 'Stan bieżący'],
+        'data_fields': [('rotacja', 'Sum of rotacja', '0')],
+        'column_width': None,
+    },
+]
+
+HEADER_ROW = 3
+HEADER_FILL = PatternFill(start_color="DCE6F1", end_color="DCE6F1", fill_type="solid")
+HEADER_BORDER = Border(bottom=Side(style="thin"))
+
+
+def aggregate_pivot(source: pd.DataFrame, spec: dict) -> pd.DataFrame:
+    """
+    Sums the data fields of source per combination of page and row fields.
+    Missing keys (e.g. empty NIP) are kept as their own group, like "(blank)" in a pivot.
+    """
+    keys = spec['page_fields'] + spec['row_fields']
+    values = [field for field, _, _ in spec['data_fields']]
+    if source.empty:
+        return pd.DataFrame(columns=keys + values)
+
+    table = source.groupby(keys, dropna=False, sort=True, as_index=False)[values].sum()
+    return table[keys + values]
+
+
+def write_pivot_sheet(workbook, table: pd.DataFrame, spec: dict):
+    """Writes one aggregated pivot table as a new sheet at the front of the workbook."""
+    ws = workbook.create_sheet(spec['name'], 0)
+
+    keys = spec['page_fields'] + spec['row_fields']
+    captions = [caption for _, caption, _ in spec['data_fields']]
+    formats = [number_format for _, _, number_format in spec['data_fields']]
+    n_cols = len(keys) + len(captions)
+    first_data_col = len(keys) + 1
+    last_row = HEADER_ROW + max(len(table), 1)
+
+    # Totals row (SUBTOTAL 109 ignores rows hidden by the autofilter)
+    ws.cell(row=1, column=1, value="Suma końcowa").font = Font(bold=True)
+    for offset, number_format in enumerate(formats):
+        col = first_data_col + offset
+        letter = get_column_letter(col)
+        cell = ws.cell(row=1, column=col, value=f"=SUBTOTAL(109,{letter}{HEADER_ROW + 1}:{letter}{last_row})")
+        cell.font = Font(bold=True)
+        cell.number_format = number_format
+
+    for col, title in enumerate(keys + captions, start=1):
+        cell = ws.cell(row=HEADER_ROW, column=col, value=title)
+        cell.font = Font(bold=True)
+        cell.fill = HEADER_FILL
+        cell.border = HEADER_BORDER
+        cell.alignment = Alignment(wrap_text=True, vertical="center")
+
+    for row_idx, values in enumerate(table.itertuples(index=False, name=None), start=HEADER_ROW + 1):
+        for col, value in enumerate(values, start=1):
+            if value is not None and pd.isna(value):
+                value = None
+            elif hasattr(value, 'item'):
+                value = value.item()  # NumPy scalar -> Python
+            cell = ws.cell(row=row_idx, column=col, value=value)
+            if col >= first_data_col:
+                cell.number_format = formats[col - first_data_col]
+
+    ws.auto_filter.ref = f"A{HEADER_ROW}:{get_column_letter(n_cols)}{last_row}"
+    ws.freeze_panes = ws.cell(row=HEADER_ROW + 1, column=1)
+
+    for col, title in enumerate(keys + captions, start=1):
+        width = spec['column_width'] or max(12, min(40, len(str(title)) + 4))
+        ws.column_dimensions[get_column_letter(col)].width = width
+
+    return ws
+
+
+def write_pivot_sheets(workbook, sources: dict, hide_sources: bool = True):
+    """
+    Adds all PIVOT_SPECS sheets to an openpyxl workbook.
+
+    Args:
+        workbook: openpyxl Workbook (e.g. pd.ExcelWriter(...).book)
+        sources: Sheet name -> DataFrame that was written to that sheet
+        hide_sources: Hide the source data sheets, as the COM version did
+    """
+    for spec in PIVOT_SPECS:
+        source = sources.get(spec['source'])
+        if source is None:
+            print(f"⚠ Warning: Missing source sheet '{spec['source']}' for pivot '{spec['name']}'")
+            continue
+        table = aggregate_pivot(source, spec)
+        write_pivot_sheet(workbook, table, spec)
+        print(f"✓ {spec['name']} pivot sheet created ({len(table)} rows).")
+
+    if hide_sources:
+        for name in sources:
+            if name in workbook.sheetnames:
+                workbook[name].sheet_state = 'hidden'
+
+    workbook.active = 0
+    for ws in workbook.worksheets:
+        ws.sheet_view.tabSelected = ws is workbook.active
@@ -0,0 +1,100 @@
+"""
+Stock validation of delivery-note tables: Stan poprzedni (F) + Dostawa (C)
+- Zwrot (E) must equal Stan po wymianie (G), compared at 2 decimals.
+
+The check works on whole columns at once (NumPy), so the report writer, the
+editor's save and batch revalidation of many reports share one kernel:
+parse the four columns, compute the error mask, colour the returned rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+# 0-based column positions in a report table (A = Lp)
+COL_DELIVERY = 2    # C - Dostawa
+COL_RETURN = 4      # E - Zwrot
+COL_PREVIOUS = 5    # F - Stan poprzedni
+COL_CURRENT = 6     # G - Stan po wymianie
+STOCK_COLUMNS = (COL_DELIVERY, COL_RETURN, COL_PREVIOUS, COL_CURRENT)
+
+
+def _to_number(value) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).strip().replace(",", "."))
+    except ValueError:
+        return np.nan
+
+
+def parse_numbers(values) -> np.ndarray:
+    """
+    Column of cell values -> float64 array, NaN for empty or non-numeric cells
+    (None, "", "—", "-", text). Accepts Polish decimal commas.
+
+    Report columns repeat the same few values, so only the distinct values
+    are parsed and the result is gathered back by code.
+    """
+    codes, uniques = pd.factorize(np.asarray(list(values), dtype=object))
+    parsed = np.array([_to_number(value) for value in uniques] + [np.nan], dtype=np.float64)
+    return parsed[codes]  # code -1 (None) -> the trailing NaN
+
+
+def expected_stock(delivery, returned, previous) -> np.ndarray:
+    """
+    Expected Stan po wymianie per row: F + C - E with missing values counted
+    as 0, NaN when C, E and F are all empty (nothing to check).
+    """
+    delivery, returned, previous = (np.asarray(a, dtype=np.float64) for a in (delivery, returned, previous))
+    expected = np.nan_to_num(previous) + np.nan_to_num(delivery) - np.nan_to_num(returned)
+    expected[np.isnan(delivery) & np.isnan(returned) & np.isnan(previous)] = np.nan
+    return expected
+
+
+def stock_mismatch_mask(delivery, returned, previous, current) -> np.ndarray:
+    """Boolean mask of rows whose Stan po wymianie differs from the expected value."""
+    current = np.asarray(current, dtype=np.float64)
+    expected = expected_stock(delivery, returned, previous)
+    checked = ~np.isnan(expected) & ~np.isnan(current)
+    return checked & (np.round(current, 2) != np.round(expected, 2))
+
+
+def stock_mismatches(delivery, returned, previous, current) -> np.ndarray:
+    """Indices of the rows to colour red (positions in the given columns)."""
+    return np.flatnonzero(stock_mismatch_mask(delivery, returned, previous, current))
+
+
+def table_columns(rows):
+    """
+    Parsed (delivery, returned, previous, current) columns of row-oriented
+    table data; short rows count as empty in the missing columns.
+    """
+    frame = pd.DataFrame(list(rows), dtype=object)
+    return tuple(
+        parse_numbers(frame[col]) if col in frame.columns else np.full(len(frame), np.nan)
+        for col in STOCK_COLUMNS
+    )
+
+
+def table_mismatches(rows) -> np.ndarray:
+    """Indices of the mismatched rows of row-oriented table data (data rows only)."""
+    if not rows:
+        return np.empty(0, dtype=np.intp)
+    return stock_mismatches(*table_columns(rows))
+
+
+def batch_mismatches(tables) -> list:
+    """
+    Validate many tables in one kernel call.
+
+    Args:
+        tables: Row-oriented data rows of each report.
+
+    Returns:
+        One array of mismatched row indices per table.
+    """
+    tables = [list(rows) for rows in tables]
+    mismatched = table_mismatches([row for rows in tables for row in rows])
+    starts = np.cumsum([0] + [len(rows) for rows in tables])
+    parts = np.split(mismatched, np.searchsorted(mismatched, starts[1:-1]))
+    return [part - start for part, start in zip(parts, starts[:-1])]
@@ -1,6 +1,7 @@
 # main.py
 import sys
 import os
+import multiprocessing
 
 # Set Qt plugin path BEFORE importing PyQt5
 if hasattr(sys, 'frozen'):
@@ -17,15 +18,26 @@ else:
 
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import Qt
+from config import DATABASE_FILE, DATABASE_SETTINGS
+from core.database_handler import DatabaseHandler
+from core.image_preprocess import shutdown_preprocess_pool
 from ui.main_window import VerifyApp
 
 if __name__ == "__main__":
+    # Image preprocessing runs in a process pool; required for the frozen exe
+    multiprocessing.freeze_support()
+
     # Enable High DPI scaling for better display on different screen sizes
     QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
     QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
     
     app = QApplication(sys.argv)
+    DatabaseHandler.configure(DATABASE_FILE, DATABASE_SETTINGS)
     # This now loads the MainWindow with the Menu Bar
     window = VerifyApp() 
     window.showMaximized()
-    sys.exit(app.exec_())
\ No newline at end of file
+    exit_code = app.exec_()
+    # Closing the last connection also checkpoints and removes the WAL file
+    DatabaseHandler.close_all()
+    shutdown_preprocess_pool()
+    sys.exit(exit_code)
\ No newline at end of file
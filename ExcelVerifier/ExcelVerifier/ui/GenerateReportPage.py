@@ -28,6 +28,9 @@ class ReportWorker(QThread):
             self.finished.emit(True, f"Raport wygenerowany pomyślnie:\n{result}")
         except Exception as e:
             self.finished.emit(False, f"Błąd generowania raportu:\n{str(e)}")
+        finally:
+            # The worker thread read through its own pooled connection; release it
+            self.excel_handler.db.close()
 
 
 class GenerateReportPage(QWidget):
@@ -1,8 +1,8 @@
 import os
 import glob
 import shutil
-from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import functools
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QPushButton, QLabel, QListWidget, 
     QListWidgetItem, QMessageBox, QHBoxLayout, QFrame, 
@@ -10,65 +10,14 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QIcon, QPixmap, QTransform, QPainter, QColor, QPen, QPainterPath
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QSize, QRectF
-from PIL import Image, ImageChops
 
 # Ensure you have these modules in your project
 from core.image_transformer import ImageTransformer
+from core.extraction_pipeline import ExtractionPipeline, PREPROCESSING_ERROR
+from core.image_preprocess import prepare_for_upload, get_preprocess_pool
 import config
 
 
-def trim_whitespace(path: str, out_path: str = None, bg_threshold: int = 250, margin: int = 0):
-    """
-    Trim white borders from an image (optimized for speed).
-    Returns the path to the trimmed image.
-    """
-    img = Image.open(path).convert("RGB")
-    
-    # OPTIMIZATION: Work on smaller version for speed (4x faster)
-    max_size = 2000
-    original_size = img.size
-    if max(img.size) > max_size:
-        scale = max_size / max(img.size)
-        new_size = (int(img.width * scale), int(img.height * scale))
-        img_small = img.resize(new_size, Image.LANCZOS)
-    else:
-        img_small = img
-        scale = 1.0
-    
-    # Detect white borders on smaller image
-    bg = Image.new("RGB", img_small.size, (255, 255, 255))
-    diff = ImageChops.difference(img_small, bg)
-    diff = ImageChops.add(diff, diff, 2.0, 0)
-    diff = diff.point(lambda p: 255 if p > (255 - bg_threshold) else 0)
-    bbox = diff.getbbox()
-    
-    if not bbox:
-        # Image appears fully white; return original
-        return path
-    
-    # Scale bounding box back to original size
-    if scale != 1.0:
-        left, top, right, bottom = bbox
-        bbox = (
-            int(left / scale),
-            int(top / scale),
-            int(right / scale),
-            int(bottom / scale)
-        )
-    
-    if margin:
-        left, top, right, bottom = bbox
-        left = max(left - margin, 0)
-        top = max(top - margin, 0)
-        right = min(right + margin, original_size[0])
-        bottom = min(bottom + margin, original_size[1])
-        bbox = (left, top, right, bottom)
-    
-    cropped = img.crop(bbox)
-    out = out_path or str(Path(path).with_name(f"{Path(path).stem}_trimmed{Path(path).suffix}"))
-    cropped.save(out)
-    return out
-
 # --- 1. Custom Icon Painter (Sharp & Proportional) ---
 def create_painted_icon(name, color_hex="#374151", size=64):
     """Draws sharp, proportional vector icons."""
@@ -224,41 +173,53 @@ class DropZone(QFrame):
 
 # --- 5. Worker Thread ---
 class TransformWorker(QThread):
-    progress, finished, error = pyqtSignal(int, int), pyqtSignal(list), pyqtSignal(str)
-    def __init__(self, paths, folder=None, max_workers=3): 
+    # finished: (results, preprocessing_failures)
+    progress, finished, error = pyqtSignal(int, int), pyqtSignal(list, list), pyqtSignal(str)
+    def __init__(self, paths, folder=None, max_workers=None, rotations=None):
         super().__init__()
         self.paths = paths
+        self.rotations = dict(rotations or {})  # {path: degrees clockwise}
         # Use REPORTS_ROOT (Niezatwierdzone) so files appear in verification tab
         self.folder = folder or config.REPORTS_ROOT
-        self.max_workers = max_workers  # Process 2-3 images in parallel
+        self.options = dict(config.EXTRACTION_SETTINGS)
+        if max_workers:
+            self.options['max_in_flight'] = max_workers
     
     def run(self):
         try:
             t = ImageTransformer()
-            res = []
-            completed = 0
+            pipeline = ExtractionPipeline(t, self.options)
+            write_lock = threading.Lock()
+
+            def write(p, result, image_data):
+                # One writer at a time: unique file names are picked by checking what exists
+                with write_lock:
+                    return t.write_report(p, result, self.folder, image_data=image_data)
+
+            # Rotation + trimming run in memory in the preprocessing process pool;
+            # all photos are extracted concurrently (rate-limited) and each Excel
+            # report is written as soon as its extraction finishes
+            outcomes = pipeline.run(
+                self.paths,
+                on_result=write,
+                progress_callback=self.progress.emit,
+                prepare=functools.partial(prepare_for_upload, rotations=self.rotations,
+                                          upload_options=config.UPLOAD_SETTINGS),
+                executor=get_preprocess_pool(),
+            )
+            print(pipeline.upload_summary())
+
+            res, preprocessing_failures = [], []
+            for p, value, error in outcomes:
+                if error is None:
+                    out, h = value
+                    res.append((p, True, out, h))
+                elif error.startswith(PREPROCESSING_ERROR):
+                    preprocessing_failures.append((p, error))
+                else:
+                    res.append((p, False, error, 0))
             
-            # Use ThreadPoolExecutor for parallel image processing (2-3 concurrent)
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                # Submit all tasks
-                future_to_path = {
-                    executor.submit(t.process_image_file, p, self.folder): p 
-                    for p in self.paths
-                }
-                
-                # Collect results as they complete
-                for future in as_completed(future_to_path):
-                    p = future_to_path[future]
-                    completed += 1
-                    self.progress.emit(completed, len(self.paths))
-                    
-                    try:
-                        out, h = future.result()
-                        res.append((p, True, out, h))
-                    except Exception as e:
-                        res.append((p, False, str(e), 0))
-            
-            self.finished.emit(res)
+            self.finished.emit(res, preprocessing_failures)
         except Exception as e:
             self.error.emit(str(e))
 
@@ -482,96 +443,34 @@ class TransformPage(QWidget):
         if not config.get_gemini_api_key():
             return QMessageBox.critical(self, "Błąd", "GEMINI_API_KEY nie został ustawiony")
         
-        import time
-        timestamp = int(time.time() * 1000)  # Unique timestamp for this batch
-        
-        fl, tmp, preprocessing_failures = [], [], []
-        for idx, p in enumerate(self.selected_images):
-            r = self.image_rotations.get(p, 0)
-            try:
-                # Start with the original image
-                current_path = p
-                
-                # Step 1: Apply rotation if needed and save to temp file
-                if r != 0:
-                    img = Image.open(p)
-                    # Rotate in correct direction (negative because UI rotation is opposite)
-                    rotated_img = img.rotate(-r, expand=True)
-                    # Create unique temp filename with timestamp and index
-                    base_name = os.path.splitext(os.path.basename(p))[0]
-                    ext = os.path.splitext(p)[1]
-                    rotated_path = os.path.join(os.path.dirname(p), f"tmp_{timestamp}_{idx}_rotated_{base_name}{ext}")
-                    rotated_img.save(rotated_path)
-                    current_path = rotated_path
-                    tmp.append(rotated_path)
-                    print(f"Rotated {os.path.basename(p)} by {r}° → {os.path.basename(rotated_path)}")
-                
-                # Step 2: Apply whitespace trimming
-                base_name = os.path.splitext(os.path.basename(current_path))[0]
-                ext = os.path.splitext(current_path)[1]
-                trimmed_path_target = os.path.join(os.path.dirname(current_path), f"tmp_{timestamp}_{idx}_trimmed_{base_name}{ext}")
-                trimmed_path = trim_whitespace(current_path, out_path=trimmed_path_target)
-                
-                if trimmed_path != current_path:
-                    # Trimming created a new file
-                    tmp.append(trimmed_path)
-                    current_path = trimmed_path
-                    print(f"Trimmed whitespace → {os.path.basename(trimmed_path)}")
-                
-                # Add final processed path to list for AI processing
-                fl.append(current_path)
-            except Exception as e:
-                error_msg = f"Preprocessing error: {str(e)}"
-                print(f"Error processing {p}: {error_msg}")
-                preprocessing_failures.append((p, error_msg))
-                # Don't add to fl - skip AI processing for failed preprocessing
-        
-        total_images = len(self.selected_images)
-        processing_count = len(fl)
+        # Rotation and trimming happen in the worker (in memory, no temp files)
+        paths = list(self.selected_images)
+        rotations = {p: self.image_rotations[p] for p in paths if self.image_rotations.get(p, 0)}
         
-        if preprocessing_failures:
-            msg = f"Przetwarzanie {processing_count} zdjęć ({len(preprocessing_failures)} niepowodzenia wstępne)..."
-        else:
-            msg = f"Przetwarzanie {processing_count} zdjęć..."
-        
-        self.pd = QProgressDialog(msg, "Anuluj", 0, processing_count, self)
+        self.pd = QProgressDialog(f"Przetwarzanie {len(paths)} zdjęć...", "Anuluj", 0, len(paths), self)
         self.pd.setWindowModality(Qt.NonModal)  # Allow user to navigate while processing
         self.pd.setWindowFlags(Qt.Window | Qt.WindowStaysOnTopHint)  # Keep on top so it's visible
         self.pd.setAutoClose(True)
         self.pd.setAutoReset(True)
         self.pd.show()
         
-        self.worker = TransformWorker(fl, max_workers=3)
+        self.worker = TransformWorker(paths, rotations=rotations)
         self.worker.progress.connect(self.pd.setValue)
-        self.worker.finished.connect(lambda r: self.done(r, tmp, preprocessing_failures))
-        self.worker.error.connect(lambda e: self.handle_worker_error(e, tmp))
+        self.worker.finished.connect(self.done)
+        self.worker.error.connect(self.handle_worker_error)
         self.worker.start()
 
-    def handle_worker_error(self, error_msg, tmp):
+    def handle_worker_error(self, error_msg):
         """Handle worker thread errors."""
         if hasattr(self, 'pd') and self.pd:
             self.pd.close()
-        # Clean up temp files
-        for t in tmp:
-            try:
-                if os.path.exists(t):
-                    os.remove(t)
-            except Exception:
-                pass
-        QMessageBox.critical(self, "Błąd Przetwarzania", f"Błąd: {error_msg}")
+        QMessageBox.critical(self, "Błąd Przetwarzania", f"Błąd: {error_msg}")
     
-    def done(self, res, tmp, preprocessing_failures):
+    def done(self, res, preprocessing_failures):
         # Ensure progress dialog is closed
         if hasattr(self, 'pd') and self.pd:
             self.pd.close()
             self.pd = None
-        # Clean up temporary processing files (rotation and trimming temps)
-        for t in tmp:
-            try:
-                if os.path.exists(t):
-                    os.remove(t)
-            except Exception as e:
-                print(f"Could not delete temp file {t}: {e}")
         
         # Count successes and failures
         successes = [r for r in res if r[1]]
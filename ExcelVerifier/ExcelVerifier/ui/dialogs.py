@@ -19,10 +19,10 @@ from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
     QPushButton, QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox,
     QAbstractItemView, QCalendarWidget, QToolButton, QMenu, QWidgetAction,
-    QFrame, QWidget
+    QFrame, QWidget, QScrollArea
 )
 from PyQt5.QtCore import Qt, QLocale
-from PyQt5.QtGui import QIcon, QColor, QBrush
+from PyQt5.QtGui import QIcon, QColor, QBrush, QPixmap
 
 # --- Custom Calendar Button (Polish + White + Select Month) ---
 class DatePickerButton(QToolButton):
@@ -533,4 +533,22 @@ class UnapprovedReportsDialog(QDialog):
     
     def closeEvent(self, event):
         """Override close event to ensure dialog closes without affecting parent."""
-        event.accept()
\ No newline at end of file
+        event.accept()
+
+class FullImageDialog(QDialog):
+    """The photo of a report at full resolution, scrollable to read the details."""
+
+    def __init__(self, image, title, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.resize(1200, 800)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.image_label = QLabel()
+        self.image_label.setAlignment(Qt.AlignCenter)
+        self.image_label.setPixmap(QPixmap.fromImage(image))
+        scroll = QScrollArea()
+        scroll.setAlignment(Qt.AlignCenter)
+        scroll.setWidget(self.image_label)
+        layout.addWidget(scroll)
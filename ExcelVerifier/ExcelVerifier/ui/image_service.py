@@ -0,0 +1,140 @@
+"""
+Decoded photos for the verification image pane.
+
+A phone photo decoded at full resolution is ~50 MB (and QLabel kept a
+scaled copy next to it). The pane never shows more than a screen's worth
+of pixels, so photos are decoded once, off the GUI thread, straight to a
+screen-sized QImage with the EXIF orientation applied, and kept in a
+memory-bounded LRU keyed by path and mtime. The full resolution is decoded
+only when the user opens the photo (full_image).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import Qt, QObject, pyqtSignal
+from PyQt5.QtGui import QImageReader
+from PyQt5.QtWidgets import QApplication
+
+from core.file_stamp import file_stamp
+
+DEFAULT_IMAGE_SIZE = 1440            # px, longest edge when there is no screen to measure
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def decode_image(path, max_side=None):
+    """
+    Decode a photo into a QImage with its EXIF orientation applied, at most
+    max_side px on the longest edge (None = full resolution). Returns None
+    when it cannot be read. Safe outside the GUI thread (unlike QPixmap).
+    """
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    size = reader.size()
+    if max_side and size.isValid() and max(size.width(), size.height()) > max_side:
+        # Decoders like JPEG scale while decoding, which is much faster
+        reader.setScaledSize(size.scaled(max_side, max_side, Qt.KeepAspectRatio))
+    image = reader.read()
+    return None if image.isNull() else image
+
+
+def screen_image_size():
+    """
+    Longest edge to decode photos to: the short side of the screen in device
+    pixels. The pane is at most that tall, and narrower than that for
+    landscape photos.
+    """
+    screen = QApplication.primaryScreen() if QApplication.instance() else None
+    if screen is None:
+        return DEFAULT_IMAGE_SIZE
+    size = screen.size() * screen.devicePixelRatio()
+    return max(min(size.width(), size.height()), 1024)
+
+
+def _cache_key(path):
+    stamp = file_stamp(path)
+    return None if stamp is None else (path,) + stamp
+
+
+class ImageService(QObject):
+    # (path, QImage or None) when a request()ed photo has been decoded
+    image_ready = pyqtSignal(str, object)
+
+    def __init__(self, max_side=None, max_bytes=DEFAULT_CACHE_BYTES, parent=None):
+        super().__init__(parent)
+        self.max_side = max_side or screen_image_size()
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()     # (path, mtime, size) -> QImage
+        self._bytes = 0
+        self._pending = {}               # path -> Future of a request()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-decode")
+
+    def cached(self, path):
+        """The decoded photo if it is in the cache and the file is unchanged, else None."""
+        key = _cache_key(path)
+        with self._lock:
+            image = self._images.get(key) if key else None
+            if image is not None:
+                self._images.move_to_end(key)
+        return image
+
+    def load(self, path):
+        """Decoded photo from the cache or decoded now (blocking; any thread)."""
+        image = self.cached(path)
+        if image is not None:
+            return image
+        key = _cache_key(path)
+        image = decode_image(path, self.max_side) if key else None
+        if image is not None:
+            self._store(key, image)
+        return image
+
+    def request(self, path):
+        """Decode a photo in the background; image_ready is emitted on the GUI thread."""
+        with self._lock:
+            if self._executor is None or path in self._pending:
+                return
+            self._pending[path] = self._executor.submit(self._decode_and_emit, path)
+
+    def full_image(self, path):
+        """The photo at full resolution (not cached: only for the full-size view)."""
+        return decode_image(path)
+
+    def cache_bytes(self):
+        with self._lock:
+            return self._bytes
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _decode_and_emit(self, path):
+        try:
+            image = self.load(path)
+        except Exception as e:
+            print(f"⚠ Warning: Could not decode {os.path.basename(path)}: {e}")
+            image = None
+        finally:
+            with self._lock:
+                self._pending.pop(path, None)
+        self.image_ready.emit(path, image)
+
+    def _store(self, key, image):
+        size = image.sizeInBytes()
+        with self._lock:
+            old = self._images.pop(key, None)
+            if old is not None:
+                self._bytes -= old.sizeInBytes()
+            # Older versions of the same file are never served again
+            for stale in [k for k in self._images if k[0] == key[0]]:
+                self._bytes -= self._images.pop(stale).sizeInBytes()
+            self._images[key] = image
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._images) > 1:
+                _, evicted = self._images.popitem(last=False)
+                self._bytes -= evicted.sizeInBytes()
@@ -20,6 +20,8 @@ class ImportExportWorker(QThread):
     """Worker thread for import/export operations."""
     finished = pyqtSignal(bool, str)
     progress = pyqtSignal(str)
+    # (done_bytes, total_bytes) of an export; object, as archives can exceed 2 GB
+    bytes_progress = pyqtSignal(object, object)
     
     def __init__(self, operation, **kwargs):
         super().__init__()
@@ -30,7 +32,8 @@ class ImportExportWorker(QThread):
     def run(self):
         try:
             if self.operation == "export":
-                success, message = self.handler.export_all_data(self.kwargs['output_path'])
+                success, message = self.handler.export_all_data(self.kwargs['output_path'],
+                                                                progress_callback=self.bytes_progress.emit)
             elif self.operation == "import":
                 success, message = self.handler.import_all_data(self.kwargs['zip_path'], self.kwargs.get('merge', False))
             elif self.operation == "import_excel":
@@ -210,8 +213,18 @@ class ImportExportDialog(QDialog):
         
         # Run export in worker thread
         self.worker = ImportExportWorker("export", output_path=output_path)
+        self.worker.bytes_progress.connect(lambda done, total: self._on_export_progress(done, total, progress))
         self.worker.finished.connect(lambda success, msg: self._on_operation_finished(success, msg, progress))
         self.worker.start()
+
+    def _on_export_progress(self, done, total, progress_dialog):
+        """Show how much of the data has been written to the archive."""
+        if not total:
+            return
+        progress_dialog.setMaximum(1000)
+        progress_dialog.setValue(int(done * 1000 / total))
+        mb = 1024 * 1024
+        progress_dialog.setLabelText(f"Eksportowanie danych... {done / mb:.1f} / {total / mb:.1f} MB")
     
     def import_zip(self):
         """Import data from ZIP archive."""
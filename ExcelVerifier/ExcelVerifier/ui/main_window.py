@@ -1,27 +1,31 @@
 import os
-import pandas as pd
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QSplitter, 
-    QPushButton, QLabel, QTableWidget, QTableWidgetItem, 
+    QPushButton, QLabel, QTableView,
     QSizePolicy, QMessageBox, QTabWidget, QDialog, QHeaderView,
     QAbstractItemView, QToolButton, QApplication, QProgressDialog,
     QAbstractScrollArea, QComboBox, QCompleter, QStyledItemDelegate,
     QLineEdit
 )
-from PyQt5.QtGui import QPixmap, QFont, QColor, QBrush
+from PyQt5.QtGui import QPixmap, QFont, QColor
 from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
 
 # Import logic classes
 from ui.styles import STYLESHEET
 from core.excel_handler import ExcelHandler
 from core.file_manager import FileManager
-from core.company_db import load_company_db
+from core.company_db import get_company_names, invalidate_company_cache
+from core.image_resolver import find_image
 import config
-from ui.dialogs import ApprovedReportsDialog, UnapprovedReportsDialog
+from ui.dialogs import ApprovedReportsDialog, UnapprovedReportsDialog, FullImageDialog
 from ui.TransformPicToExcelPage import TransformPage
 from ui.GenerateReportPage import GenerateReportPage
 from ui.settings_dialog import SettingsDialog
 from ui.import_export_dialog import ImportExportDialog
+from ui.report_table_model import ReportTableModel
+from ui.report_prefetcher import ReportPrefetcher
+from ui.image_service import ImageService
+from ui.report_watcher import ReportWatcher
 
 # --- WORKER THREAD: Reprocess Single Image ---
 class ReprocessWorker(QThread):
@@ -51,9 +55,11 @@ class AutoResizingLabel(QLabel):
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.setAlignment(Qt.AlignCenter)
         self._pixmap = None
+        self._scaled_size = None
 
     def setPixmap(self, pixmap):
         self._pixmap = pixmap
+        self._scaled_size = None
         self.update_view()
 
     def resizeEvent(self, event):
@@ -62,6 +68,10 @@ class AutoResizingLabel(QLabel):
 
     def update_view(self):
         if self._pixmap and not self._pixmap.isNull():
+            # Only rescale when the label size actually changed
+            if self._scaled_size == self.size():
+                return
+            self._scaled_size = self.size()
             scaled = self._pixmap.scaled(
                 self.size(), 
                 Qt.KeepAspectRatio, 
@@ -136,9 +146,26 @@ class VerificationPage(QWidget):
         # Preserve full header text to elide on resize
         self._full_file_name_text = "Excel: "
         self.company_list = []
+        self._normalized_companies = set()
+        # Screen-sized photos decoded off the GUI thread (full size only on click)
+        self.images = ImageService(parent=self)
+        self.images.image_ready.connect(self._on_image_ready)
+        # Parses the neighbouring reports in the background (next/prev is instant)
+        self.prefetcher = ReportPrefetcher(self.excel_handler.read_report, self.find_linked_image,
+                                           images=self.images)
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.prefetcher.shutdown)
+            app.aboutToQuit.connect(self.images.shutdown)
+        # Pushes reports added or removed on disk into the queue
+        self.report_watcher = ReportWatcher(self.file_manager, config.WATCHER_SETTINGS, parent=self)
+        self.report_watcher.reports_changed.connect(self._on_reports_changed)
+        if app is not None:
+            app.aboutToQuit.connect(self.report_watcher.stop)
 
         self.init_ui()
         self.load_unapproved_list()
+        self.report_watcher.start(self.unapproved_reports)
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -235,11 +262,17 @@ class VerificationPage(QWidget):
         left_layout.setSpacing(6)
         left_panel.setLayout(left_layout)
 
-        self.table = QTableWidget()
+        # Model/view: the model reads straight from the report DataFrame
+        self.table = QTableView()
+        self.table_model = ReportTableModel(self.table)
+        self.table_model.wrap_columns = {1}
+        self.table.setModel(self.table_model)
         self.table.horizontalHeader().setVisible(False)
         self.table.verticalHeader().setVisible(False)
         # Prevent auto-expansion from content: keep widths logic-controlled
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        # Column widths are capped anyway; size them from the first rows only
+        self.table.horizontalHeader().setResizeContentsPrecision(100)
         self.table.setWordWrap(True)
         self.table.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
         # Prevent contents from growing the window; allow scrolling instead
@@ -253,7 +286,9 @@ class VerificationPage(QWidget):
             QAbstractItemView.SelectedClicked |
             QAbstractItemView.EditKeyPressed
         )
-        self.table.itemChanged.connect(self._on_table_item_changed)
+        self.table_model.dataChanged.connect(self._on_table_data_changed)
+        self.odbiorca_delegate = OdbiorcaComboDelegate(self.company_list, self.table)
+        self.table.setItemDelegateForColumn(1, self.odbiorca_delegate)
         left_layout.addWidget(self.table, 1)
         self.splitter.addWidget(left_panel)
 
@@ -276,6 +311,9 @@ class VerificationPage(QWidget):
         self.image_label = AutoResizingLabel("Nie załadowano zdjęcia")
         self.image_label.setStyleSheet("border: 1px solid #E5E7EB; background-color: #F9FAFB;")
         self.image_label.setMinimumHeight(150)  # Ensure image doesn't shrink too small
+        self.image_label.setCursor(Qt.PointingHandCursor)
+        self.image_label.setToolTip("Kliknij, aby otworzyć zdjęcie w pełnej rozdzielczości")
+        self.image_label.mousePressEvent = lambda e: self.show_full_image()
         right_layout.addWidget(self.image_label, 1)  # Stretch factor 1
 
         # Controls
@@ -392,14 +430,9 @@ class VerificationPage(QWidget):
         return btn
     
     def find_linked_image(self, excel_path):
-        excel_dir = os.path.dirname(excel_path)
-        excel_base = os.path.splitext(os.path.basename(excel_path))[0]
-        
-        image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff']
-        for ext in image_extensions:
-            potential_image = os.path.join(excel_dir, excel_base + ext)
-            if os.path.exists(potential_image):
-                return potential_image
+        linked_image = find_image(excel_path)
+        if linked_image:
+            return linked_image
         
         if config.DEFAULT_IMAGE and os.path.exists(config.DEFAULT_IMAGE):
             return config.DEFAULT_IMAGE
@@ -407,6 +440,7 @@ class VerificationPage(QWidget):
 
     def load_unapproved_list(self):
         self.unapproved_reports = self.file_manager.get_unapproved_reports()
+        self.report_watcher.reset(self.unapproved_reports)
         if not self.unapproved_reports:
             self.nav_label.setText("0/0")
             self.show_empty_state()
@@ -415,6 +449,43 @@ class VerificationPage(QWidget):
         self.current_report_index = 0
         self.load_current_report()
     
+    def sync_reports(self):
+        """Pick up reports written elsewhere (e.g. the transform tab) without reloading the one on screen."""
+        if self.report_watcher.is_active():
+            self.report_watcher.sync_now()
+        else:
+            self.load_unapproved_list()
+
+    def _on_reports_changed(self, added, removed):
+        """Apply reports added or removed on disk to the queue, keeping the current report open."""
+        current = None
+        if self.unapproved_reports and self.current_report_index < len(self.unapproved_reports):
+            current = self.unapproved_reports[self.current_report_index]
+        removed = set(removed)
+        for path in removed:
+            self.prefetcher.invalidate(path)
+        reports = [p for p in self.unapproved_reports if p not in removed]
+        reports.extend(p for p in added if p not in reports)
+        reports.sort()
+        self.unapproved_reports = reports
+        if self.is_review_mode:
+            return  # The approved report on screen is not affected
+
+        if not reports:
+            self.nav_label.setText("0/0")
+            self.show_empty_state()
+        elif current in reports:
+            self.current_report_index = reports.index(current)
+            self.nav_label.setText(f"{self.current_report_index + 1}/{len(reports)}")
+            self._prefetch_neighbours(reports, self.current_report_index)
+        else:
+            # The report on screen is gone (or the queue was empty): show the one in its place
+            self.current_report_index = min(self.current_report_index, len(reports) - 1)
+            if current is None:
+                self.show_normal_view()
+                self.current_report_index = 0
+            self.load_current_report()
+
     def show_empty_state(self):
         self.info_widget.hide()
         self.splitter.hide()
@@ -516,109 +587,44 @@ class VerificationPage(QWidget):
         self._full_file_name_text = f"Excel: {file_name}"
         QTimer.singleShot(0, self.update_file_name_label_display)
         
-        linked_image = self.find_linked_image(path)
-        if linked_image:
-            pic_name = os.path.basename(linked_image)
-            self.picture_name_label.setText(f"🖼️ Zdjęcie: {pic_name}")
-        else:
-            self.picture_name_label.setText("🖼️ Brak zdjęcia")
-        
         try:
-            df = self.excel_handler.load_file(path)
-            style_map = self.excel_handler.get_formatting()
+            df, style_map, linked_image = self._read_report(path)
         except Exception as e:
             QMessageBox.critical(self, "Błąd", f"Załadowanie nie powiodło się: {e}")
             return
 
-        self.table.blockSignals(True)
-        self.table.clear()
-        self.table.setRowCount(len(df))
-        self.table.setColumnCount(len(df.columns))
-        self.table.setHorizontalHeaderLabels([f"Col {i+1}" for i in range(len(df.columns))])
-
-        for r in range(len(df)):
-            for c in range(len(df.columns)):
-                cell_value = df.iloc[r, c]
-                # Handle NaN, None, and empty values
-                if pd.isna(cell_value) or cell_value is None:
-                    val = ""
-                else:
-                    val = str(cell_value)
-                item = QTableWidgetItem(val)
-                
-                # Enable text wrapping for second column (index 1)
-                if c == 1:
-                    item.setTextAlignment(Qt.AlignLeft | Qt.AlignTop)
-                    item.setFlags(item.flags() | Qt.TextWordWrap)
-                
-                if (r, c) in style_map:
-                    style = style_map[(r, c)]
-                    if style['bg']: item.setBackground(QBrush(QColor(style['bg'])))
-                    if style['fg']: item.setForeground(QBrush(QColor(style['fg'])))
-                    if style.get('bold') or style.get('italic') or style.get('underline'):
-                        font = item.font()
-                        if style.get('bold'): font.setBold(True)
-                        if style.get('italic'): font.setItalic(True)
-                        if style.get('underline'): font.setUnderline(True)
-                        item.setFont(font)
-                self.table.setItem(r, c, item)
-
-            self._apply_company_selector()
-        
-        # 1. Resize columns to fit content (initial), then cap widths
-        self.table.resizeColumnsToContents()
+        if linked_image:
+            pic_name = os.path.basename(linked_image)
+            self.picture_name_label.setText(f"🖼️ Zdjęcie: {pic_name}")
+        else:
+            self.picture_name_label.setText("🖼️ Brak zdjęcia")
 
-        # 2. Limit second column (index 1 - Odbiorca) width to 420px for text wrapping
-        if self.table.columnCount() > 1:
-            self.table.setColumnWidth(1, 420)
+        self._show_report(df, style_map, odbiorca_width=420)
+        self._apply_company_selector()
 
-        # 3. Cap other columns and add small padding without inflating window
-        for c in range(self.table.columnCount()):
-            if c == 1:
-                continue
-            current_width = self.table.columnWidth(c)
-            # small padding, with max cap to avoid window growth
-            new_width = min(current_width + 8, 220)
-            self.table.setColumnWidth(c, new_width)
-        
-        # 4. Make first row (header) taller for better readability
-        if self.table.rowCount() > 0:
+        # Make first row (header) taller for better readability
+        if self.table_model.rowCount() > 0:
             self.table.setRowHeight(0, 75)
-        
-        # 5. Auto-resize all rows to fit wrapped text content
-        self.table.resizeRowsToContents()
-        
-        self.table.blockSignals(False)
+
         # Apply default 60:40 split after render unless user adjusted manually
         QTimer.singleShot(0, self.apply_default_split)
         QTimer.singleShot(0, self.clamp_table_width)
 
-        # Load linked image
-        self.current_image_path = self.find_linked_image(path)
-        if self.current_image_path and os.path.exists(self.current_image_path):
-            pix = QPixmap(self.current_image_path)
-            self.image_label.setPixmap(pix)
-        else:
-            self.image_label.setText("No image available")
-            self.image_label.setPixmap(None)
+        self._show_image(linked_image, "Brak dostępnego zdjęcia")
+
+        self._prefetch_neighbours(self.unapproved_reports, self.current_report_index)
 
     def save_changes(self):
-        rows = self.table.rowCount()
-        cols = self.table.columnCount()
-        data = [] 
-        for r in range(rows):
-            row_data = []
-            for c in range(cols):
-                item = self.table.item(r, c)
-                text = item.text() if item else ""
-                # Ensure "nan" string is converted to empty
-                if text.lower() == "nan":
-                    text = ""
-                row_data.append(text)
-            data.append(row_data)
-        
+        # Only the cells edited since the report was loaded are written back
+        changes = self.table_model.dirty_cells()
+        if not changes:
+            QMessageBox.information(self, "Zapisano", "Brak zmian do zapisania.")
+            return
+
+        # The cached workbook is the one save_data modifies
+        self.prefetcher.invalidate(self.current_excel_path)
         try:
-            self.excel_handler.save_data(data)
+            self.excel_handler.save_data(changes)
             
             # Check if file path changed (due to company name reorganization)
             new_file_path = self.excel_handler.file_path
@@ -638,51 +644,101 @@ class VerificationPage(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "Błąd", str(e))
 
-    def _apply_company_selector(self):
-        if self.table.rowCount() == 0 or self.table.columnCount() < 2:
+    def _read_report(self, path):
+        """
+        (df, style_map, image_path) of a report: from the prefetcher when it
+        has it, otherwise parsed here. Makes the report current in excel_handler.
+        """
+        report = self.prefetcher.take(path)
+        if report is not None:
+            df = self.excel_handler.use_report(path, report['workbook'], report['df'])
+            return df, report['style_map'], report['image_path']
+
+        df = self.excel_handler.load_file(path)
+        style_map = self.excel_handler.get_formatting()
+        return df, style_map, self.find_linked_image(path)
+
+    def _show_image(self, image_path, missing_text):
+        """Show the photo of the current report: from the image cache or decoded in the background."""
+        self.current_image_path = image_path
+        image = self.images.cached(image_path) if image_path else None
+        if image is not None:
+            self.image_label.setPixmap(QPixmap.fromImage(image))
             return
+        # setPixmap(None) clears the label, so the text goes second
+        self.image_label.setPixmap(None)
+        if image_path and os.path.exists(image_path):
+            self.image_label.setText("Ładowanie zdjęcia...")
+            self.images.request(image_path)
+        else:
+            self.image_label.setText(missing_text)
 
-        self.company_list = self._load_company_names()
-        odbiorca_item = self.table.item(0, 1)
-        odbiorca_value = odbiorca_item.text() if odbiorca_item else ""
+    def _on_image_ready(self, image_path, image):
+        if image_path != self.current_image_path:
+            return  # The user has moved on to another report
+        if image is None:
+            self.image_label.setPixmap(None)
+            self.image_label.setText("Nie można wczytać zdjęcia")
+        else:
+            self.image_label.setPixmap(QPixmap.fromImage(image))
 
-        delegate = OdbiorcaComboDelegate(self.company_list, self.table)
-        self.table.setItemDelegateForColumn(1, delegate)
+    def _prefetch_neighbours(self, paths, index):
+        """Prefetch the next and the previous report of the list being browsed."""
+        neighbours = [paths[i] for i in (index + 1, index - 1) if 0 <= i < len(paths)]
+        self.prefetcher.prefetch(neighbours)
 
-        if odbiorca_item is None:
-            odbiorca_item = QTableWidgetItem(odbiorca_value)
-            self.table.setItem(0, 1, odbiorca_item)
+    def _show_report(self, df, style_map, odbiorca_width):
+        """Show a loaded report in the table and size its columns and rows."""
+        self.table_model.set_report(df, style_map)
 
-        self._apply_odbiorca_validation(odbiorca_value)
+        # 1. Resize columns to fit content (initial), then cap widths
+        self.table.resizeColumnsToContents()
+
+        # 2. Limit second column (index 1 - Odbiorca) width for text wrapping
+        if self.table_model.columnCount() > 1:
+            self.table.setColumnWidth(1, odbiorca_width)
+
+        # 3. Cap other columns and add small padding without inflating window
+        for c in range(self.table_model.columnCount()):
+            if c == 1:
+                continue
+            current_width = self.table.columnWidth(c)
+            # small padding, with max cap to avoid window growth
+            new_width = min(current_width + 8, 220)
+            self.table.setColumnWidth(c, new_width)
+
+        # 4. Auto-resize all rows to fit wrapped text content
+        self.table.resizeRowsToContents()
+
+    def _apply_company_selector(self):
+        if self.table_model.rowCount() == 0 or self.table_model.columnCount() < 2:
+            return
+
+        self.company_list = self._load_company_names()
+        self._normalized_companies = {self._normalize_company_name(name) for name in self.company_list}
+        self.odbiorca_delegate.company_list = self.company_list
+        self._apply_odbiorca_validation(self.table_model.text(0, 1))
 
     def _apply_odbiorca_validation(self, value):
         if not self.company_list:
             return
 
-        normalized = self._normalize_company_name(value)
-        matches = any(
-            self._normalize_company_name(name) == normalized
-            for name in self.company_list
-        )
+        matches = self._normalize_company_name(value) in self._normalized_companies
 
-        item = self.table.item(0, 1)
-        if item:
-            if matches:
-                item.setBackground(QBrush())
-            else:
-                item.setBackground(QBrush(QColor("#FEE2E2")))
+        self.table_model.set_background(0, 1, None if matches else QColor("#FEE2E2"))
 
     def _load_company_names(self):
-        companies = load_company_db(config.COMPANY_DB_FILE)
-        names = [item.get("name", "") for item in companies if item.get("name")]
-        return sorted(set(names), key=lambda value: value.lower())
+        # Cached until the company database is saved (see core/company_db.py)
+        return get_company_names(config.COMPANY_DB_FILE)
 
     def _normalize_company_name(self, value):
         return " ".join(str(value).strip().lower().split())
 
-    def _on_table_item_changed(self, item):
-        if item.row() == 0 and item.column() == 1:
-            self._apply_odbiorca_validation(item.text())
+    def _on_table_data_changed(self, top_left, bottom_right, roles=None):
+        if roles and Qt.DisplayRole not in roles:
+            return
+        if top_left.row() == 0 and top_left.column() <= 1 <= bottom_right.column():
+            self._apply_odbiorca_validation(self.table_model.text(0, 1))
 
 
     def approve_current_report(self):
@@ -986,8 +1042,18 @@ class VerificationPage(QWidget):
             self.load_current_report()
             
     def show_full_image(self):
-        if self.current_image_path and os.path.exists(self.current_image_path):
-             os.startfile(self.current_image_path)
+        if not self.current_image_path or not os.path.exists(self.current_image_path):
+            return
+        # The only place the photo is decoded at full resolution
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            image = self.images.full_image(self.current_image_path)
+        finally:
+            QApplication.restoreOverrideCursor()
+        if image is None:
+            QMessageBox.warning(self, "Błąd", "Nie można wczytać zdjęcia.")
+            return
+        FullImageDialog(image, os.path.basename(self.current_image_path), self).exec_()
     
     def open_excel_file(self):
         if self.current_excel_path and os.path.exists(self.current_excel_path):
@@ -1045,8 +1111,7 @@ class VerificationPage(QWidget):
             
             self.current_excel_path = path_to_open
             
-            df = self.excel_handler.load_file(path_to_open)
-            style_map = self.excel_handler.get_formatting()
+            df, style_map, linked_image = self._read_report(path_to_open)
             
             filename = os.path.basename(path_to_open)
             
@@ -1054,56 +1119,22 @@ class VerificationPage(QWidget):
             self._full_file_name_text = f"Excel: {filename} (Approved)"
             QTimer.singleShot(0, self.update_file_name_label_display)
             
-            self.table.blockSignals(True)
-            self.table.clear()
-            self.table.setRowCount(len(df))
-            self.table.setColumnCount(len(df.columns))
-            self.table.setHorizontalHeaderLabels([f"Col {i+1}" for i in range(len(df.columns))])
-
-            for r in range(len(df)):
-                for c in range(len(df.columns)):
-                    cell_value = df.iloc[r, c]
-                    if pd.isna(cell_value) or cell_value is None:
-                        val = ""
-                    else:
-                        val = str(cell_value)
-                    item = QTableWidgetItem(val)
-                    if (r, c) in style_map:
-                        style = style_map[(r, c)]
-                        if style['bg']: item.setBackground(QBrush(QColor(style['bg'])))
-                        if style['fg']: item.setForeground(QBrush(QColor(style['fg'])))
-                    self.table.setItem(r, c, item)
-            
-            self.table.resizeColumnsToContents()
-
-            # Cap widths for approved view as well
-            if self.table.columnCount() > 1:
-                self.table.setColumnWidth(1, 250)
-            for c in range(self.table.columnCount()):
-                if c == 1:
-                    continue
-                current_width = self.table.columnWidth(c)
-                new_width = min(current_width + 8, 220)
-                self.table.setColumnWidth(c, new_width)
-            
-            self.table.blockSignals(False)
+            # Narrower Odbiorca column for the approved view
+            self._show_report(df, style_map, odbiorca_width=250)
+
             # Apply default 60:40 split after render unless user adjusted manually
             QTimer.singleShot(0, self.apply_default_split)
             QTimer.singleShot(0, self.clamp_table_width)
 
-            # Load linked image
-            self.current_image_path = self.find_linked_image(path_to_open)
-            if self.current_image_path and os.path.exists(self.current_image_path):
-                pic_name = os.path.basename(self.current_image_path)
+            if linked_image:
+                pic_name = os.path.basename(linked_image)
                 self.picture_name_label.setText(f"🖼️ Zdjęcie: {pic_name}")
-                pix = QPixmap(self.current_image_path)
-                self.image_label.setPixmap(pix)
             else:
                 self.picture_name_label.setText(f"🖼️ Brak zdjęcia")
-                self.image_label.setText("Brak dostępnego zdjęcia")
-                self.image_label.setPixmap(None)
+            self._show_image(linked_image, "Brak dostępnego zdjęcia")
 
             self.nav_label.setText(f"ZATWIERDZONE {self.current_approved_index + 1}/{len(self.approved_reports)}")
+            self._prefetch_neighbours(self.approved_reports, self.current_approved_index)
             
         except Exception as e:
             QMessageBox.critical(self, "Błąd Ładowania", f"Nie można otworzyć raportu:\n{e}")
@@ -1262,7 +1293,7 @@ class VerifyApp(QWidget):
         self.tab3 = GenerateReportPage()
         
         # Connect transformation complete signal to refresh verification page
-        self.tab2.transformation_complete.connect(self.tab1.load_unapproved_list)
+        self.tab2.transformation_complete.connect(self.tab1.sync_reports)
         
         # Connect tab change to refresh GenerateReportPage months
         self.tabs.currentChanged.connect(self.on_tab_changed)
@@ -1290,6 +1321,8 @@ class VerifyApp(QWidget):
     
     def refresh_all_lists(self):
         """Refresh both unapproved and approved report lists after import."""
+        # Imported records may have added companies
+        invalidate_company_cache()
         try:
             self.tab1.load_unapproved_list()
             self.tab1.reload_approved_list()
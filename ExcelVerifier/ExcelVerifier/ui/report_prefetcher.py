@@ -0,0 +1,119 @@
+"""
+Background prefetch of the reports next to the one on screen.
+
+Clicking next/previous used to parse the workbook, resolve its styles and
+decode the full-size photo on the GUI thread. After each load the page asks
+for the neighbouring reports; a worker thread parses them
+(ExcelHandler.read_report) into a small LRU and has the ImageService decode
+their photos into its cache, so the next click only displays.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from core.file_stamp import file_stamp
+
+DEFAULT_CAPACITY = 4         # prefetched reports kept (next, previous and a few visited)
+
+
+class ReportPrefetcher:
+    def __init__(self, read_report, find_image, images=None, capacity=DEFAULT_CAPACITY):
+        """
+        Args:
+            read_report: path -> (workbook, df, style_map), e.g. ExcelHandler.read_report.
+            find_image: report path -> linked photo path or None.
+            images: ImageService whose cache the photos are decoded into (None = skip photos).
+            capacity: Number of prefetched reports kept (least recently used go first).
+        """
+        self._read_report = read_report
+        self._find_image = find_image
+        self._images = images
+        self.capacity = capacity
+        self._entries = OrderedDict()   # report path -> Future of the prefetched report
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report-prefetch")
+
+    def prefetch(self, paths):
+        """Start loading the given reports (most important first) unless already cached."""
+        with self._lock:
+            if self._executor is None:
+                return
+            for path in paths:
+                if path not in self._entries:
+                    self._entries[path] = self._executor.submit(self._load, path)
+            # Most important last, so it is evicted last
+            for path in reversed(paths):
+                self._entries.move_to_end(path)
+            self._trim()
+
+    def take(self, path):
+        """
+        The prefetched report for path as a dict (workbook, df, style_map,
+        image_path), or None when it was not prefetched, failed, or
+        the files changed since. Waits for a prefetch that is already running.
+        """
+        with self._lock:
+            future = self._entries.get(path)
+            if future is not None:
+                self._entries.move_to_end(path)
+        if future is None:
+            return None
+        if not future.done() and future.cancel():
+            # Still queued: loading it now costs the same as waiting
+            self.invalidate(path)
+            return None
+
+        try:
+            report = future.result()
+        except Exception as e:
+            print(f"⚠ Warning: Prefetch of {os.path.basename(path)} failed: {e}")
+            report = None
+
+        if (report is None or report['stamp'] != file_stamp(path)
+                or report['image_stamp'] != file_stamp(report['image_path'])):
+            self.invalidate(path)
+            return None
+        return report
+
+    def invalidate(self, path=None):
+        """Drop one report (e.g. after saving it) or, with no path, all of them."""
+        with self._lock:
+            if path is None:
+                futures = list(self._entries.values())
+                self._entries.clear()
+            else:
+                futures = [f for f in [self._entries.pop(path, None)] if f is not None]
+        for future in futures:
+            future.cancel()
+
+    def shutdown(self):
+        """Stop the worker thread (pending prefetches are dropped)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._entries.clear()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _trim(self):
+        while len(self._entries) > self.capacity:
+            _, future = self._entries.popitem(last=False)
+            future.cancel()
+
+    def _load(self, path):
+        # Stamps are taken before reading: a change during the read invalidates the entry
+        stamp = file_stamp(path)
+        image_path = self._find_image(path)
+        image_stamp = file_stamp(image_path)
+        workbook, df, style_map = self._read_report(path)
+        if image_stamp and self._images is not None:
+            self._images.load(image_path)
+        return {
+            'workbook': workbook,
+            'df': df,
+            'style_map': style_map,
+            'image_path': image_path,
+            'stamp': stamp,
+            'image_stamp': image_stamp,
+        }
@@ -0,0 +1,154 @@
+"""
+Table model of the verification view.
+
+Backed directly by the report DataFrame and a style array: nothing is
+converted per cell when a report is opened, the view asks only for the
+cells it paints. Edits are kept as dirty cells so saving writes back just
+the changed values.
+"""
+
+import numpy as np
+import pandas as pd
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QBrush, QColor, QFont
+
+# Roles answered from the style array; the view asks for many others
+# (size hints, decorations, check states) when sizing rows and columns
+STYLE_ROLES = frozenset((Qt.BackgroundRole, Qt.ForegroundRole, Qt.FontRole))
+
+
+class ReportTableModel(QAbstractTableModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._values = np.empty((0, 0), dtype=object)
+        self._missing = np.empty((0, 0), dtype=bool)
+        self._styles = np.empty((0, 0), dtype=object)
+        self._edits = {}            # (row, col) -> text typed by the user
+        self._backgrounds = {}      # (row, col) -> QBrush set by the page (e.g. Odbiorca check)
+        self._brushes = {}
+        self._fonts = {}
+        self.wrap_columns = set()   # columns aligned top-left for wrapped text
+
+    # --- Loading -------------------------------------------------------
+
+    def set_report(self, df: pd.DataFrame, style_map: dict = None):
+        """
+        Show a report: df as returned by ExcelHandler.load_file, style_map as
+        returned by ExcelHandler.get_formatting ({(row, col): style}).
+        """
+        self.beginResetModel()
+        self._values = df.to_numpy(dtype=object)
+        self._missing = df.isna().to_numpy()
+        self._styles = np.empty(self._values.shape, dtype=object)
+        for (r, c), style in (style_map or {}).items():
+            if r < self._styles.shape[0] and c < self._styles.shape[1]:
+                self._styles[r, c] = style
+        self._edits = {}
+        self._backgrounds = {}
+        self.endResetModel()
+
+    # --- QAbstractTableModel --------------------------------------------
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._values.shape[0]
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._values.shape[1]
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        r, c = index.row(), index.column()
+
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self.text(r, c)
+
+        if role == Qt.TextAlignmentRole:
+            if c in self.wrap_columns:
+                return int(Qt.AlignLeft | Qt.AlignTop)
+            return None
+
+        if role not in STYLE_ROLES:
+            return None
+        style = self._styles[r, c]
+        if role == Qt.BackgroundRole:
+            if (r, c) in self._backgrounds:
+                return self._backgrounds[(r, c)]
+            return self._brush(style['bg']) if style and style['bg'] else None
+        if role == Qt.ForegroundRole:
+            return self._brush(style['fg']) if style and style['fg'] else None
+        if role == Qt.FontRole and style:
+            key = (bool(style.get('bold')), bool(style.get('italic')), bool(style.get('underline')))
+            if any(key):
+                return self._font(key)
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        r, c = index.row(), index.column()
+        text = "" if value is None else str(value)
+        if text == self.text(r, c):
+            return False
+        if text == self._original_text(r, c):
+            self._edits.pop((r, c), None)
+        else:
+            self._edits[(r, c)] = text
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        return True
+
+    # --- Report access ---------------------------------------------------
+
+    def text(self, row, col):
+        """Displayed text of a cell ("" for empty cells)."""
+        if (row, col) in self._edits:
+            return self._edits[(row, col)]
+        return self._original_text(row, col)
+
+    def dirty_cells(self):
+        """{(row, col): text} of the cells changed since the report was loaded."""
+        return dict(self._edits)
+
+    def is_dirty(self):
+        return bool(self._edits)
+
+    def set_background(self, row, col, color=None):
+        """Override the background of one cell (None restores the report's own)."""
+        if row >= self.rowCount() or col >= self.columnCount():
+            return
+        if color is None:
+            self._backgrounds.pop((row, col), None)
+        else:
+            self._backgrounds[(row, col)] = QBrush(QColor(color))
+        index = self.index(row, col)
+        self.dataChanged.emit(index, index, [Qt.BackgroundRole])
+
+    # --- Helpers ---------------------------------------------------------
+
+    def _original_text(self, row, col):
+        if self._missing[row, col]:
+            return ""
+        text = str(self._values[row, col])
+        # Ensure "nan" string is shown (and saved) as empty
+        return "" if text.lower() == "nan" else text
+
+    def _brush(self, color):
+        brush = self._brushes.get(color)
+        if brush is None:
+            brush = self._brushes[color] = QBrush(QColor(color))
+        return brush
+
+    def _font(self, key):
+        font = self._fonts.get(key)
+        if font is None:
+            font = QFont()
+            font.setBold(key[0])
+            font.setItalic(key[1])
+            font.setUnderline(key[2])
+            self._fonts[key] = font
+        return font
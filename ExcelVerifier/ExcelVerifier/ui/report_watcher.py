@@ -0,0 +1,142 @@
+"""
+Watches REPORTS_ROOT and pushes new or removed reports to the verification queue.
+
+Reports appear from the transform tab, imports or colleagues on the shared
+drive. QFileSystemWatcher reports changes in the indexed directories; events
+are debounced and a sync brings the FileManager index up to date on a worker
+thread (only changed directories are rescanned) and emits the difference.
+Network drives do not deliver change notifications reliably, so there (or
+when a directory cannot be watched) the index is polled instead.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, QTimer, QFileSystemWatcher, pyqtSignal
+
+from core.database_handler import _is_network_path
+
+# "watcher" section of settings.json
+DEFAULT_WATCHER_OPTIONS = {
+    'enabled': True,
+    'debounce_ms': 500,        # wait for a burst of changes (a batch transform) to end
+    'polling': 'auto',         # True | False | 'auto' (network drives and unwatchable folders)
+    'poll_interval_s': 10,
+}
+
+
+class ReportWatcher(QObject):
+    # (added, removed) unapproved report paths since the last sync
+    reports_changed = pyqtSignal(list, list)
+    # Internal: sync result from the worker thread (unapproved reports, directories)
+    _synced = pyqtSignal(object, object)
+
+    def __init__(self, file_manager, options=None, parent=None):
+        super().__init__(parent)
+        self.file_manager = file_manager
+        self.options = {**DEFAULT_WATCHER_OPTIONS, **(options or {})}
+        self._known = set()
+        self._running = False
+        self._pending = False          # a change arrived while a sync was running
+        self._lock = threading.Lock()
+        self._executor = None
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self.schedule_sync)
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(int(self.options['debounce_ms']))
+        self._debounce.timeout.connect(self.sync_now)
+        self._poll = QTimer(self)
+        self._poll.setInterval(int(float(self.options['poll_interval_s']) * 1000))
+        self._poll.timeout.connect(self.sync_now)
+        self._synced.connect(self._apply_sync)
+
+    def start(self, known_reports):
+        """Start watching; known_reports is the list the page currently shows."""
+        if not self.options['enabled'] or self._executor is not None:
+            return
+        self.reset(known_reports)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report-watcher")
+        self._watch(self.file_manager.indexed_directories())
+
+    def reset(self, known_reports):
+        """Forget earlier changes, e.g. after the page reloaded its whole list."""
+        self._known = set(known_reports)
+
+    def stop(self):
+        self._debounce.stop()
+        self._poll.stop()
+        paths = self._watcher.directories()
+        if paths:
+            self._watcher.removePaths(paths)
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def is_active(self):
+        with self._lock:
+            return self._executor is not None
+
+    def schedule_sync(self, *_):
+        """Sync after debounce_ms without further changes."""
+        if self._executor is not None:
+            self._debounce.start()
+
+    def sync_now(self):
+        """Bring the index up to date in the background and emit what changed."""
+        self._debounce.stop()
+        with self._lock:
+            if self._executor is None:
+                return
+            if self._running:
+                self._pending = True
+                return
+            self._running = True
+            self._executor.submit(self._scan)
+
+    def _scan(self):
+        try:
+            reports = self.file_manager.get_unapproved_reports()
+            directories = self.file_manager.indexed_directories()
+        except Exception as e:
+            print(f"⚠ Warning: Could not refresh the report list: {e}")
+            reports = directories = None
+        self._synced.emit(reports, directories)
+
+    def _apply_sync(self, reports, directories):
+        with self._lock:
+            self._running = False
+            rerun, self._pending = self._pending, False
+            stopped = self._executor is None
+        if stopped:
+            return
+        if reports is not None:
+            self._watch(directories)
+            current = set(reports)
+            added = sorted(current - self._known)
+            removed = sorted(self._known - current)
+            self._known = current
+            if added or removed:
+                self.reports_changed.emit(added, removed)
+        if rerun:
+            self.sync_now()
+
+    def _watch(self, directories):
+        """Watch exactly the indexed directories; poll when that is not possible."""
+        wanted = set(directories)
+        watched = set(self._watcher.directories())
+        if watched - wanted:
+            self._watcher.removePaths(list(watched - wanted))
+        failed = self._watcher.addPaths(sorted(wanted - watched)) if wanted - watched else []
+
+        polling = self.options['polling']
+        if polling == 'auto':
+            root = self.file_manager.reports_root
+            polling = bool(failed) or not os.path.isdir(root) or _is_network_path(root)
+        if polling and not self._poll.isActive():
+            self._poll.start()
+        elif not polling and self._poll.isActive():
+            self._poll.stop()
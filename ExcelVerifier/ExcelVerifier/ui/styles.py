@@ -31,8 +31,8 @@ QTabBar::tab:selected {
     border-bottom: 2px solid #2563EB;
 }
 
-/* TABLE WIDGET */
-QTableWidget {
+/* TABLES (QTableView also matches QTableWidget) */
+QTableView {
     background-color: white;
     alternate-background-color: #F9FAFB;
     border: 1px solid #D1D5DB;
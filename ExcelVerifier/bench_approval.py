@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Micro-benchmark of the database work done when approving one report.
+
+Usage: python bench_approval.py [reports] [rows_per_report]
+
+Replays the DatabaseHandler calls the approval used to make
+(add_company, add_order, add_approved_record, get_approved_record,
+add_product for every row, add_order_items) against a temporary database:
+
+- per-call connections  (connection_lifetime=0, the old behaviour)
+- pooled connection     (one connection per thread, cached statements)
+- pooled + transaction  (all calls of one approval in db.transaction())
+- bulk                  (what approve_report does now: one transaction,
+                         add_products for all rows, one executemany for items)
+"""
+
+import sys
+import os
+import time
+import tempfile
+import statistics
+
+# Path fix
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from ExcelVerifier.core.database_handler import DatabaseHandler
+
+PRODUCTS = [f"Tlen medyczny {size}L" for size in (2, 5, 10, 20, 40)] + \
+           [f"Azot techniczny {size}L" for size in (10, 20, 50)] + \
+           ["Argon 4.8 50L", "CO2 spożywczy 30kg", "Acetylen 40L", "Hel balonowy 10L"]
+
+
+def approve(db, index, rows):
+    """The approval call sequence for one report."""
+    filename = f"2026-02-{index % 28 + 1:02d}_Firma_{index % 50}_{index}.xlsx"
+    company_id = db.add_company(name=f"Firma {index % 50} Sp. z o.o.", nip=None)
+    order_id = db.add_order(company_id=company_id, date_issued="2026-02-14",
+                            document_number=f"WZ/{index}/2026")
+    db.add_approved_record(order_id=order_id, date="2026-02-14",
+                           filename=filename, filepath=os.path.join("Zatwierdzone", filename))
+    order_id = db.get_approved_record(filename)['order_id']
+
+    items = []
+    for r in range(rows):
+        product_id = db.add_product(name=PRODUCTS[r % len(PRODUCTS)], code=None)
+        items.append({
+            'order_id': order_id, 'product_id': product_id,
+            'quantity_delivery': float(r % 4), 'quantity_return': float(r % 3),
+            'previous_state': 10.0, 'state_after': 10.0 + r % 4 - r % 3,
+        })
+    db.add_order_items(items)
+
+
+def approve_bulk(db, index, rows):
+    """The single-transaction bulk sequence of ExcelHandler._write_approval_records."""
+    filename = f"2026-02-{index % 28 + 1:02d}_Firma_{index % 50}_{index}.xlsx"
+    with db.transaction():
+        db.get_approved_record(filename)
+        company_id = db.add_company(name=f"Firma {index % 50} Sp. z o.o.", nip=None)
+        order_id = db.add_order(company_id=company_id, date_issued="2026-02-14",
+                                document_number=f"WZ/{index}/2026")
+        db.add_approved_record(order_id=order_id, date="2026-02-14",
+                               filename=filename, filepath=os.path.join("Zatwierdzone", filename))
+        names = [PRODUCTS[r % len(PRODUCTS)] for r in range(rows)]
+        product_ids = db.add_products(names)
+        db.add_order_items([{
+            'order_id': order_id, 'product_id': product_ids[name],
+            'quantity_delivery': float(r % 4), 'quantity_return': float(r % 3),
+            'previous_state': 10.0, 'state_after': 10.0 + r % 4 - r % 3,
+        } for r, name in enumerate(names)])
+
+
+def run(label, reports, rows, lifetime, use_transaction, approve_func=approve):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        db = DatabaseHandler(db_path, connection_lifetime=lifetime)
+        latencies = []
+        for index in range(reports):
+            start = time.perf_counter()
+            if use_transaction:
+                with db.transaction():
+                    approve_func(db, index, rows)
+            else:
+                approve_func(db, index, rows)
+            latencies.append(time.perf_counter() - start)
+        DatabaseHandler.close_all(db_path)
+
+    median = statistics.median(latencies) * 1000
+    p95 = sorted(latencies)[int(len(latencies) * 0.95) - 1] * 1000
+    print(f"{label:<24} median {median:8.2f} ms   p95 {p95:8.2f} ms")
+    return median
+
+
+def main():
+    reports = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+
+    print("=" * 70)
+    print(f"APPROVAL LATENCY ({reports} reports x {rows} rows, per report)")
+    print("=" * 70)
+
+    baseline = run("Per-call connections", reports, rows, lifetime=0, use_transaction=False)
+    pooled = run("Pooled connection", reports, rows, lifetime=300, use_transaction=False)
+    transaction = run("Pooled + transaction", reports, rows, lifetime=300, use_transaction=True)
+    bulk = run("Bulk (approve_report)", reports, rows, lifetime=300, use_transaction=False,
+               approve_func=approve_bulk)
+
+    print("-" * 70)
+    print(f"Pooled:               {baseline / pooled:5.1f}x faster")
+    print(f"Pooled + transaction: {baseline / transaction:5.1f}x faster")
+    print(f"Bulk:                 {baseline / bulk:5.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Benchmark of the Butlo-dni interval and Daily Data engines on synthetic order_items.
+
+Usage: python bench_butlodni.py [rows] [legacy_rows]
+
+The vectorized engines run on the full row count (default 1,000,000 for the
+intervals, one year of 300 companies for Daily Data). The original loops are
+timed on a smaller sample (default 20,000 rows) and extrapolated linearly,
+since running them on the full data takes too long.
+"""
+
+import sys
+import os
+import time
+
+# Path fix
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from ExcelVerifier.core.butlodni import build_intervals, expand_daily
+from test_butlodni import legacy_daily, legacy_intervals, make_transactions, prepared, report_inputs
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    legacy_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+
+    print("=" * 70)
+    print(f"BUTLO-DNI BENCHMARK ({rows:,} order items)")
+    print("=" * 70)
+
+    df = prepared(make_transactions(rows, n_companies=2000, n_products=8))
+    intervals, new_time = timed(build_intervals, df)
+    print(f"Vectorized engine: {new_time:8.2f} s  ({len(intervals):,} intervals)")
+
+    sample = prepared(make_transactions(legacy_rows, n_companies=2000 * legacy_rows // rows or 1, n_products=8))
+    _, legacy_time = timed(legacy_intervals, sample)
+    estimated = legacy_time * rows / legacy_rows
+    print(f"Legacy loop:       {legacy_time:8.2f} s  on {legacy_rows:,} rows "
+          f"(~{estimated:.0f} s estimated for {rows:,})")
+    print(f"Speedup:           ~{estimated / new_time:.0f}x")
+
+    # Daily Data for a yearly "Wszystkie miesiące" report
+    print("-" * 70)
+    daily_rows = 60_000
+    inputs = report_inputs(make_transactions(daily_rows, n_companies=300, n_products=8))
+    daily, new_time = timed(expand_daily, *inputs)
+    print(f"Daily Data (vectorized): {new_time:8.2f} s  ({len(daily):,} daily rows, "
+          f"{daily.memory_usage(deep=True).sum() / 2**20:.0f} MB)")
+
+    sample_companies = max(1, 300 * legacy_rows // (daily_rows * 4))
+    sample_inputs = report_inputs(make_transactions(legacy_rows // 4, n_companies=sample_companies, n_products=8))
+    legacy, legacy_time = timed(legacy_daily, *sample_inputs)
+    estimated = legacy_time * len(daily) / max(len(legacy), 1)
+    print(f"Daily Data (legacy):     {legacy_time:8.2f} s  on {len(legacy):,} daily rows "
+          f"(~{estimated:.0f} s estimated for {len(daily):,})")
+    print(f"Speedup:                 ~{estimated / new_time:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
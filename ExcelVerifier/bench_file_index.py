@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Benchmark of listing the unapproved reports (refresh_all_lists, approve, delete).
+
+Usage: python bench_file_index.py [reports] [companies]
+
+Creates empty report files in Firma/YYYY-MM folders in a temporary directory,
+approves a third of them in a temporary database and times get_unapproved_reports:
+
+- full walk   (os.walk of the tree + all approved filenames from the database)
+- index       (FileManager's report index, nothing changed since the last call)
+- index + new (one report added since the last call)
+"""
+
+import sys
+import os
+import io
+import time
+import tempfile
+import statistics
+import contextlib
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from core.file_manager import FileManager
+from core.database_handler import DatabaseHandler
+
+
+def make_reports(root, db, count, companies):
+    old = time.time_ns() - 3600 * 1_000_000_000
+    approved = []
+    for i in range(count):
+        folder = os.path.join(root, f"Firma {i % companies}", f"2025-{i % 12 + 1:02d}")
+        os.makedirs(folder, exist_ok=True)
+        name = f"2025-{i % 12 + 1:02d}-01_Firma_{i % companies}_{i}.xlsx"
+        open(os.path.join(folder, name), "wb").close()
+        if i % 3 == 0:
+            approved.append(name)
+    with db.transaction():
+        company_id = db.add_company("Firma")
+        order_id = db.add_order(company_id, "2025-01-01")
+        for name in approved:
+            db.add_approved_record(order_id, "2025-01-01", name, name)
+    # As if the reports had been created an hour ago (outside the racy window)
+    for dirpath, _, _ in os.walk(root):
+        os.utime(dirpath, ns=(old, old))
+
+
+def timed(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    companies = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "Reports")
+        db_path = os.path.join(tmp, "bench.db")
+        db = DatabaseHandler(db_path)
+        make_reports(root, db, count, companies)
+        manager = FileManager(root, db_path)
+
+        def full_walk():
+            with contextlib.redirect_stdout(io.StringIO()):
+                names = manager._get_approved_filenames()
+            return [p for p in manager._walk_reports() if os.path.basename(p) not in names]
+
+        start = time.perf_counter()
+        manager.refresh_index()
+        first = time.perf_counter() - start
+
+        def add_one():
+            folder = os.path.join(root, "Firma 0", "2025-01")
+            open(os.path.join(folder, f"new_{time.time_ns()}.xlsx"), "wb").close()
+            old = time.time_ns() - 3600 * 1_000_000_000
+            os.utime(folder, ns=(old, old + 1))  # new mtime, outside the racy window
+            return manager.get_unapproved_reports()
+
+        walk_time, walked = timed(full_walk)
+        index_time, indexed = timed(manager.get_unapproved_reports)
+        assert walked == indexed, "Index and full walk disagree"
+        added_time, _ = timed(add_one)
+
+        dirs = len(db.get_indexed_directories())
+        print("=" * 70)
+        print(f"UNAPPROVED REPORTS ({count} reports in {dirs} folders, {len(indexed)} unapproved)")
+        print("=" * 70)
+        print(f"first index build    {first * 1000:8.1f} ms (once)")
+        print(f"full walk            {walk_time * 1000:8.1f} ms")
+        print(f"index                {index_time * 1000:8.1f} ms")
+        print(f"index + new report   {added_time * 1000:8.1f} ms")
+        print("-" * 70)
+        print(f"Speedup: {walk_time / index_time:.1f}x")
+        DatabaseHandler.close_all(db_path)
+
+
+if __name__ == "__main__":
+    main()
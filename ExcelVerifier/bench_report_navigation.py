@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Benchmark of clicking "next" through the verification queue.
+
+Usage: python bench_report_navigation.py [reports] [rows] [pause_ms]
+
+Generates reports with a 12-megapixel JPEG photo each in a temporary folder
+and measures how long next_report blocks the GUI thread, with the user
+pausing pause_ms between clicks (the Qt event loop keeps running):
+
+- no prefetch   (every click parses the workbook; the photo is decoded in the background)
+- prefetch      (neighbours are loaded by ReportPrefetcher in the background)
+"""
+
+import sys
+import os
+import io
+import time
+import tempfile
+import statistics
+import contextlib
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from PIL import Image, ImageDraw
+from PyQt5.QtWidgets import QApplication
+
+app = QApplication.instance() or QApplication([])
+
+import core.company_db as company_db
+import core.excel_handler as excel_handler
+import core.file_manager as file_manager
+from core.image_transformer import ImageTransformer
+
+
+def make_reports(directory, count, rows):
+    photo = Image.new("RGB", (4000, 3000), (250, 250, 246))
+    draw = ImageDraw.Draw(photo)
+    for y in range(200, 2800, 60):
+        draw.rectangle((300, y, 3700, y + 20), fill=(40, 40, 60))
+    dane = "\n".join(f"|{i}|Tlen medyczny {i}L|{i % 4}||{i % 3}|10|{10 + i % 4 - i % 3}|" for i in range(1, rows + 1))
+    transformer = ImageTransformer(api_key="bench", use_cache=False)
+    paths = []
+    for k in range(count):
+        image = os.path.join(directory, f"photo_{k}.jpg")
+        photo.save(image, quality=92)
+        result = {'odbiorca': f'Firma {k}', 'nr_dokumentu': f'WZ/{k}', 'data_wystawienia': f'{k % 28 + 1:02d}.02.2026',
+                  'dane': dane}
+        path, _ = transformer.write_report(image, result, os.path.join(directory, "Reports"))
+        paths.append(path)
+    return paths
+
+
+def click_through(page, paths, pause_ms):
+    page.unapproved_reports = list(paths)
+    page.current_report_index = 0
+    page.load_current_report()
+    times = []
+    for _ in range(len(paths) - 1):
+        deadline = time.perf_counter() + pause_ms / 1000
+        while time.perf_counter() < deadline:
+            app.processEvents()
+            time.sleep(0.005)
+        start = time.perf_counter()
+        page.next_report()
+        app.processEvents()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    pause_ms = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+
+    from ui.main_window import VerificationPage
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the application database out of the benchmark
+        company_db.DATABASE_FILE = excel_handler.DATABASE_FILE = file_manager.DATABASE_FILE = os.path.join(tmp, "bench.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            paths = make_reports(tmp, count, rows)
+            page = VerificationPage()
+            page.resize(1400, 900)
+            page.show()
+
+        print("=" * 70)
+        print(f"NEXT REPORT ({count} reports x {rows} rows, 4000x3000 photos, {pause_ms} ms between clicks)")
+        print("=" * 70)
+        results = {}
+        for label, capacity in (("no prefetch", 0), ("prefetch", 4)):
+            page.prefetcher.capacity = capacity
+            page.prefetcher.invalidate()
+            with contextlib.redirect_stdout(io.StringIO()):
+                times = click_through(page, paths, pause_ms)
+            results[label] = times
+            print(f"{label:<12} median {statistics.median(times) * 1000:7.1f} ms   max {max(times) * 1000:7.1f} ms")
+        page.prefetcher.shutdown()
+
+    speedup = statistics.median(results["no prefetch"]) / statistics.median(results["prefetch"])
+    print("-" * 70)
+    print(f"Speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
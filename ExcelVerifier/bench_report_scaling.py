@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Regression benchmark: report summary stages must scale linearly with the number of groups.
+
+Usage: python bench_report_scaling.py [base_companies]
+
+Times the "Rotacja Source" and "Daily Data" stages (summarize_rotacja,
+expand_daily) for 1x, 2x, 4x and 8x the number of (Odbiorca, Nazwa, Miesiąc)
+groups. The old per-group boolean-mask loops were O(groups x rows), i.e. 8x
+the groups took ~64x the time. Exits with code 1 if 8x the groups takes more
+than MAX_RATIO times as long as 1x.
+"""
+
+import sys
+import os
+import time
+
+# Path fix
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from ExcelVerifier.core.butlodni import expand_daily, summarize_rotacja
+from test_butlodni import make_transactions, report_inputs
+
+SCALES = [1, 2, 4, 8]
+ROWS_PER_COMPANY = 60
+MAX_RATIO = 16  # linear would be 8; allow 2x headroom for noise
+
+
+def run_stages(inputs):
+    df_calc, df_raw, nip_map, stan_biezacy_map = inputs
+    sum_rot = df_raw.groupby(['Odbiorca', 'Nazwa', 'Miesiąc'], as_index=False)[['Ilość zwrócona']].sum()
+    start = time.perf_counter()
+    summarize_rotacja(df_calc, sum_rot, nip_map)
+    expand_daily(df_calc, df_raw, nip_map, stan_biezacy_map)
+    return time.perf_counter() - start
+
+
+def main():
+    base_companies = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    print("=" * 70)
+    print("REPORT SUMMARY STAGES - SCALING WITH NUMBER OF GROUPS")
+    print("=" * 70)
+
+    timings = {}
+    for scale in SCALES:
+        companies = base_companies * scale
+        inputs = report_inputs(make_transactions(companies * ROWS_PER_COMPANY, n_companies=companies, n_products=4))
+        groups = len(inputs[0][['Odbiorca', 'Nazwa', 'Miesiąc']].drop_duplicates())
+        # Best of 3 to smooth out noise
+        timings[scale] = min(run_stages(inputs) for _ in range(3))
+        print(f"  {scale}x: {groups:7,} groups  {timings[scale]:7.3f} s  "
+              f"({timings[scale] / groups * 1e6:6.1f} µs/group)")
+
+    ratio = timings[SCALES[-1]] / timings[SCALES[0]]
+    print(f"\n{SCALES[-1]}x groups took {ratio:.1f}x the time (linear: {SCALES[-1]}x, limit: {MAX_RATIO}x)")
+    if ratio > MAX_RATIO:
+        print("✗ FAIL - summary stages no longer scale linearly")
+        sys.exit(1)
+    print("✓ PASS")
+
+
+if __name__ == "__main__":
+    main()
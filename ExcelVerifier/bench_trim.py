@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Benchmark of whitespace-trim detection on 12-megapixel phone photos.
+
+Usage: python bench_trim.py [photos] [repeats]
+
+Compares the previous PIL implementation (LANCZOS resize, white background
+image, ImageChops.difference/add and a point() lambda) with the NumPy
+projection in core/image_preprocess.find_content_bbox, on synthetic
+4000x3000 photos of a delivery note on a white background. Exits with 1 if
+the speedup is below 5x or the boxes differ by more than the reduction grid.
+"""
+
+import sys
+import os
+import time
+import random
+import statistics
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from PIL import Image, ImageChops, ImageDraw, ImageFilter
+
+from core.image_preprocess import find_content_bbox
+
+SIZE = (4000, 3000)
+REQUIRED_SPEEDUP = 5.0
+
+
+def legacy_bbox(img, bg_threshold=250, margin=0):
+    """The trim_whitespace detection used before (TransformPicToExcelPage.py)."""
+    max_size = 2000
+    original_size = img.size
+    if max(img.size) > max_size:
+        scale = max_size / max(img.size)
+        new_size = (int(img.width * scale), int(img.height * scale))
+        img_small = img.resize(new_size, Image.LANCZOS)
+    else:
+        img_small = img
+        scale = 1.0
+    bg = Image.new("RGB", img_small.size, (255, 255, 255))
+    diff = ImageChops.difference(img_small, bg)
+    diff = ImageChops.add(diff, diff, 2.0, 0)
+    diff = diff.point(lambda p: 255 if p > (255 - bg_threshold) else 0)
+    bbox = diff.getbbox()
+    if not bbox:
+        return None
+    if scale != 1.0:
+        left, top, right, bottom = bbox
+        bbox = (int(left / scale), int(top / scale), int(right / scale), int(bottom / scale))
+    if margin:
+        left, top, right, bottom = bbox
+        bbox = (max(left - margin, 0), max(top - margin, 0),
+                min(right + margin, original_size[0]), min(bottom + margin, original_size[1]))
+    return bbox
+
+
+def make_photo(seed):
+    """A grey-ish table printout with text lines, placed at a random spot on white paper."""
+    rng = random.Random(seed)
+    img = Image.new("RGB", SIZE, (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    left, top = rng.randint(100, 900), rng.randint(100, 700)
+    right, bottom = SIZE[0] - rng.randint(100, 900), SIZE[1] - rng.randint(100, 700)
+    draw.rectangle((left, top, right, bottom), fill=(246, 244, 240), outline=(40, 40, 40), width=4)
+    for y in range(top + 60, bottom - 40, 70):
+        draw.line((left + 20, y, right - 20, y), fill=(90, 90, 90), width=2)
+        x = left + 40
+        while x < right - 200:
+            w = rng.randint(40, 160)
+            draw.rectangle((x, y - 40, x + w, y - 15), fill=(30, 30, 60))
+            x += w + rng.randint(20, 60)
+    return img.filter(ImageFilter.GaussianBlur(1))
+
+
+def timed(func, img, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(img)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def main():
+    photos = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    print("=" * 70)
+    print(f"TRIM DETECTION ({photos} photos {SIZE[0]}x{SIZE[1]}, median of {repeats} runs)")
+    print("=" * 70)
+
+    legacy_total = numpy_total = 0.0
+    max_offset = 0
+    for seed in range(photos):
+        img = make_photo(seed)
+        legacy_time, legacy = timed(legacy_bbox, img, repeats)
+        numpy_time, new = timed(find_content_bbox, img, repeats)
+        legacy_total += legacy_time
+        numpy_total += numpy_time
+        offset = max(abs(a - b) for a, b in zip(legacy, new))
+        max_offset = max(max_offset, offset)
+        print(f"photo {seed}: PIL {legacy_time * 1000:7.1f} ms   NumPy {numpy_time * 1000:6.1f} ms   "
+              f"bbox {new} (max diff {offset}px)")
+
+    speedup = legacy_total / numpy_total
+    print("-" * 70)
+    print(f"PIL:   {legacy_total / photos * 1000:7.1f} ms per photo")
+    print(f"NumPy: {numpy_total / photos * 1000:7.1f} ms per photo")
+    print(f"Speedup: {speedup:.1f}x (required {REQUIRED_SPEEDUP:.0f}x), max bbox difference {max_offset}px")
+    ok = speedup >= REQUIRED_SPEEDUP and max_offset <= 4
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
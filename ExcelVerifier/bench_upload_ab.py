@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""A/B check of the pre-upload optimizer: bytes saved vs. extraction accuracy.
+
+Usage:
+    python bench_upload_ab.py SAMPLES_DIR [--bytes-only] [--max-edge N]
+                              [--format JPEG|WEBP] [--quality Q]
+                              [--grayscale auto|always|never] [--tolerance T]
+
+SAMPLES_DIR holds delivery-note photos and a labels.json with the expected
+extraction for each of them:
+
+    {
+      "IMG_0412.jpg": {
+        "odbiorca": "Firma A Sp. z o.o.",
+        "nr_dokumentu": "WZ/1/2026",
+        "data_wystawienia": "14.02.2026",
+        "rows": [["Tlen medyczny 10L", "2", "", "1", "5", "6"], ...]
+      }
+    }
+
+("rows" are the table columns Nazwa..Stan po wymianie, without Lp.)
+
+Arm A uploads the trimmed photo as before, arm B the optimized one (settings
+from the "upload" section of settings.json, overridden by the flags). Both
+arms call Gemini with the cache disabled, so GEMINI_API_KEY must be set;
+--bytes-only skips the API and only reports sizes. Exits with 1 when arm B's
+field or cell accuracy is more than --tolerance below arm A's.
+"""
+
+import sys
+import os
+import re
+import json
+import time
+import argparse
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+import config
+from core.image_preprocess import prepare_for_upload
+from core.image_transformer import ImageTransformer
+from core.extraction_pipeline import ExtractionPipeline
+
+FIELDS = ('odbiorca', 'nr_dokumentu', 'data_wystawienia')
+
+
+def normalize_text(value):
+    return re.sub(r"\s+", " ", str(value or "")).strip().lower()
+
+
+def table_rows(dane):
+    """Pipe rows of an extraction without the separator, header and Lp column."""
+    rows = [[cell.strip() for cell in row.split("|")[1:-1]]
+            for row in re.findall(r"\|.*\|", dane or "") if "---" not in row]
+    if rows and any("lp" in c.lower() for c in rows[0]) and any("nazwa" in c.lower() for c in rows[0]):
+        rows = rows[1:]
+    return [row[1:] for row in rows]
+
+
+def number_or_text(cell):
+    try:
+        return round(float(cell.replace(",", ".")), 2)
+    except ValueError:
+        return normalize_text(cell)
+
+
+def score(transformer, result, expected):
+    """(fields_ok, fields_total, cells_ok, cells_total) of one extraction."""
+    fields_ok = 0
+    for field in FIELDS:
+        got, want = result.get(field), expected.get(field)
+        if field == 'data_wystawienia':
+            try:
+                ok = transformer.parse_date_flexible(got) == transformer.parse_date_flexible(want)
+            except Exception:
+                ok = normalize_text(got) == normalize_text(want)
+        elif field == 'nr_dokumentu':
+            ok = normalize_text(transformer.normalize_invoice_number(got)) == normalize_text(want)
+        else:
+            ok = normalize_text(got) == normalize_text(want)
+        fields_ok += ok
+
+    got_rows = table_rows(result.get('dane'))
+    cells_ok = cells_total = 0
+    for r, want_row in enumerate(expected.get('rows', [])):
+        got_row = got_rows[r] if r < len(got_rows) else []
+        for c, want in enumerate(want_row):
+            cells_total += 1
+            got = got_row[c] if c < len(got_row) else ""
+            cells_ok += number_or_text(got) == number_or_text(str(want))
+    return fields_ok, len(FIELDS), cells_ok, cells_total
+
+
+def run_arm(label, paths, labels, upload_options, pool, bytes_only):
+    prepare = functools.partial(prepare_for_upload, upload_options=upload_options)
+    if bytes_only:
+        prepared = list(pool.map(prepare, paths))
+        sent = sum(len(p['data']) for p in prepared)
+        original = sum(p['original_bytes'] for p in prepared)
+        print(f"{label:<12} {sent / 1e6:8.2f} MB sent ({original / 1e6:.2f} MB originals)")
+        return {'bytes': sent}
+
+    transformer = ImageTransformer(use_cache=False)
+    pipeline = ExtractionPipeline(transformer, config.EXTRACTION_SETTINGS)
+    start = time.perf_counter()
+    outcomes = pipeline.run(paths, prepare=prepare, executor=pool)
+    elapsed = time.perf_counter() - start
+
+    totals = [0, 0, 0, 0]
+    for image_path, result, error in outcomes:
+        if error:
+            print(f"  {os.path.basename(image_path)}: {error}")
+            result = {}
+        for i, value in enumerate(score(transformer, result, labels[os.path.basename(image_path)])):
+            totals[i] += value
+
+    field_acc = totals[0] / totals[1] if totals[1] else 1.0
+    cell_acc = totals[2] / totals[3] if totals[3] else 1.0
+    sent = pipeline.upload_stats['upload_bytes']
+    print(f"{label:<12} {sent / 1e6:8.2f} MB sent   {elapsed:6.1f} s   "
+          f"fields {field_acc:6.1%}   cells {cell_acc:6.1%}")
+    return {'bytes': sent, 'fields': field_acc, 'cells': cell_acc, 'seconds': elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("samples_dir")
+    parser.add_argument("--bytes-only", action="store_true")
+    parser.add_argument("--max-edge", type=int)
+    parser.add_argument("--format", choices=("JPEG", "WEBP"))
+    parser.add_argument("--quality", type=int)
+    parser.add_argument("--grayscale", choices=("auto", "always", "never"))
+    parser.add_argument("--tolerance", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with open(os.path.join(args.samples_dir, "labels.json"), encoding="utf-8") as f:
+        labels = json.load(f)
+    paths = [os.path.join(args.samples_dir, name) for name in labels]
+
+    optimized = dict(config.UPLOAD_SETTINGS, enabled=True)
+    for key, value in (('max_long_edge', args.max_edge), ('format', args.format),
+                       ('quality', args.quality), ('grayscale', args.grayscale)):
+        if value is not None:
+            optimized[key] = value
+
+    print("=" * 70)
+    print(f"UPLOAD A/B ({len(paths)} labelled photos)  B = {optimized}")
+    print("=" * 70)
+    with ProcessPoolExecutor() as pool:
+        a = run_arm("A original", paths, labels, {'enabled': False}, pool, args.bytes_only)
+        b = run_arm("B optimized", paths, labels, optimized, pool, args.bytes_only)
+
+    print("-" * 70)
+    print(f"Bytes saved: {a['bytes'] - b['bytes']:,} ({1 - b['bytes'] / a['bytes']:.0%})")
+    if args.bytes_only:
+        return
+    print(f"Time: {a['seconds']:.1f} s -> {b['seconds']:.1f} s")
+    regressed = (b['fields'] < a['fields'] - args.tolerance or b['cells'] < a['cells'] - args.tolerance)
+    print("✗ Accuracy dropped" if regressed else "✓ Accuracy kept")
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Revalidate all approved reports (F + C - E = G) in one pass.
+
+Usage: python bench_validation.py [directory] [--synthetic N] [--rows R]
+
+Reads the data rows (row 4 onwards) of every report .xlsx under directory
+(default: the approved reports folder from settings.json), then checks them
+twice:
+
+- per cell   (the check ExcelHandler and ImageTransformer used to run row by row)
+- one pass   (core/validation.batch_mismatches over all reports at once)
+
+and prints the reports with red rows. With --synthetic N (or when the folder
+has no reports) N generated reports in a temporary folder are used instead.
+Exits with 1 if the two checks disagree.
+"""
+
+import sys
+import os
+import glob
+import time
+import random
+import argparse
+import tempfile
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from openpyxl import Workbook, load_workbook
+
+from core.validation import batch_mismatches
+
+PRODUCTS = ["Tlen medyczny 10L", "Azot techniczny 20L", "Argon 4.8 50L", "CO2 spożywczy 30kg", "Hel 10L"]
+SKIPPED_FILES = {"ApprovedRecords.xlsx"}
+
+
+def legacy_mismatch(row):
+    """The per-cell check used before (ExcelHandler._to_num + expected logic)."""
+    def to_num(x):
+        if x is None or (isinstance(x, str) and x.strip() == ""):
+            return None
+        try:
+            return float(str(x).replace(",", "."))
+        except ValueError:
+            return None
+
+    c, e, f, g = (to_num(row[i]) if i < len(row) else None for i in (2, 4, 5, 6))
+    safe_f = f if f is not None else 0.0
+    if c is None and e is None:
+        expected = f
+    else:
+        expected = safe_f + (c or 0.0) - (e or 0.0)
+    return expected is not None and g is not None and round(g, 2) != round(expected, 2)
+
+
+def write_synthetic(directory, count, rows):
+    rng = random.Random(1)
+    for index in range(count):
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Sheet1")
+        ws.append(["Odbiorca", f"Firma {index % 40}", "Data wystawienia", "14.02.2026", "Nr dokumentu", f"WZ/{index}"])
+        ws.append([])
+        ws.append(["Lp", "Nazwa", "Ilość", "Uwagi", "Ilość", "Stan poprzedni", "Stan po wymianie"])
+        for r in range(rows):
+            delivery, returned, previous = rng.randint(0, 5), rng.randint(0, 5), rng.randint(0, 30)
+            current = previous + delivery - returned + (1 if rng.random() < 0.03 else 0)
+            ws.append([str(r + 1), rng.choice(PRODUCTS), str(delivery), "",
+                       str(returned) if returned else "", str(previous), str(current)])
+        wb.save(os.path.join(directory, f"2026-02-14_Firma_{index}.xlsx"))
+
+
+def load_tables(paths):
+    tables = []
+    for path in paths:
+        wb = load_workbook(path, read_only=True)
+        ws = wb.worksheets[0]
+        tables.append([row for row in ws.iter_rows(min_row=4, max_col=7, values_only=True)])
+        wb.close()
+    return tables
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", nargs="?")
+    parser.add_argument("--synthetic", type=int, default=0)
+    parser.add_argument("--rows", type=int, default=25)
+    args = parser.parse_args()
+
+    tmp = None
+    directory = args.directory
+    if directory is None and not args.synthetic:
+        import config
+        directory = config.APPROVED_DIRECTORY
+    paths = [] if args.synthetic else sorted(
+        p for p in glob.glob(os.path.join(directory, "**", "*.xlsx"), recursive=True)
+        if os.path.basename(p) not in SKIPPED_FILES and not os.path.basename(p).startswith("~$"))
+    if not paths:
+        tmp = tempfile.TemporaryDirectory()
+        write_synthetic(tmp.name, args.synthetic or 500, args.rows)
+        directory = tmp.name
+        paths = sorted(glob.glob(os.path.join(directory, "*.xlsx")))
+
+    print("=" * 70)
+    print(f"REVALIDATION ({len(paths)} reports in {directory})")
+    print("=" * 70)
+
+    start = time.perf_counter()
+    tables = load_tables(paths)
+    load_time = time.perf_counter() - start
+    total_rows = sum(len(rows) for rows in tables)
+
+    start = time.perf_counter()
+    legacy = [[i for i, row in enumerate(rows) if legacy_mismatch(row)] for rows in tables]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = [rows.tolist() for rows in batch_mismatches(tables)]
+    batch_time = time.perf_counter() - start
+
+    for path, mismatched in zip(paths, batch):
+        if mismatched:
+            print(f"  {os.path.relpath(path, directory)}: rows {', '.join(str(i + 4) for i in mismatched)}")
+
+    print("-" * 70)
+    print(f"Rows: {total_rows:,}, red: {sum(map(len, batch)):,} in {sum(1 for b in batch if b)} reports")
+    print(f"Reading reports: {load_time:7.3f} s")
+    print(f"Per cell:        {legacy_time * 1000:7.1f} ms")
+    print(f"One pass:        {batch_time * 1000:7.1f} ms  ({legacy_time / batch_time:.1f}x)")
+    same = legacy == batch
+    print("✓ Same rows marked" if same else "✗ Results differ")
+    if tmp:
+        tmp.cleanup()
+    sys.exit(0 if same else 1)
+
+
+if __name__ == "__main__":
+    main()
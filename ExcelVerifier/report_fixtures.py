@@ -0,0 +1,63 @@
+"""Report workbooks for the tests, laid out like the transform tab writes them."""
+
+import os
+
+from openpyxl import Workbook
+
+HEADER = ["Lp", "Nazwa", "Ilość", "Uwagi", "Ilość", "Stan poprzedni", "Stan po wymianie"]
+DEFAULT_ROWS = [("Tlen", 2, 1, 5, 6)]
+
+
+def make_report(directory, name, odbiorca="Firma A", rows=DEFAULT_ROWS, date="14.02.2026", document="WZ/1"):
+    """
+    Save a report: the Odbiorca/Data wystawienia/Nr dokumentu row, a blank row,
+    the column header and from row 4 one line per (nazwa, dostawa, zwrot,
+    stan poprzedni, stan po wymianie) tuple in rows. Returns the file path.
+    """
+    os.makedirs(directory, exist_ok=True)
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Odbiorca", odbiorca, "Data wystawienia", date, "Nr dokumentu", document])
+    ws.append([])
+    ws.append(HEADER)
+    for lp, (nazwa, dostawa, zwrot, prev, po) in enumerate(rows, start=1):
+        ws.append([lp, nazwa, dostawa, None, zwrot, prev, po])
+    path = os.path.join(directory, name)
+    wb.save(path)
+    return path
+
+
+def make_photo(report_path, size=None, data=b""):
+    """Save the photo linked to a report (same name, .jpg): a real image of size, or raw data."""
+    path = os.path.splitext(report_path)[0] + ".jpg"
+    if size:
+        from PIL import Image
+        Image.new("RGB", size, (200, 200, 200)).save(path)
+    else:
+        with open(path, "wb") as f:
+            f.write(data)
+    return path
+
+
+class ApprovalEnvironment:
+    """Points ExcelHandler and report generation at a temporary database and Zatwierdzone folder."""
+
+    def __init__(self, directory):
+        self.unapproved = os.path.join(directory, "Niezatwierdzone")
+        self.approved = os.path.join(directory, "Zatwierdzone")
+        self.db_path = os.path.join(directory, "test.db")
+
+    def __enter__(self):
+        import config
+        import core.excel_handler as excel_handler
+        self.saved = (excel_handler.APPROVED_DIRECTORY, excel_handler.DATABASE_FILE, config.DATABASE_FILE)
+        excel_handler.APPROVED_DIRECTORY = self.approved
+        excel_handler.DATABASE_FILE = config.DATABASE_FILE = self.db_path
+        return self
+
+    def __exit__(self, *exc):
+        import config
+        import core.excel_handler as excel_handler
+        from core.database_handler import DatabaseHandler
+        excel_handler.APPROVED_DIRECTORY, excel_handler.DATABASE_FILE, config.DATABASE_FILE = self.saved
+        DatabaseHandler.close_all(self.db_path)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Test report approval: one transaction per file, bulk products/items, batch API."""
+
+import sys
+import os
+import tempfile
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+import core.excel_handler as excel_handler_module
+from core.database_handler import DatabaseHandler
+from report_fixtures import make_report
+
+
+def make_handler(tmp):
+    unapproved = os.path.join(tmp, "Niezatwierdzone")
+    os.makedirs(unapproved)
+    excel_handler_module.APPROVED_DIRECTORY = os.path.join(tmp, "Zatwierdzone")
+    excel_handler_module.DATABASE_FILE = os.path.join(tmp, "test.db")
+    return excel_handler_module.ExcelHandler(), unapproved
+
+
+ROWS = [("Tlen 10L", 2, 1, 5, 6), ("Azot 20L", 1, 0, 0, 1), ("Tlen 10L", 0, 1, 3, 2), (None, None, None, None, None)]
+
+
+def test_approve_report_writes_items_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        handler, unapproved = make_handler(tmp)
+        path = make_report(unapproved, "2026-02-14_Firma_A.xlsx", "Firma A", ROWS)
+        handler.load_file(path)
+        handler.approve_report("2026-02-14_Firma_A.xlsx", "2026-02-14", "Firma A", path)
+
+        record = handler.db.get_approved_record("2026-02-14_Firma_A.xlsx")
+        assert record is not None
+        assert len(handler.db.get_all_orders()) == 1, "Exactly one order expected"
+        assert len(handler.db.get_order_items(record['order_id'])) == 3, "Each row stored once"
+        assert sorted(p['name'] for p in handler.db.get_all_products()) == ["Azot 20L", "Tlen 10L"]
+        assert os.path.exists(os.path.join(tmp, "Zatwierdzone", "2026-02-14_Firma_A.xlsx"))
+        DatabaseHandler.close_all()
+
+
+def test_failed_database_write_restores_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        handler, unapproved = make_handler(tmp)
+        path = make_report(unapproved, "2026-02-14_Firma_A.xlsx", "Firma A", ROWS)
+        image = os.path.join(unapproved, "2026-02-14_Firma_A.jpg")
+        open(image, "wb").close()
+        handler.load_file(path)
+
+        original = handler.db.add_order_items
+        handler.db.add_order_items = lambda items: (_ for _ in ()).throw(RuntimeError("disk full"))
+        try:
+            handler.approve_report("2026-02-14_Firma_A.xlsx", "2026-02-14", "Firma A", path)
+            assert False, "Approval should fail"
+        except Exception as e:
+            assert "disk full" in str(e)
+        finally:
+            handler.db.add_order_items = original
+
+        assert os.path.exists(path) and os.path.exists(image), "Files should be moved back"
+        assert handler.db.get_all_companies() == [], "Company insert should be rolled back"
+        assert handler.db.get_all_orders() == [], "Order insert should be rolled back"
+        assert handler.db.get_all_products() == [], "Product inserts should be rolled back"
+        DatabaseHandler.close_all()
+
+
+def test_approve_reports_batch_rolls_back_per_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        handler, unapproved = make_handler(tmp)
+        reports = []
+        for company in ("Firma A", "Firma B", "Firma C"):
+            filename = f"2026-02-14_{company.replace(' ', '_')}.xlsx"
+            rows = ROWS if company != "Firma B" else [("Tlen 10L", "abc", 0, 0, 0)]  # not a number
+            path = make_report(unapproved, filename, company, rows)
+            reports.append((filename, "2026-02-14", company, path))
+
+        progress = []
+        results = handler.approve_reports(reports, lambda done, total, name: progress.append(done))
+
+        errors = {filename: error for filename, error in results}
+        assert errors["2026-02-14_Firma_A.xlsx"] is None
+        assert errors["2026-02-14_Firma_B.xlsx"] is not None
+        assert errors["2026-02-14_Firma_C.xlsx"] is None
+        assert progress == [1, 2, 3]
+        assert len(handler.db.get_all_approved_records()) == 2
+        assert os.path.exists(reports[1][3]), "Failed file stays unapproved"
+        DatabaseHandler.close_all()
+
+
+if __name__ == "__main__":
+    tests = [
+        test_approve_report_writes_items_once,
+        test_failed_database_write_restores_files,
+        test_approve_reports_batch_rolls_back_per_file,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""Parity test of the vectorized Butlo-dni engine against the original loop implementation"""
+
+import sys
+import os
+from calendar import monthrange
+
+# Path fix
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+import numpy as np
+import pandas as pd
+from ExcelVerifier.core.butlodni import (annotate_transactions, build_intervals, expand_daily, summarize_rotacja,
+                                        INTERVAL_COLUMNS, DAILY_COLUMNS, ROTACJA_COLUMNS)
+
+
+# ---------------------------------------------------------------------------
+# Reference implementation (generate_report before the vectorized engine)
+# ---------------------------------------------------------------------------
+
+def legacy_annotate(df, today):
+    df['Data następna'] = df.groupby(['Odbiorca', 'Nazwa'])['Data wystawienia'].shift(-1)
+    df['Data następna'] = df['Data następna'].fillna(today)
+    df['Liczba dni'] = (df['Data następna'] - df['Data wystawienia']).dt.days
+    df['Liczba dni'] = df['Liczba dni'].apply(lambda x: x if x >= 0 else 0)
+    df['Miesiąc'] = df['Data wystawienia'].dt.strftime('%Y-%m')
+    df['Is_first_of_month'] = df.groupby(['Odbiorca', 'Nazwa', 'Miesiąc']).cumcount() == 0
+    df['Butlo-dni'] = df.apply(
+        lambda row: row['stan poprzedni'] * row['Liczba dni'] if row['Is_first_of_month'] else row['stan po wymianie'] * row['Liczba dni'],
+        axis=1
+    )
+    return df
+
+
+def legacy_intervals(df):
+    calc_rows = []
+    for (odbiorca, nazwa, miesiac), group in df.groupby(['Odbiorca', 'Nazwa', 'Miesiąc']):
+        year, month = map(int, miesiac.split('-'))
+        first_day = pd.Timestamp(year=year, month=month, day=1)
+        last_day = pd.Timestamp(year=year, month=month, day=monthrange(year, month)[1])
+
+        # kind='stable': same-day documents keep their input order (quicksort gave no guarantee)
+        group = group.sort_values('Data wystawienia', kind='stable').reset_index(drop=True)
+        current_start = first_day
+
+        for idx, row in group.iterrows():
+            report_date = row['Data wystawienia']
+            if idx == 0:
+                days = (report_date - current_start).days
+                stan = row['stan poprzedni']
+                nr_doc = row['Nr dokumentu']
+            else:
+                days = (report_date - current_start).days
+                stan = group.loc[idx - 1, 'stan po wymianie']
+                nr_doc = group.loc[idx - 1, 'Nr dokumentu']
+
+            if days > 0:
+                calc_rows.append({
+                    'Odbiorca': odbiorca, 'Nazwa': nazwa, 'Nr dokumentu': nr_doc,
+                    'Data początkowa': current_start, 'Data końcowa': report_date - pd.Timedelta(days=1),
+                    'liczba dni': days, 'Stan': stan,
+                    'Butlo-dni': stan * days, 'Miesiąc': miesiac
+                })
+            current_start = report_date
+
+        last_row = group.iloc[-1]
+        days_end = (last_day - current_start).days + 1
+        stan_end = last_row['stan po wymianie']
+        calc_rows.append({
+            'Odbiorca': odbiorca, 'Nazwa': nazwa, 'Nr dokumentu': last_row['Nr dokumentu'],
+            'Data początkowa': current_start, 'Data końcowa': last_day, 'liczba dni': days_end, 'Stan': stan_end,
+            'Butlo-dni': stan_end * days_end if days_end > 0 else 0, 'Miesiąc': miesiac
+        })
+
+    return pd.DataFrame(calc_rows)
+
+
+def legacy_daily(df_calc, df_raw, nip_map, stan_biezacy_map):
+    daily_rows = []
+    for (odbiorca, nazwa, miesiac), group in df_calc.groupby(['Odbiorca', 'Nazwa', 'Miesiąc']):
+        year, month = map(int, miesiac.split('-'))
+        first_day = pd.Timestamp(year=year, month=month, day=1)
+        last_day = (first_day + pd.DateOffset(months=1)) - pd.DateOffset(days=1)
+
+        nip_val = nip_map[nip_map['Odbiorca'] == odbiorca]['NIP'].iloc[0] if len(nip_map[nip_map['Odbiorca'] == odbiorca]) > 0 else None
+
+        matching = stan_biezacy_map[(stan_biezacy_map['Odbiorca'] == odbiorca) & (stan_biezacy_map['Nazwa'] == nazwa)]
+        stan_biezacy = matching['Stan bieżący'].iloc[0] if len(matching) > 0 else None
+
+        rotacja_transactions = df_raw[
+            (df_raw['Odbiorca'] == odbiorca) &
+            (df_raw['Nazwa'] == nazwa) &
+            (df_raw['Miesiąc'] == miesiac)
+        ].copy()
+
+        if not rotacja_transactions.empty:
+            rotacja_transactions['Data wystawienia'] = pd.to_datetime(rotacja_transactions['Data wystawienia'])
+
+        if not rotacja_transactions.empty:
+            rotacja_by_date = rotacja_transactions.groupby(rotacja_transactions['Data wystawienia'].dt.date)['Ilość zwrócona'].sum().to_dict()
+            total_rotacja = sum(rotacja_by_date.values())
+        else:
+            rotacja_by_date = {}
+            total_rotacja = 0
+
+        stan_by_date = {}
+        for _, row in group.iterrows():
+            date_range_start = pd.Timestamp(row['Data początkowa'])
+            date_range_end = pd.Timestamp(row['Data końcowa'])
+            stan_val = row['Stan']
+
+            current = date_range_start
+            while current <= date_range_end:
+                stan_by_date[current.date()] = stan_val
+                current += pd.DateOffset(days=1)
+
+        current_date = first_day
+        while current_date <= last_day:
+            date_key = current_date if not hasattr(current_date, 'date') else current_date.date()
+            stan_on_date = stan_by_date.get(date_key)
+            butlodni_on_date = stan_on_date if stan_on_date is not None else 0
+            rotacja_on_date = rotacja_by_date.get(date_key, 0)
+
+            daily_rows.append({
+                'Odbiorca': odbiorca,
+                'NIP': nip_val,
+                'Nazwa': nazwa,
+                'Data': date_key,
+                'Stan': stan_on_date,
+                'Butlo-dni': butlodni_on_date,
+                'rotacja': rotacja_on_date,
+                'rotacja miesięczna': total_rotacja,
+                'Stan bieżący': stan_biezacy
+            })
+
+            current_date += pd.DateOffset(days=1)
+
+    daily_df = pd.DataFrame(daily_rows)
+    return daily_df[['Odbiorca', 'NIP', 'Nazwa', 'Data', 'Stan', 'Butlo-dni', 'rotacja', 'rotacja miesięczna', 'Stan bieżący']]
+
+
+def legacy_rotacja(df_calc, sum_rot, nip_map):
+    rotacja_rows = []
+    for (odbiorca, nazwa, miesiac), group in df_calc.groupby(['Odbiorca', 'Nazwa', 'Miesiąc']):
+        last_row = group.sort_values('Data końcowa').iloc[-1]
+        total_butlodni = group['Butlo-dni'].sum()
+        rotacja_val = sum_rot[
+            (sum_rot['Odbiorca'] == odbiorca) &
+            (sum_rot['Nazwa'] == nazwa) &
+            (sum_rot['Miesiąc'] == miesiac)
+        ]['Ilość zwrócona'].sum() if not sum_rot.empty else 0
+
+        rotacja_rows.append({
+            'Odbiorca': odbiorca,
+            'Nazwa': nazwa,
+            'Miesiąc': miesiac,
+            'Stan': last_row['Stan'],
+            'Butlo-dni': total_butlodni,
+            'rotacja': rotacja_val
+        })
+
+    rotacja_summary = pd.DataFrame(rotacja_rows)
+    rotacja_summary = rotacja_summary.merge(nip_map, on='Odbiorca', how='left')
+    return rotacja_summary[['Odbiorca', 'NIP', 'Nazwa', 'Miesiąc', 'Stan', 'Butlo-dni', 'rotacja']]
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def make_transactions(n_rows, n_companies=20, n_products=5, seed=7):
+    """Synthetic order items spread over a year, including same-day documents."""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2025-01-01')
+    df = pd.DataFrame({
+        'Odbiorca': [f"Firma {i:03d}" for i in rng.integers(0, n_companies, n_rows)],
+        'Nazwa': [f"Produkt {i}" for i in rng.integers(0, n_products, n_rows)],
+        'Nr dokumentu': [f"FVS/{i}" for i in range(n_rows)],
+        'Data wystawienia': pd.to_datetime(start + rng.integers(0, 365, n_rows).astype('timedelta64[D]')),
+        'Ilość zamówiona': rng.integers(0, 10, n_rows).astype(float),
+        'Ilość zwrócona': rng.integers(0, 10, n_rows).astype(float),
+        'stan poprzedni': rng.integers(0, 50, n_rows).astype(float),
+        'stan po wymianie': rng.integers(0, 50, n_rows).astype(float),
+    })
+    df.sort_values(by=['Odbiorca', 'Nazwa', 'Data wystawienia'], inplace=True)
+    return df
+
+
+def prepared(df):
+    df = df.copy()
+    df['Miesiąc'] = df['Data wystawienia'].dt.strftime('%Y-%m')
+    return df
+
+
+def report_inputs(df):
+    """df_calc, df_raw, nip_map and stan_biezacy_map as generate_report builds them."""
+    df = prepared(df)
+    df['NIP'] = [f"{abs(hash(o)) % 10**10:010d}" for o in df['Odbiorca']]
+    df_calc = build_intervals(df)
+    for col in ['Data początkowa', 'Data końcowa']:
+        df_calc[col] = pd.to_datetime(df_calc[col], errors='coerce').dt.date
+    df_raw = df[['Odbiorca', 'NIP', 'Nazwa', 'Data wystawienia', 'Ilość zwrócona', 'Miesiąc']].copy()
+    df_raw['Data wystawienia'] = pd.to_datetime(df_raw['Data wystawienia'], errors='coerce').dt.date
+    nip_map = df[['Odbiorca', 'NIP']].drop_duplicates()
+    stan_biezacy_map = df.sort_values('Data wystawienia').groupby(['Odbiorca', 'Nazwa'], as_index=False).tail(1)
+    stan_biezacy_map = stan_biezacy_map[['Odbiorca', 'Nazwa', 'stan po wymianie']].rename(columns={'stan po wymianie': 'Stan bieżący'})
+    return df_calc, df_raw, nip_map, stan_biezacy_map
+
+
+def assert_frames_equal(expected, actual):
+    expected = expected[INTERVAL_COLUMNS].reset_index(drop=True)
+    actual = actual[INTERVAL_COLUMNS].reset_index(drop=True)
+    assert len(expected) == len(actual), f"row count {len(expected)} != {len(actual)}"
+    for col in INTERVAL_COLUMNS:
+        exp_col = expected[col]
+        act_col = actual[col]
+        if col in ('Data początkowa', 'Data końcowa'):
+            assert (pd.to_datetime(exp_col) == pd.to_datetime(act_col)).all(), f"column {col} differs"
+        elif col in ('liczba dni', 'Stan', 'Butlo-dni'):
+            assert np.allclose(exp_col.astype(float), act_col.astype(float)), f"column {col} differs"
+        else:
+            assert (exp_col.astype(str) == act_col.astype(str)).all(), f"column {col} differs"
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+def test_intervals_match_legacy_loop():
+    df = prepared(make_transactions(3000))
+    assert_frames_equal(legacy_intervals(df), build_intervals(df))
+
+
+def test_intervals_single_transaction_on_first_day():
+    df = prepared(pd.DataFrame({
+        'Odbiorca': ['Firma A'], 'Nazwa': ['Tlen'], 'Nr dokumentu': ['FVS/1'],
+        'Data wystawienia': [pd.Timestamp('2026-02-01')],
+        'stan poprzedni': [4.0], 'stan po wymianie': [6.0],
+    }))
+    result = build_intervals(df)
+    assert len(result) == 1
+    assert result.loc[0, 'liczba dni'] == 28
+    assert result.loc[0, 'Butlo-dni'] == 6.0 * 28
+    assert_frames_equal(legacy_intervals(df), result)
+
+
+def test_intervals_with_carry_forward_rows_and_ties():
+    df = prepared(pd.DataFrame({
+        'Odbiorca': ['Firma A'] * 5,
+        'Nazwa': ['Tlen'] * 5,
+        'Nr dokumentu': ['FVS/1', 'FVS/2', 'FVS/3', 'FVS/3', 'FVS/4'],
+        'Data wystawienia': pd.to_datetime(['2026-01-10', '2026-01-20', '2026-01-20', '2026-02-01', '2026-02-15']),
+        'stan poprzedni': [2.0, 5.0, 7.0, 3.0, 3.0],
+        'stan po wymianie': [5.0, 7.0, 3.0, 3.0, 9.0],
+    }))
+    assert_frames_equal(legacy_intervals(df), build_intervals(df))
+
+
+def test_annotate_matches_legacy():
+    today = pd.Timestamp('2026-01-15')
+    df = make_transactions(2000, seed=11)
+    expected = legacy_annotate(df.copy(), today)
+    actual = annotate_transactions(df.copy(), today)
+    for col in ('Data następna', 'Miesiąc', 'Is_first_of_month'):
+        assert (expected[col] == actual[col]).all(), f"column {col} differs"
+    for col in ('Liczba dni', 'Butlo-dni'):
+        assert np.allclose(expected[col].astype(float), actual[col].astype(float)), f"column {col} differs"
+
+
+def test_daily_expansion_matches_legacy_loop():
+    inputs = report_inputs(make_transactions(1500, n_companies=10, n_products=3, seed=3))
+    expected = legacy_daily(*inputs).reset_index(drop=True)
+    actual = expand_daily(*inputs)
+    assert list(actual.columns) == DAILY_COLUMNS
+    assert len(expected) == len(actual), f"row count {len(expected)} != {len(actual)}"
+    assert (pd.to_datetime(expected['Data']) == actual['Data']).all(), "column Data differs"
+    for col in ('Odbiorca', 'NIP', 'Nazwa'):
+        assert (expected[col].astype(str) == actual[col].astype(str)).all(), f"column {col} differs"
+    for col in ('Stan', 'Butlo-dni', 'rotacja', 'rotacja miesięczna', 'Stan bieżący'):
+        assert np.allclose(expected[col].astype(float), actual[col].astype(float), equal_nan=True), f"column {col} differs"
+
+def test_rotacja_summary_matches_legacy_loop():
+    df_calc, df_raw, nip_map, _ = report_inputs(make_transactions(1500, n_companies=10, n_products=3, seed=5))
+    sum_rot = df_raw.groupby(['Odbiorca', 'Nazwa', 'Miesiąc'], as_index=False)[['Ilość zwrócona']].sum()
+    expected = legacy_rotacja(df_calc, sum_rot, nip_map)
+    actual = summarize_rotacja(df_calc, sum_rot, nip_map)
+    assert list(actual.columns) == ROTACJA_COLUMNS
+    assert len(expected) == len(actual), f"row count {len(expected)} != {len(actual)}"
+    for col in ('Odbiorca', 'NIP', 'Nazwa', 'Miesiąc'):
+        assert (expected[col].astype(str) == actual[col].astype(str)).all(), f"column {col} differs"
+    for col in ('Stan', 'Butlo-dni', 'rotacja'):
+        assert np.allclose(expected[col].astype(float), actual[col].astype(float)), f"column {col} differs"
+
+def test_empty_frame():
+    df = prepared(make_transactions(10)).iloc[0:0]
+    result = build_intervals(df)
+    assert result.empty
+    assert list(result.columns) == INTERVAL_COLUMNS
+
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print("BUTLO-DNI ENGINE PARITY TEST")
+    print("=" * 70)
+
+    failures = 0
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            try:
+                func()
+                print(f"  ✓ PASS - {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"  ✗ FAIL - {name}: {e}")
+
+    sys.exit(1 if failures else 0)
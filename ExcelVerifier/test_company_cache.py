@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Test that the company list is read from the database once, not on every report load."""
+
+import sys
+import os
+import tempfile
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from PyQt5.QtGui import QColor
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication
+
+import core.company_db as company_db
+import core.excel_handler as excel_handler
+import core.file_manager as file_manager
+from core.database_handler import DatabaseHandler
+from report_fixtures import make_report
+
+app = QApplication.instance() or QApplication([])
+
+ROWS = [("Tlen", 1, 0, 1, 2)] * 30
+
+
+class CountingDatabase:
+    """Points the company db at a temporary database and counts get_companies calls."""
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, "test.db")
+        self.calls = 0
+
+    def __enter__(self):
+        self.saved = (company_db.DATABASE_FILE, excel_handler.DATABASE_FILE, file_manager.DATABASE_FILE,
+                      DatabaseHandler.get_companies)
+        company_db.DATABASE_FILE = excel_handler.DATABASE_FILE = file_manager.DATABASE_FILE = self.path
+        original = DatabaseHandler.get_companies
+
+        def counting(handler):
+            self.calls += 1
+            return original(handler)
+
+        DatabaseHandler.get_companies = counting
+        company_db.invalidate_company_cache()
+        return self
+
+    def __exit__(self, *exc):
+        (company_db.DATABASE_FILE, excel_handler.DATABASE_FILE, file_manager.DATABASE_FILE,
+         DatabaseHandler.get_companies) = self.saved
+        company_db.invalidate_company_cache()
+
+
+def test_company_names_cached_until_save():
+    with tempfile.TemporaryDirectory() as tmp, CountingDatabase(tmp) as db:
+        json_file = os.path.join(tmp, "missing.json")
+        company_db.save_company_db(json_file, [{"name": "Firma B", "nip": "1234567890"},
+                                               {"name": "firma a", "nip": "2222222222"}])
+        assert company_db.get_company_names(json_file) == ["firma a", "Firma B"]
+        company_db.get_company_names(json_file)
+        assert db.calls == 1
+
+        company_db.save_company_db(json_file, [{"name": "Firma C", "nip": "3333333333"}])
+        assert company_db.get_company_names(json_file) == ["Firma C"], "Saving invalidates the cache"
+        assert db.calls == 2
+
+
+def test_one_company_lookup_for_many_report_loads():
+    from ui.main_window import VerificationPage
+
+    with tempfile.TemporaryDirectory() as tmp, CountingDatabase(tmp) as db:
+        company_db.save_company_db(os.path.join(tmp, "missing.json"), [{"name": "Firma A", "nip": "1234567890"}])
+        page = VerificationPage()
+        page.unapproved_reports = [make_report(tmp, "a.xlsx", "Firma A", ROWS), make_report(tmp, "b.xlsx", "Firma X", ROWS)]
+        db.calls = 0
+
+        for index in (0, 1, 0, 1):
+            page.current_report_index = index
+            page.load_current_report()
+        assert db.calls == 1, f"{db.calls} company queries for 4 report loads"
+
+        background = page.table_model.data(page.table_model.index(0, 1), Qt.BackgroundRole)
+        assert background is not None and background.color() == QColor("#FEE2E2"), "Unknown company marked"
+        page.current_report_index = 0
+        page.load_current_report()
+        assert page.table_model.data(page.table_model.index(0, 1), Qt.BackgroundRole) is None
+        assert page.table.itemDelegateForColumn(1) is page.odbiorca_delegate
+        assert page.odbiorca_delegate.company_list == ["Firma A"]
+
+
+def test_approval_of_a_new_company_refreshes_the_list():
+    from ui.main_window import VerificationPage
+
+    with tempfile.TemporaryDirectory() as tmp, CountingDatabase(tmp):
+        saved_approved = excel_handler.APPROVED_DIRECTORY
+        excel_handler.APPROVED_DIRECTORY = os.path.join(tmp, "Zatwierdzone")
+        try:
+            company_db.save_company_db(os.path.join(tmp, "missing.json"), [{"name": "Firma A", "nip": "1234567890"}])
+            page = VerificationPage()
+            page.unapproved_reports = [make_report(tmp, "b.xlsx", "Firma N")]
+            page.current_report_index = 0
+            page.load_current_report()
+            assert page.table_model.data(page.table_model.index(0, 1), Qt.BackgroundRole) is not None
+
+            first = make_report(tmp, "a.xlsx", "Firma N")
+            handler = excel_handler.ExcelHandler()
+            handler.load_file(first)
+            handler.approve_report("a.xlsx", "2026-02-14", "Firma N", first)
+
+            page.load_current_report()
+            assert "Firma N" in page.odbiorca_delegate.company_list, "Company added by the approval"
+            assert page.table_model.data(page.table_model.index(0, 1), Qt.BackgroundRole) is None
+        finally:
+            excel_handler.APPROVED_DIRECTORY = saved_approved
+            DatabaseHandler.close_all()
+
+
+if __name__ == "__main__":
+    tests = [
+        test_company_names_cached_until_save,
+        test_one_company_lookup_for_many_report_loads,
+        test_approval_of_a_new_company_refreshes_the_list,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
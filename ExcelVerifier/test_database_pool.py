@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Test the per-thread connection pool and explicit transactions of DatabaseHandler."""
+
+import sys
+import os
+import tempfile
+import threading
+
+# Path fix
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from ExcelVerifier.core.database_handler import DatabaseHandler
+
+
+def make_db(tmp, **kwargs):
+    return DatabaseHandler(os.path.join(tmp, "test.db"), **kwargs)
+
+
+def test_connection_reused_per_thread():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(tmp)
+        with db._get_connection() as first:
+            pass
+        with db._get_connection() as second:
+            pass
+        assert first is second, "Connection should be reused within a thread"
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(db._pooled().conn))
+        thread.start()
+        thread.join()
+        assert other[0] is not first, "Each thread should get its own connection"
+        DatabaseHandler.close_all(db.db_path)
+
+
+def test_transaction_rolls_back_all_calls():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(tmp)
+        try:
+            with db.transaction():
+                company_id = db.add_company("Firma A")
+                db.add_order(company_id, "2026-02-14", "WZ/1")
+                raise RuntimeError("abort")
+        except RuntimeError:
+            pass
+        assert db.get_all_companies() == [], "Company should be rolled back"
+        assert db.get_all_orders() == [], "Order should be rolled back"
+        DatabaseHandler.close_all(db.db_path)
+
+
+def test_transaction_shared_between_handlers():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(tmp)
+        other = DatabaseHandler(db.db_path)
+        with db.transaction():
+            db.add_company("Firma A")
+            assert other.in_transaction(), "Second handler should join the transaction"
+            assert other.get_company_by_name("Firma A") is not None
+        assert not db.in_transaction()
+        DatabaseHandler.close_all(db.db_path)
+
+
+def test_integrity_error_inside_transaction_keeps_earlier_work():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(tmp)
+        with db.transaction():
+            first = db.add_company("Firma A")
+            again = db.add_company("Firma A")  # IntegrityError handled inside
+            order_id = db.add_order(first, "2026-02-14")
+            assert db.add_approved_record(order_id, "2026-02-14", "a.xlsx", "a.xlsx")
+            assert db.add_approved_record(order_id, "2026-02-14", "a.xlsx", "a.xlsx") is None
+        assert first == again
+        assert len(db.get_all_companies()) == 1
+        assert len(db.get_all_approved_records()) == 1
+        DatabaseHandler.close_all(db.db_path)
+
+
+def test_close_all_releases_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(tmp)
+        db.add_company("Firma A")
+        DatabaseHandler.close_all(db.db_path)
+        os.remove(db.db_path)
+        # The next handler reopens (and recreates) the database
+        db = DatabaseHandler(db.db_path)
+        assert db.get_all_companies() == []
+        DatabaseHandler.close_all(db.db_path)
+
+
+def test_lifetime_zero_opens_per_call():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(tmp, connection_lifetime=0)
+        with db._get_connection() as first:
+            pass
+        with db._get_connection() as second:
+            pass
+        assert first is not second, "Lifetime 0 should open a connection per call"
+        with db.transaction():
+            db.add_company("Firma A")
+        assert len(db.get_all_companies()) == 1
+
+
+if __name__ == "__main__":
+    tests = [
+        test_connection_reused_per_thread,
+        test_transaction_rolls_back_all_calls,
+        test_transaction_shared_between_handlers,
+        test_integrity_error_inside_transaction_keeps_earlier_work,
+        test_close_all_releases_file,
+        test_lifetime_zero_opens_per_call,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
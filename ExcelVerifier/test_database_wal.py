@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Test the opt-in WAL mode and connection pragmas of DatabaseHandler."""
+
+import sys
+import os
+import sqlite3
+import tempfile
+import threading
+
+# Path fix
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from ExcelVerifier.core import database_handler
+from ExcelVerifier.core.database_handler import DatabaseHandler
+
+
+def journal_mode(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("PRAGMA journal_mode").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_wal_enabled_with_pragmas():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test.db")
+        DatabaseHandler.configure(db_path, {'wal': True, 'synchronous': 'NORMAL',
+                                            'cache_size_kb': 8192, 'mmap_size_mb': 16})
+        db = DatabaseHandler(db_path)
+        assert db.is_wal()
+        with db._get_connection() as conn:
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+            assert conn.execute("PRAGMA cache_size").fetchone()[0] == -8192
+        assert journal_mode(db_path) == 'wal'
+        db.add_company("Firma A")
+        assert db.checkpoint("TRUNCATE")[0] == 0
+        DatabaseHandler.configure(db_path, {})
+
+
+def test_reader_does_not_block_writer():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test.db")
+        DatabaseHandler.configure(db_path, {'wal': True, 'busy_timeout_ms': 200})
+        db = DatabaseHandler(db_path)
+        db.add_company("Firma A")
+
+        reading = threading.Event()
+        written = threading.Event()
+        seen = []
+
+        def long_report_read():
+            reader = DatabaseHandler(db_path)
+            with reader.transaction():
+                seen.append(len(reader.get_all_companies()))
+                reading.set()
+                written.wait(5)
+                # Still sees its snapshot while the writer committed
+                seen.append(len(reader.get_all_companies()))
+            reader.close()
+
+        thread = threading.Thread(target=long_report_read)
+        thread.start()
+        reading.wait(5)
+        db.add_company("Firma B")  # would raise "database is locked" in rollback mode
+        written.set()
+        thread.join()
+
+        assert seen == [1, 1], seen
+        assert len(db.get_all_companies()) == 2
+        DatabaseHandler.configure(db_path, {})
+
+
+def test_network_path_falls_back():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test.db")
+        original = database_handler._is_network_path
+        database_handler._is_network_path = lambda path: True
+        try:
+            DatabaseHandler.configure(db_path, {'wal': True})
+            db = DatabaseHandler(db_path)
+            assert not db.is_wal()
+            assert db.checkpoint() is None
+            assert journal_mode(db_path) == 'delete'
+        finally:
+            database_handler._is_network_path = original
+            DatabaseHandler.configure(db_path, {})
+
+
+def test_disabling_wal_restores_rollback_journal():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test.db")
+        DatabaseHandler.configure(db_path, {'wal': True})
+        DatabaseHandler(db_path).add_company("Firma A")
+        assert journal_mode(db_path) == 'wal'
+
+        DatabaseHandler.configure(db_path, {'wal': False})
+        db = DatabaseHandler(db_path)
+        db.get_all_companies()
+        assert not db.is_wal()
+        assert journal_mode(db_path) == 'delete'
+        DatabaseHandler.close_all(db_path)
+
+
+if __name__ == "__main__":
+    tests = [
+        test_wal_enabled_with_pragmas,
+        test_reader_does_not_block_writer,
+        test_network_path_falls_back,
+        test_disabling_wal_restores_rollback_journal,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Test the streaming zip export of ImportExportHandler."""
+
+import sys
+import os
+import sqlite3
+import zipfile
+import tempfile
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+import core.company_db as company_db
+import core.import_export as import_export
+from core.database_handler import DatabaseHandler
+from report_fixtures import make_report, make_photo
+
+
+class ExportEnvironment:
+    """A temporary database and Reports folders for ImportExportHandler."""
+
+    def __init__(self, directory):
+        self.db_path = os.path.join(directory, "excelverifier.db")
+        self.approved = os.path.join(directory, "Reports", "Zatwierdzone")
+        self.unapproved = os.path.join(directory, "Reports", "Niezatwierdzone")
+
+    def __enter__(self):
+        self.saved = (import_export.DATABASE_FILE, import_export.APPROVED_DIRECTORY,
+                      import_export.REPORTS_ROOT, company_db.DATABASE_FILE)
+        import_export.DATABASE_FILE = company_db.DATABASE_FILE = self.db_path
+        import_export.APPROVED_DIRECTORY = self.approved
+        import_export.REPORTS_ROOT = self.unapproved
+        company_db.invalidate_company_cache()
+        return self
+
+    def __exit__(self, *exc):
+        (import_export.DATABASE_FILE, import_export.APPROVED_DIRECTORY,
+         import_export.REPORTS_ROOT, company_db.DATABASE_FILE) = self.saved
+        company_db.invalidate_company_cache()
+        DatabaseHandler.close_all(self.db_path)
+
+
+ROWS = [("Tlen medyczny", i, 1, 5, 6) for i in range(200)]
+
+
+def test_export_streams_sources_into_the_archive():
+    with tempfile.TemporaryDirectory() as tmp, ExportEnvironment(tmp) as env:
+        db = DatabaseHandler(env.db_path)
+        company_id = db.add_company("Firma A", "1234567890")
+        order_id = db.add_order(company_id, "2026-02-14")
+        approved = make_report(os.path.join(env.approved, "Firma A"), "a.xlsx", rows=ROWS)
+        make_photo(approved, data=os.urandom(3 * 1024 * 1024))
+        db.add_approved_record(order_id, "2026-02-14", "a.xlsx", approved)
+        make_photo(make_report(os.path.join(env.unapproved, "Firma B"), "b.xlsx", rows=ROWS), data=os.urandom(1000))
+
+        output = os.path.join(tmp, "export.zip")
+        progress = []
+        ok, message = import_export.ImportExportHandler().export_all_data(
+            output, progress_callback=lambda done, total: progress.append((done, total)))
+        assert ok, message
+        assert not os.path.exists(output + ".part")
+        assert not os.path.exists(output + ".db.part"), "Database snapshot removed after the export"
+
+        with zipfile.ZipFile(output) as archive:
+            infos = {info.filename: info for info in archive.infolist()}
+            root = import_export.EXPORT_ROOT
+            assert set(infos) == {
+                f"{root}/", f"{root}/excelverifier.db", f"{root}/company_db.json",
+                f"{root}/Reports/Zatwierdzone/Firma A/a.xlsx", f"{root}/Reports/Zatwierdzone/Firma A/a.jpg",
+                f"{root}/Niezatwierdzone/Firma B/b.xlsx", f"{root}/Niezatwierdzone/Firma B/b.jpg",
+            }, sorted(infos)
+            assert infos[f"{root}/Reports/Zatwierdzone/Firma A/a.jpg"].compress_type == zipfile.ZIP_STORED
+            assert infos[f"{root}/Reports/Zatwierdzone/Firma A/a.xlsx"].compress_type == zipfile.ZIP_DEFLATED
+            assert infos[f"{root}/excelverifier.db"].compress_type == zipfile.ZIP_DEFLATED
+            assert archive.testzip() is None
+            snapshot = os.path.join(tmp, "snapshot.db")
+            with open(snapshot, "wb") as f:
+                f.write(archive.read(f"{root}/excelverifier.db"))
+
+        conn = sqlite3.connect(snapshot)
+        try:
+            assert conn.execute("SELECT filename FROM approved_records").fetchall() == [("a.xlsx",)]
+        finally:
+            conn.close()
+
+        totals = {total for _, total in progress}
+        assert len(totals) == 1 and progress[-1][0] == progress[-1][1], "Progress reported in bytes up to the total"
+        assert progress[-1][1] > 3 * 1024 * 1024
+        assert len(progress) > 4, "Large files reported in chunks"
+        assert all(a[0] <= b[0] for a, b in zip(progress, progress[1:]))
+
+
+def test_failed_export_leaves_no_partial_file():
+    with tempfile.TemporaryDirectory() as tmp, ExportEnvironment(tmp) as env:
+        DatabaseHandler(env.db_path)
+        output = os.path.join(tmp, "missing", "export.zip")
+        ok, message = import_export.ImportExportHandler().export_all_data(output)
+        assert not ok and message.startswith("Błąd eksportu")
+        assert not any(os.path.exists(output + suffix) for suffix in ("", ".part", ".db.part"))
+
+
+def test_snapshot_includes_uncheckpointed_wal_content():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "wal.db")
+        DatabaseHandler.configure(db_path, {'wal': True, 'wal_autocheckpoint': 0, 'checkpoint_interval_s': 0})
+        try:
+            db = DatabaseHandler(db_path)
+            db.add_company("Firma W")
+            assert os.path.getsize(db_path + "-wal") > 0
+            snapshot = os.path.join(tmp, "snapshot.db")
+            db.snapshot(snapshot)
+            with open(snapshot, "rb") as f:
+                assert f.read(20)[18:] == b"\x01\x01", "Copy opens in rollback journal mode"
+            copy = sqlite3.connect(snapshot)
+            try:
+                assert copy.execute("SELECT name FROM companies").fetchall() == [("Firma W",)]
+            finally:
+                copy.close()
+            assert not os.path.exists(snapshot + "-wal")
+        finally:
+            DatabaseHandler.close_all(db_path)
+            DatabaseHandler.configure(db_path, None)
+
+
+if __name__ == "__main__":
+    tests = [
+        test_export_streams_sources_into_the_archive,
+        test_failed_export_leaves_no_partial_file,
+        test_snapshot_includes_uncheckpointed_wal_content,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Test the content-addressed cache of Gemini extraction results."""
+
+import sys
+import os
+import json
+import time
+import asyncio
+import tempfile
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+import core.image_transformer as image_transformer_module
+from core.image_transformer import ImageTransformer, COMBINED_PROMPT
+from core.extraction_cache import ExtractionCache, cache_key, get_cache
+from core.extraction_pipeline import ExtractionPipeline
+
+RESULT = {'odbiorca': 'Firma A', 'nr_dokumentu': 'WZ/1/2026', 'data_wystawienia': '14.02.2026',
+          'dane': '|Lp|Nazwa|\n|1|Tlen 10L|'}
+
+RESPONSE = "ODBIORCA: Firma A\nNr dokumentu: WZ/1/2026\nData wystawienia: 14.02.2026\n|1|Tlen 10L|2||1|5|6|"
+
+
+class CountingPipeline(ExtractionPipeline):
+    """Pipeline with a simulated API that counts model calls."""
+
+    def __init__(self, transformer):
+        super().__init__(transformer, {'requests_per_minute': 60000, 'burst': 1000})
+        self.calls = 0
+
+    async def _upload(self, image_path, data, mime_type=None):
+        return image_path
+
+    async def _generate(self, model_name, image_file):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return RESPONSE
+
+
+def make_image(directory, name, content=b"\xff\xd8 fake jpeg bytes"):
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+def test_key_depends_on_bytes_prompt_and_model():
+    base = cache_key(b"image", COMBINED_PROMPT, "gemini-3-flash-preview")
+    assert base == cache_key(b"image", COMBINED_PROMPT, "gemini-3-flash-preview")
+    assert base != cache_key(b"image2", COMBINED_PROMPT, "gemini-3-flash-preview")
+    assert base != cache_key(b"image", COMBINED_PROMPT + " ", "gemini-3-flash-preview")
+    assert base != cache_key(b"image", COMBINED_PROMPT, "gemini-2.5-pro")
+
+
+def test_lru_eviction_by_size():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ExtractionCache(os.path.join(tmp, "cache.db"))
+        entry_size = len(json.dumps(RESULT, ensure_ascii=False).encode('utf-8'))
+        cache.max_bytes = entry_size * 2 + 10  # room for two entries
+        cache.put("a", RESULT)
+        time.sleep(0.01)
+        cache.put("b", RESULT)
+        time.sleep(0.01)
+        assert cache.get("a") == RESULT  # "a" becomes the most recently used
+        time.sleep(0.01)
+        cache.put("c", RESULT)
+
+        assert cache.get("b") is None, "Least recently used entry evicted"
+        assert cache.get("a") == RESULT and cache.get("c") == RESULT
+        assert cache.stats()['entries'] == 2
+        assert cache.stats()['bytes'] <= cache.max_bytes
+        cache.close()
+
+
+def test_cache_hit_skips_api():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ExtractionCache(os.path.join(tmp, "cache.db"))
+        transformer = ImageTransformer(api_key="test", cache=cache)
+        image = make_image(tmp, "a.jpg")
+        with open(image, "rb") as f:
+            key, cached = transformer.cache_lookup(f.read())
+        assert cached is None
+        cache.put(key, RESULT)
+
+        original = image_transformer_module.genai.upload_file
+        image_transformer_module.genai.upload_file = lambda **kw: (_ for _ in ()).throw(RuntimeError("network"))
+        try:
+            start = time.perf_counter()
+            assert transformer.query_gemini_combined(image) == RESULT
+            assert time.perf_counter() - start < 0.05, "Cache hit should take milliseconds"
+
+            # Bypass: the API is called even though the image is cached
+            try:
+                transformer.query_gemini_combined(image, use_cache=False)
+                assert False, "Bypass should call the API"
+            except RuntimeError as e:
+                assert "network" in str(e)
+        finally:
+            image_transformer_module.genai.upload_file = original
+        cache.close()
+
+
+def test_pipeline_uses_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ExtractionCache(os.path.join(tmp, "cache.db"))
+        images = [make_image(tmp, f"{i}.jpg", bytes([i]) * 100) for i in range(5)]
+        images.append(make_image(tmp, "copy.jpg", bytes([0]) * 100))  # same bytes as 0.jpg
+
+        first = CountingPipeline(ImageTransformer(api_key="test", cache=cache))
+        first.run(images[:5])
+        assert first.calls == 5
+
+        second = CountingPipeline(ImageTransformer(api_key="test", cache=cache))
+        outcomes = second.run(images)
+        assert second.calls == 0, "Every image was cached (including the identical copy)"
+        assert all(value['nr_dokumentu'] == "WZ/1/2026" for _, value, _ in outcomes)
+
+        bypass = CountingPipeline(ImageTransformer(api_key="test", use_cache=False))
+        bypass.run(images[:2])
+        assert bypass.calls == 2
+        cache.close()
+
+
+def test_failed_extractions_not_cached():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ExtractionCache(os.path.join(tmp, "cache.db"))
+        transformer = ImageTransformer(api_key="test", cache=cache)
+        transformer.cache_store("k1", dict(RESULT, error="All models failed"))
+        transformer.cache_store("k2", dict(RESULT, odbiorca="UNKNOWN"))
+        assert cache.stats()['entries'] == 0
+        cache.close()
+
+
+def test_disabled_in_settings():
+    with tempfile.TemporaryDirectory() as tmp:
+        assert get_cache(os.path.join(tmp, "cache.db"), {'enabled': False}) is None
+        cache = get_cache(os.path.join(tmp, "cache.db"), {'max_size_mb': 1})
+        assert cache.max_bytes == 1024 * 1024
+        assert get_cache(os.path.join(tmp, "cache.db")) is cache
+        cache.close()
+
+
+if __name__ == "__main__":
+    tests = [
+        test_key_depends_on_bytes_prompt_and_model,
+        test_lru_eviction_by_size,
+        test_cache_hit_skips_api,
+        test_pipeline_uses_cache,
+        test_failed_extractions_not_cached,
+        test_disabled_in_settings,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
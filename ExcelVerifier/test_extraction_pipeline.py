@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Test the concurrent Gemini extraction pipeline: concurrency, rate limit, per-request backoff."""
+
+import sys
+import os
+import time
+import asyncio
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from google.api_core.exceptions import ServiceUnavailable, NotFound
+
+from core.image_transformer import ImageTransformer
+from core.extraction_pipeline import ExtractionPipeline, TokenBucket
+
+RESPONSE = """ODBIORCA: Firma A Sp. z o.o.
+Nr dokumentu: WZ/1/2026
+Data wystawienia: 14.02.2026
+|Lp|Nazwa|Ilość|Uwagi|Ilość|Stan poprzedni|Stan po wymianie|
+|1|Tlen 10L|2||1|5|6|"""
+
+FAST = {'requests_per_minute': 60000, 'burst': 1000, 'backoff_s': 0.01, 'max_backoff_s': 0.02}
+
+
+class FakePipeline(ExtractionPipeline):
+    """Pipeline whose API calls are simulated: each call takes `latency` seconds."""
+
+    def __init__(self, options=None, latency=0.05, failures=None):
+        super().__init__(ImageTransformer(api_key="test", use_cache=False), dict(FAST, **(options or {})))
+        self.latency = latency
+        self.failures = failures or {}  # (image, model) -> list of exceptions to raise first
+        self.in_flight = 0
+        self.peak = 0
+        self.calls = []
+
+    def run(self, image_paths, on_result=None, progress_callback=None):
+        # The images do not exist: their names stand in for the prepared bytes
+        return super().run(image_paths, on_result, progress_callback, prepare=str.encode)
+
+    async def _upload(self, image_path, data, mime_type=None):
+        await self.rate_limiter.acquire()
+        return image_path
+
+    async def _generate(self, model_name, image_file):
+        await self.rate_limiter.acquire()
+        self.calls.append((image_file, model_name))
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            pending = self.failures.get((image_file, model_name))
+            if pending:
+                raise pending.pop(0)
+            return RESPONSE
+        finally:
+            self.in_flight -= 1
+
+
+def test_many_requests_in_flight():
+    pipeline = FakePipeline({'max_in_flight': 10})
+    images = [f"img_{i}.jpg" for i in range(30)]
+    start = time.perf_counter()
+    outcomes = pipeline.run(images)
+    elapsed = time.perf_counter() - start
+
+    assert [p for p, _, _ in outcomes] == images, "Results keep input order"
+    assert all(error is None and value['nr_dokumentu'] == "WZ/1/2026" for _, value, error in outcomes)
+    assert pipeline.peak == 10, pipeline.peak
+    assert elapsed < 30 * 0.05 / 4, f"Not concurrent enough: {elapsed:.2f}s"
+
+
+def test_backoff_only_delays_failing_request():
+    failures = {("slow.jpg", "gemini-3-flash-preview"): [ServiceUnavailable("503"), ServiceUnavailable("503")]}
+    pipeline = FakePipeline({'backoff_s': 0.2, 'max_backoff_s': 0.4}, latency=0.01, failures=failures)
+    finished = []
+    outcomes = pipeline.run(["slow.jpg", "a.jpg", "b.jpg"], on_result=lambda p, r, data: finished.append(p) or r)
+
+    assert all(error is None for _, _, error in outcomes)
+    assert outcomes[0][1]['nr_dokumentu'] == "WZ/1/2026", "Third attempt succeeds on the same model"
+    assert finished[-1] == "slow.jpg", "Other images do not wait for the backoff"
+    assert [c for c in pipeline.calls if c[0] == "slow.jpg"] == [("slow.jpg", "gemini-3-flash-preview")] * 3
+
+
+def test_falls_back_to_next_model():
+    failures = {("a.jpg", "gemini-3-flash-preview"): [NotFound("no such model")]}
+    pipeline = FakePipeline(failures=failures, latency=0)
+    [(_, result, error)] = pipeline.run(["a.jpg"])
+    assert error is None and 'error' not in result
+    assert pipeline.calls == [("a.jpg", "gemini-3-flash-preview"), ("a.jpg", "gemini-2.5-flash")]
+
+
+def test_all_models_failing_reports_error():
+    failures = {("a.jpg", m): [ServiceUnavailable("503")] * 3
+                for m in ("gemini-3-flash-preview", "gemini-2.5-flash", "gemini-2.5-pro")}
+    pipeline = FakePipeline(failures=failures, latency=0)
+    [(_, result, error)] = pipeline.run(["a.jpg"])
+    assert error is None
+    assert result['error'] == 'All models failed' and result['odbiorca'] == 'UNKNOWN'
+    assert len(pipeline.calls) == 9
+
+
+def test_on_result_errors_and_progress():
+    progress = []
+
+    def on_result(image_path, result, data):
+        if image_path == "bad.jpg":
+            raise PermissionError("file is open in Excel")
+        return image_path.upper()
+
+    outcomes = FakePipeline(latency=0).run(["a.jpg", "bad.jpg"], on_result, lambda d, t: progress.append((d, t)))
+    assert outcomes == [("a.jpg", "A.JPG", None), ("bad.jpg", None, "file is open in Excel")]
+    assert progress == [(1, 2), (2, 2)]
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate_per_second=20, capacity=2)
+
+    async def take(n):
+        await asyncio.gather(*(bucket.acquire() for _ in range(n)))
+
+    start = time.perf_counter()
+    asyncio.run(take(6))
+    elapsed = time.perf_counter() - start
+    # 2 tokens are available at once, the other 4 arrive every 50 ms
+    assert 0.18 <= elapsed < 0.5, f"{elapsed:.3f}s"
+
+
+if __name__ == "__main__":
+    tests = [
+        test_many_requests_in_flight,
+        test_backoff_only_delays_failing_request,
+        test_falls_back_to_next_model,
+        test_all_models_failing_reports_error,
+        test_on_result_errors_and_progress,
+        test_token_bucket_limits_rate,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
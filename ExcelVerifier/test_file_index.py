@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Test the incremental report file index of FileManager."""
+
+import sys
+import os
+import shutil
+import tempfile
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from core.file_manager import FileManager
+from core.database_handler import DatabaseHandler
+
+
+def touch(*parts):
+    path = os.path.join(*parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x")
+    return path
+
+
+def age(path, seconds=60):
+    """Move a directory's mtime into the past (out of the racy window), as if changed earlier."""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns - seconds * 1_000_000_000))
+
+
+def age_tree(root):
+    for dirpath, _, _ in os.walk(root):
+        age(dirpath)
+
+
+def approve(db, filename):
+    company_id = db.add_company("Firma A")
+    order_id = db.add_order(company_id, "2026-02-14")
+    db.add_approved_record(order_id, "2026-02-14", filename, filename)
+
+
+def test_lists_reports_like_a_full_walk():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "Reports")
+        a = touch(root, "Firma A", "2026-02", "a.xlsx")
+        b = touch(root, "Firma B", "b.XLSM")
+        touch(root, "Firma B", "~$b.XLSM")
+        touch(root, "Firma B", "photo.jpg")
+        c = touch(root, "c.xls")
+        db_path = os.path.join(tmp, "t.db")
+        approve(DatabaseHandler(db_path), "b.XLSM")
+
+        manager = FileManager(root, db_path)
+        assert manager.get_unapproved_reports() == sorted([a, c])
+        assert manager.get_approved_reports() == [b]
+        assert manager._walk_reports() == sorted([a, b, c])
+        DatabaseHandler.close_all(db_path)
+
+
+def test_refresh_only_rescans_changed_directories():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "Reports")
+        for company in range(20):
+            for month in range(3):
+                touch(root, f"Firma {company}", f"2026-0{month + 1}", "r.xlsx")
+        age_tree(root)
+        manager = FileManager(root, os.path.join(tmp, "t.db"))
+        assert manager.refresh_index() == 1 + 20 + 60
+        assert manager.refresh_index() == 0, "Nothing changed"
+
+        added = touch(root, "Firma 7", "2026-02", "new.xlsx")
+        age(os.path.dirname(added))
+        assert manager.refresh_index() == 1
+        assert added in manager.get_unapproved_reports()
+
+        shutil.rmtree(os.path.join(root, "Firma 3"))
+        age(root)
+        assert manager.refresh_index() == 1
+        reports = manager.get_unapproved_reports()
+        assert len(reports) == 60 - 3 + 1
+        assert not any("Firma 3" + os.sep in p for p in reports), "Deleted directory dropped from the index"
+        assert len(DatabaseHandler(manager.db_path).get_indexed_directories()) == 1 + 19 + 57
+        DatabaseHandler.close_all(manager.db_path)
+
+
+def test_recent_directories_are_rescanned():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "Reports")
+        touch(root, "a.xlsx")
+        manager = FileManager(root, os.path.join(tmp, "t.db"))
+        assert manager.refresh_index() == 1
+        assert manager.refresh_index() == 1, "Changed within the racy window: mtime not trusted yet"
+        age(root)
+        assert manager.refresh_index() == 1
+        assert manager.refresh_index() == 0
+        assert manager.refresh_index(full=True) == 1
+        DatabaseHandler.close_all(manager.db_path)
+
+
+def test_approval_updates_the_flag_without_rescan():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "Reports")
+        a = touch(root, "Firma A", "a.xlsx")
+        b = touch(root, "Firma A", "b.xlsx")
+        age_tree(root)
+        db_path = os.path.join(tmp, "t.db")
+        manager = FileManager(root, db_path)
+        assert manager.get_unapproved_reports() == [a, b]
+
+        db = DatabaseHandler(db_path)
+        approve(db, "a.xlsx")
+        assert db.get_indexed_reports(approved=False) == ["Firma A/b.xlsx"], "Trigger marks the file approved"
+        assert manager.get_approved_reports() == [a]
+        db.delete_approved_record("a.xlsx")
+        assert manager.get_unapproved_reports() == [a, b]
+        DatabaseHandler.close_all(db_path)
+
+
+def test_clients_reaching_the_share_by_different_paths_share_the_index():
+    with tempfile.TemporaryDirectory() as tmp:
+        share = os.path.join(tmp, "share", "Reports")
+        for company in range(2):
+            for month in range(2):
+                touch(share, f"Firma {company}", f"2026-0{month + 1}", "r.xlsx")
+        age_tree(share)
+        mapped = os.path.join(tmp, "Z")                   # the same folder under another path
+        os.symlink(os.path.join(tmp, "share"), mapped)
+        db_path = os.path.join(tmp, "t.db")
+        first = FileManager(share, db_path)
+        second = FileManager(os.path.join(mapped, "Reports"), db_path)
+
+        assert first.refresh_index() == 1 + 2 + 4
+        assert second.refresh_index() == 0, "Index built by the other client is reused"
+        assert first.refresh_index() == 0 and second.refresh_index() == 0
+        reports = second.get_unapproved_reports()
+        assert len(reports) == 4 and all(p.startswith(mapped + os.sep) for p in reports)
+        assert first.indexed_directories()[0] == share
+        assert second.indexed_directories()[0] == os.path.join(mapped, "Reports")
+
+        shutil.rmtree(os.path.join(share, "Firma 1"))
+        age(share)
+        assert second.refresh_index() == 1
+        assert first.refresh_index() == 0
+        assert len(first.get_unapproved_reports()) == 2
+        assert len(DatabaseHandler(db_path).get_indexed_directories()) == 1 + 1 + 2, "Only the deleted folders pruned"
+        DatabaseHandler.close_all(db_path)
+
+
+def test_other_reports_root_replaces_the_index():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "t.db")
+        first = touch(tmp, "first", "a.xlsx")
+        second = touch(tmp, "second", "b.xlsx")
+        assert FileManager(os.path.dirname(first), db_path).get_unapproved_reports() == [first]
+        assert FileManager(os.path.dirname(second), db_path).get_unapproved_reports() == [second]
+        assert FileManager(os.path.join(tmp, "missing"), db_path).get_unapproved_reports() == []
+        DatabaseHandler.close_all(db_path)
+
+
+if __name__ == "__main__":
+    tests = [
+        test_lists_reports_like_a_full_walk,
+        test_refresh_only_rescans_changed_directories,
+        test_recent_directories_are_rescanned,
+        test_approval_updates_the_flag_without_rescan,
+        test_clients_reaching_the_share_by_different_paths_share_the_index,
+        test_other_reports_root_replaces_the_index,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
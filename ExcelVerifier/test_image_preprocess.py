@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""Test in-memory image preprocessing (rotate + trim + encode) and its use in the pipeline."""
+
+import sys
+import os
+import io
+import random
+import asyncio
+import tempfile
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from PIL import Image, ImageDraw
+
+from core.image_preprocess import preprocess_image, prepare_for_upload, find_content_bbox, optimize_for_upload
+from core.image_transformer import ImageTransformer
+from core.extraction_pipeline import ExtractionPipeline
+
+RESPONSE = "ODBIORCA: Firma A\nNr dokumentu: WZ/1/2026\nData wystawienia: 14.02.2026\n|1|Tlen 10L|2||1|5|6|"
+
+
+def make_photo(directory, name="photo.png", size=(400, 300), box=(100, 50, 200, 250)):
+    """White page with a black block (the "document") at box."""
+    img = Image.new("RGB", size, (255, 255, 255))
+    img.paste((0, 0, 0), box)
+    path = os.path.join(directory, name)
+    img.save(path)
+    return path
+
+
+def decode(data):
+    return Image.open(io.BytesIO(data))
+
+
+class BytesPipeline(ExtractionPipeline):
+    """Pipeline with a simulated API that records the bytes it was given."""
+
+    def __init__(self):
+        super().__init__(ImageTransformer(api_key="test", use_cache=False),
+                         {'requests_per_minute': 60000, 'burst': 1000})
+        self.uploaded = {}
+
+    async def _upload(self, image_path, data, mime_type=None):
+        self.uploaded[os.path.basename(image_path)] = data
+        return image_path
+
+    async def _generate(self, model_name, image_file):
+        await asyncio.sleep(0)
+        return RESPONSE
+
+
+def test_trim_without_rotation():
+    with tempfile.TemporaryDirectory() as tmp:
+        img = decode(preprocess_image(make_photo(tmp)))
+        assert img.size == (100, 200)
+        assert img.format == "PNG", "Source format is kept"
+        assert os.listdir(tmp) == ["photo.png"], "No temporary files"
+
+
+def test_rotate_then_trim():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Black block in the top-left quarter; 90° clockwise moves it to the top-right
+        path = make_photo(tmp, size=(400, 300), box=(0, 0, 100, 50))
+        img = decode(preprocess_image(path, rotation=90))
+        assert img.size == (50, 100)
+        full = decode(preprocess_image(make_photo(tmp, "full.png", box=(0, 0, 400, 300)), rotation=90))
+        assert full.size == (300, 400)
+
+
+def test_untouched_photo_keeps_original_bytes():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_photo(tmp, box=(0, 0, 400, 300))  # no white border
+        with open(path, "rb") as f:
+            original = f.read()
+        assert preprocess_image(path) == original
+        assert preprocess_image(path, rotation=360) == original
+
+
+def test_content_bbox_semantics():
+    img = Image.new("RGB", (300, 200), (255, 255, 255))
+    img.paste((255, 255, 200), (40, 30, 60, 50))  # pale yellow: only one channel is dark
+    img.paste((0, 0, 0), (100, 150, 101, 151))     # single dark pixel
+    assert find_content_bbox(img) == (40, 30, 101, 151)
+    assert find_content_bbox(img, margin=45) == (0, 0, 146, 196)
+    assert find_content_bbox(img, bg_threshold=199) == (100, 150, 101, 151)
+    assert find_content_bbox(Image.new("RGB", (50, 50), (255, 255, 255))) is None
+    assert find_content_bbox(img.convert("L"), bg_threshold=255) is not None
+
+
+def test_content_bbox_on_reduced_grid():
+    # 4100 px wide -> analysed at 1/3 resolution; the box may only grow by the grid
+    img = Image.new("RGB", (4100, 1000), (255, 255, 255))
+    img.paste((20, 20, 20), (1001, 500, 3002, 501))  # 1 px high line
+    left, top, right, bottom = find_content_bbox(img)
+    assert left <= 1001 and right >= 3002 and top <= 500 and bottom >= 501
+    assert 1001 - left < 3 and right - 3002 < 3 and 500 - top < 3 and bottom - 501 < 3
+
+
+def make_scan(size=(3200, 2400), stamp=None):
+    """Noisy grey "paper" with dark text blocks, optionally a red stamp."""
+    rng = random.Random(1)
+    img = Image.effect_noise(size, 12).point(lambda p: min(255, 200 + p // 5)).convert("RGB")
+    draw = ImageDraw.Draw(img)
+    for y in range(100, size[1] - 100, 60):
+        x = 100
+        while x < size[0] - 300:
+            w = rng.randint(40, 200)
+            draw.rectangle((x, y, x + w, y + 25), fill=(25, 25, 35))
+            x += w + 40
+    if stamp:
+        draw.ellipse(stamp, fill=(220, 30, 30))
+    return img
+
+
+def test_optimizer_downsamples_and_converts_to_grayscale():
+    img = make_scan()
+    data, mime_type = optimize_for_upload(img)
+    out = decode(data)
+    assert mime_type == "image/jpeg" and out.format == "JPEG"
+    assert max(out.size) == 2560 and out.size == (2560, 1920)
+    assert out.mode == "L", "No colour content -> grayscale"
+    phone_jpeg = io.BytesIO()
+    img.save(phone_jpeg, format="JPEG", quality=95)
+    assert len(data) < len(phone_jpeg.getvalue()) / 2
+
+    data, mime_type = optimize_for_upload(img, {'format': 'WEBP', 'max_long_edge': 0, 'grayscale': 'never'})
+    assert mime_type == "image/webp" and decode(data).size == (3200, 2400) and decode(data).mode == "RGB"
+
+
+def test_optimizer_keeps_colour_content():
+    img = make_scan(size=(1200, 900), stamp=(800, 600, 1000, 800))
+    data, _ = optimize_for_upload(img)
+    assert decode(data).mode == "RGB", "Red stamp -> keep colour"
+    assert decode(optimize_for_upload(img, {'grayscale': 'always'})[0]).mode == "L"
+
+
+def test_prepare_for_upload_falls_back_to_smaller_bytes():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Flat PNG: JPEG would be larger, so the PNG itself is sent
+        small = prepare_for_upload(make_photo(tmp))
+        assert small['data'] == small['image'] and small['mime_type'] == "image/png"
+
+        path = os.path.join(tmp, "scan.jpg")
+        make_scan().save(path, quality=95)
+        prepared = prepare_for_upload(path)
+        assert prepared['mime_type'] == "image/jpeg"
+        assert len(prepared['data']) < len(prepared['image']) <= prepared['original_bytes']
+
+        disabled = prepare_for_upload(path, upload_options={'enabled': False})
+        assert disabled['data'] == disabled['image']
+
+        pipeline = BytesPipeline()
+        pipeline.run([path], prepare=prepare_for_upload)
+        stats = pipeline.upload_stats
+        assert stats['images'] == 1 and stats['upload_bytes'] == len(prepared['data'])
+        assert stats['original_bytes'] == os.path.getsize(path)
+        assert "zaoszczędzono" in pipeline.upload_summary()
+
+
+def test_pipeline_uploads_prepared_bytes_from_process_pool():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [make_photo(tmp, f"{i}.png") for i in range(4)]
+        rotations = {paths[1]: 90}
+        pipeline = BytesPipeline()
+        saved = {}
+
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            outcomes = pipeline.run(
+                paths,
+                on_result=lambda p, result, data: saved.setdefault(os.path.basename(p), data),
+                prepare=functools.partial(prepare_for_upload, rotations=rotations),
+                executor=pool,
+            )
+
+        assert all(error is None for _, _, error in outcomes)
+        assert decode(pipeline.uploaded["0.png"]).size == (100, 200)
+        assert decode(pipeline.uploaded["1.png"]).size == (200, 100)
+        report_image = decode(saved["1.png"])
+        assert report_image.format == "PNG" and report_image.size == (200, 100), "Report keeps the trimmed photo"
+        assert sorted(os.listdir(tmp)) == ["0.png", "1.png", "2.png", "3.png"], "No temporary files"
+
+
+def test_preprocessing_failure_is_reported():
+    with tempfile.TemporaryDirectory() as tmp:
+        broken = os.path.join(tmp, "broken.jpg")
+        with open(broken, "wb") as f:
+            f.write(b"not an image")
+        pipeline = BytesPipeline()
+        [(_, value, error)] = pipeline.run([broken], prepare=prepare_for_upload)
+        assert value is None and error.startswith("Preprocessing error")
+        assert pipeline.uploaded == {}, "Nothing is sent when preprocessing fails"
+
+
+if __name__ == "__main__":
+    tests = [
+        test_trim_without_rotation,
+        test_rotate_then_trim,
+        test_untouched_photo_keeps_original_bytes,
+        test_content_bbox_semantics,
+        test_content_bbox_on_reduced_grid,
+        test_optimizer_downsamples_and_converts_to_grayscale,
+        test_optimizer_keeps_colour_content,
+        test_prepare_for_upload_falls_back_to_smaller_bytes,
+        test_pipeline_uploads_prepared_bytes_from_process_pool,
+        test_preprocessing_failure_is_reported,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
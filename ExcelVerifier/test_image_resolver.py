@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Test the linked-image resolver (one directory listing instead of a probe per extension)."""
+
+import sys
+import os
+import tempfile
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from core.image_resolver import ImageResolver
+
+
+def touch(*parts):
+    path = os.path.join(*parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+    return path
+
+
+def age(directory, seconds=60):
+    """Set a directory's mtime into the past (out of the racy window), a new value each call."""
+    st = os.stat(directory)
+    age.calls = getattr(age, "calls", 0) + 1
+    old = st.st_mtime_ns - seconds * 1_000_000_000 - age.calls
+    os.utime(directory, ns=(st.st_atime_ns, old))
+
+
+class CountingIO:
+    """Counts directory listings and existence probes."""
+
+    def __enter__(self):
+        self.listings = 0
+        self.probes = 0
+        self.saved = (os.scandir, os.path.exists)
+
+        def scandir(*args):
+            self.listings += 1
+            return self.saved[0](*args)
+
+        def exists(path):
+            self.probes += 1
+            return self.saved[1](path)
+
+        os.scandir, os.path.exists = scandir, exists
+        return self
+
+    def __exit__(self, *exc):
+        os.scandir, os.path.exists = self.saved
+
+
+def test_finds_photo_by_stem_and_extension_preference():
+    with tempfile.TemporaryDirectory() as tmp:
+        report = touch(tmp, "2026-02-14_Firma_A.xlsx")
+        png = touch(tmp, "2026-02-14_Firma_A.png")
+        jpg = touch(tmp, "2026-02-14_Firma_A.JPG")
+        touch(tmp, "2026-02-14_Firma_A.txt")
+        touch(tmp, "2026-02-14_Firma_B.jpg")
+        resolver = ImageResolver()
+        assert resolver.find_image(report) == jpg, ".jpg preferred, extension case ignored"
+        os.remove(jpg)
+        resolver.invalidate(tmp)
+        assert resolver.find_image(report) == png
+        assert resolver.find_image(os.path.join(tmp, "other.xlsx")) is None
+        assert resolver.find_image(os.path.join(tmp, "missing", "a.xlsx")) is None
+
+
+def test_cached_listing_is_reused_until_the_directory_changes():
+    with tempfile.TemporaryDirectory() as tmp:
+        reports = [touch(tmp, f"{i}.xlsx") for i in range(20)]
+        photos = [touch(tmp, f"{i}.jpg") for i in range(0, 20, 2)]
+        age(tmp)
+        resolver = ImageResolver()
+        with CountingIO() as io:
+            found = [resolver.find_image(r) for r in reports]
+            found = [resolver.find_image(r) for r in reports]
+        assert found == [photos[i // 2] if i % 2 == 0 else None for i in range(20)]
+        assert io.listings == 1 and io.probes == 0, f"{io.listings} listings, {io.probes} probes"
+
+        added = touch(tmp, "1.jpeg")
+        age(tmp)
+        with CountingIO() as io:
+            assert resolver.find_image(reports[1]) == added, "Directory changed: listed again"
+            assert resolver.find_image(reports[3]) is None
+        assert io.listings == 1
+
+
+def test_recently_changed_directory_is_listed_again():
+    with tempfile.TemporaryDirectory() as tmp:
+        report = touch(tmp, "a.xlsx")
+        resolver = ImageResolver()
+        assert resolver.find_image(report) is None
+        photo = touch(tmp, "a.jpg")
+        os.utime(tmp, ns=(os.stat(tmp).st_atime_ns, os.stat(tmp).st_mtime_ns))  # same mtime again
+        assert resolver.find_image(report) == photo, "Listing within the racy window is not trusted"
+
+
+def test_batch_lists_each_directory_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        a = [touch(tmp, "Firma A", f"{i}.xlsx") for i in range(5)]
+        b = [touch(tmp, "Firma B", f"{i}.xlsx") for i in range(5)]
+        photo = touch(tmp, "Firma B", "3.png")
+        resolver = ImageResolver()
+        with CountingIO() as io:
+            images = resolver.find_images(a + b)
+        assert io.listings == 2 and io.probes == 0
+        assert images[b[3]] == photo
+        assert sum(1 for image in images.values() if image) == 1
+
+
+if __name__ == "__main__":
+    tests = [
+        test_finds_photo_by_stem_and_extension_preference,
+        test_cached_listing_is_reused_until_the_directory_changes,
+        test_recently_changed_directory_is_listed_again,
+        test_batch_lists_each_directory_once,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
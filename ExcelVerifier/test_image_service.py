@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Test the decoded photo cache of the verification image pane."""
+
+import sys
+import os
+import time
+import tempfile
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from PIL import Image
+from PyQt5.QtWidgets import QApplication
+
+import core.company_db as company_db
+import core.excel_handler as excel_handler
+import core.file_manager as file_manager
+from ui.image_service import ImageService, decode_image
+from report_fixtures import make_report
+
+app = QApplication.instance() or QApplication([])
+
+
+def make_photo(directory, name, size, color=(200, 200, 200)):
+    path = os.path.join(directory, name)
+    Image.new("RGB", size, color).save(path)
+    return path
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "Timed out"
+        app.processEvents()
+        time.sleep(0.005)
+
+
+def test_screen_sized_decode_uses_a_few_mb():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_photo(tmp, "photo.jpg", (4000, 3000))
+        images = ImageService(max_side=1080)
+        image = images.load(path)
+        assert (image.width(), image.height()) == (1080, 810)
+        assert images.cache_bytes() < 4 * 1024 * 1024, f"{images.cache_bytes()} bytes for one photo"
+        assert images.cached(path) is image
+
+        full = images.full_image(path)
+        assert (full.width(), full.height()) == (4000, 3000), "Full resolution only on request"
+        assert images.cached(path) is image, "Full resolution is not cached"
+        images.shutdown()
+
+
+def test_exif_orientation_applied():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "rotated.jpg")
+        exif = Image.Exif()
+        exif[0x0112] = 6  # stored landscape, shown rotated 90° clockwise
+        Image.new("RGB", (400, 200), (0, 0, 0)).save(path, exif=exif)
+        image = decode_image(path, 100)
+        assert (image.width(), image.height()) == (50, 100)
+        assert (decode_image(path).width(), decode_image(path).height()) == (200, 400)
+        assert decode_image(os.path.join(tmp, "missing.jpg")) is None
+
+
+def test_cache_is_memory_bounded_and_follows_file_changes():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [make_photo(tmp, f"{i}.png", (100, 100)) for i in range(4)]
+        one = 100 * 100 * 4
+        images = ImageService(max_side=100, max_bytes=2 * one)
+        for path in paths[:3]:
+            images.load(path)
+        assert images.cache_bytes() <= 2 * one
+        assert images.cached(paths[0]) is None, "Least recently used evicted"
+        assert images.cached(paths[2]) is not None
+
+        time.sleep(0.01)
+        make_photo(tmp, "2.png", (50, 100))
+        assert images.cached(paths[2]) is None, "Photo replaced since it was decoded"
+        assert images.load(paths[2]).width() == 50
+        assert images.cache_bytes() <= 2 * one, "Old version dropped"
+        assert images.load(os.path.join(tmp, "missing.png")) is None
+        images.shutdown()
+
+
+def test_request_decodes_in_background():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_photo(tmp, "photo.jpg", (800, 600))
+        images = ImageService(max_side=200)
+        received = []
+        images.image_ready.connect(lambda p, image: received.append((p, image)))
+        images.request(path)
+        images.request(os.path.join(tmp, "broken.jpg"))
+        wait_for(lambda: len(received) == 2)
+        assert received[0][0] == path and received[0][1].width() == 200
+        assert received[1][1] is None
+        images.shutdown()
+
+
+def test_page_shows_photo_when_decoded():
+    from ui.main_window import VerificationPage
+
+    with tempfile.TemporaryDirectory() as tmp:
+        saved = (company_db.DATABASE_FILE, excel_handler.DATABASE_FILE, file_manager.DATABASE_FILE)
+        company_db.DATABASE_FILE = excel_handler.DATABASE_FILE = file_manager.DATABASE_FILE = os.path.join(tmp, "t.db")
+        try:
+            report = make_report(tmp, "a.xlsx")
+            make_photo(tmp, "a.jpg", (3000, 4000))
+
+            page = VerificationPage()
+            page.find_linked_image = lambda p: os.path.splitext(p)[0] + ".jpg"
+            page.images.max_side = 400
+            page.unapproved_reports = [report]
+            page.current_report_index = 0
+            page.load_current_report()
+            assert page.image_label.text() == "Ładowanie zdjęcia...", "Decoded off the GUI thread"
+            wait_for(lambda: page.image_label._pixmap is not None)
+            assert (page.image_label._pixmap.width(), page.image_label._pixmap.height()) == (300, 400)
+            page.prefetcher.shutdown()
+            page.images.shutdown()
+        finally:
+            company_db.DATABASE_FILE, excel_handler.DATABASE_FILE, file_manager.DATABASE_FILE = saved
+
+
+if __name__ == "__main__":
+    tests = [
+        test_screen_sized_decode_uses_a_few_mb,
+        test_exif_orientation_applied,
+        test_cache_is_memory_bounded_and_follows_file_changes,
+        test_request_decodes_in_background,
+        test_page_shows_photo_when_decoded,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Test the openpyxl pivot sheets of the Butlo-dni report (no Excel/COM needed)."""
+
+import sys
+import os
+import tempfile
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.utils import get_column_letter
+
+import core.excel_handler as excel_handler_module
+from core.pivot_writer import PIVOT_SPECS, HEADER_ROW, aggregate_pivot
+from report_fixtures import ApprovalEnvironment, make_report
+
+REPORTS = [
+    ("Firma A", "05.02.2026", [("Tlen 10L", 4, 0, 0, 4), ("Azot 20L", 2, 0, 0, 2)]),
+    ("Firma A", "19.02.2026", [("Tlen 10L", 1, 2, 4, 3)]),
+    ("Firma B", "10.02.2026", [("Tlen 10L", 5, 0, 0, 5)]),
+]
+
+
+def generate(tmp, env):
+    handler = excel_handler_module.ExcelHandler()
+    reports = []
+    for company, date, rows in REPORTS:
+        day, month, year = date.split(".")
+        filename = f"{year}-{month}-{day}_{company.replace(' ', '_')}.xlsx"
+        path = make_report(env.unapproved, filename, company, rows, date=date)
+        reports.append((filename, f"{year}-{month}-{day}", company, path))
+    assert all(error is None for _, error in handler.approve_reports(reports))
+    output = os.path.join(tmp, "raport.xlsx")
+    assert handler.generate_report({'mode': 1, 'month': '2026-02'}, output_path=output) == output
+    return output
+
+
+def test_report_pivot_sheets():
+    with tempfile.TemporaryDirectory() as tmp, ApprovalEnvironment(tmp) as env:
+        output = generate(tmp, env)
+        wb = load_workbook(output)
+        pivot_names = [spec['name'] for spec in reversed(PIVOT_SPECS)]
+        assert wb.sheetnames[:len(pivot_names)] == pivot_names, wb.sheetnames
+        assert wb.active.title == pivot_names[0]
+        sources = {spec['source'] for spec in PIVOT_SPECS} | {"Podsumowanie"}
+        assert {ws.title for ws in wb.worksheets if ws.sheet_state == 'hidden'} == sources
+
+        for spec in PIVOT_SPECS:
+            ws = wb[spec['name']]
+            keys = spec['page_fields'] + spec['row_fields']
+            values = [field for field, _, _ in spec['data_fields']]
+            source = pd.read_excel(output, sheet_name=spec['source'])
+            expected = source.groupby(keys, dropna=False)[values].sum()
+
+            rows = list(ws.iter_rows(min_row=HEADER_ROW + 1, values_only=True))
+            assert len(rows) == len(expected) > 0, spec['name']
+            written = pd.DataFrame(rows, columns=keys + values)
+            assert np.allclose(written[values].to_numpy(dtype=float), expected.to_numpy(dtype=float)), spec['name']
+
+            last_row = HEADER_ROW + len(rows)
+            last_col = get_column_letter(len(keys) + len(values))
+            assert ws["A1"].value == "Suma końcowa"
+            for offset in range(len(values)):
+                letter = get_column_letter(len(keys) + offset + 1)
+                assert ws[f"{letter}1"].value == f"=SUBTOTAL(109,{letter}{HEADER_ROW + 1}:{letter}{last_row})"
+            assert ws.auto_filter.ref == f"A{HEADER_ROW}:{last_col}{last_row}"
+
+        rotacja = pd.DataFrame(list(wb["Rotacja"].iter_rows(min_row=HEADER_ROW + 1, values_only=True)))
+        returned = rotacja.groupby([2, 3])[6].sum().to_dict()
+        assert returned == {("Firma A", "Azot 20L"): 0, ("Firma A", "Tlen 10L"): 2, ("Firma B", "Tlen 10L"): 0}
+
+
+def test_missing_keys_are_their_own_group():
+    spec = {'page_fields': ['Odbiorca', 'NIP'], 'row_fields': ['Nazwa'],
+            'data_fields': [('rotacja', 'Sum of rotacja', '0')]}
+    source = pd.DataFrame({
+        'Odbiorca': ["Firma A", "Firma A", "Firma A"],
+        'NIP': [None, None, "1234567890"],
+        'Nazwa': ["Tlen", "Tlen", "Tlen"],
+        'rotacja': [1, 2, 4],
+    })
+    table = aggregate_pivot(source, spec)
+    assert table['rotacja'].tolist() == [4, 3], "Blank NIP grouped like (blank) in a pivot"
+    assert aggregate_pivot(source.iloc[:0], spec).empty
+
+
+if __name__ == "__main__":
+    tests = [
+        test_report_pivot_sheets,
+        test_missing_keys_are_their_own_group,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""EXPLAIN QUERY PLAN checks: hot DatabaseHandler queries must search an index, not scan a table.
+
+Every query runs through the real handler method; its SQL is captured with a
+trace callback and explained on the same connection. A test fails when a
+table shows up as "SCAN <alias>" (full table scan) or the expected index is
+not used, e.g. after a filter falls back to LIKE or an index is dropped.
+"""
+
+import sys
+import os
+import tempfile
+
+# Path fix
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from ExcelVerifier.core.database_handler import DatabaseHandler
+
+
+def make_db(tmp):
+    """A small database: 20 companies x 12 monthly orders x 5 products."""
+    db = DatabaseHandler(os.path.join(tmp, "plans.db"))
+    with db.transaction():
+        product_ids = db.add_products([f"Produkt {k}" for k in range(5)])
+        for c in range(20):
+            company_id = db.add_company(f"Firma {c}")
+            for month in range(1, 13):
+                date = f"2025-{month:02d}-{10 + c % 9}"
+                order_id = db.add_order(company_id, date, f"WZ/{c}/{month}")
+                db.add_approved_record(order_id, date, f"{date}_Firma_{c}.xlsx", "x.xlsx")
+                db.add_order_items([{
+                    'order_id': order_id, 'product_id': product_id,
+                    'quantity_delivery': 1, 'quantity_return': 0,
+                    'previous_state': 0, 'state_after': 1,
+                } for product_id in product_ids.values()])
+    return db
+
+
+def query_plan(db, call):
+    """Runs call(db) and returns the plan lines of every SELECT it executed."""
+    statements = []
+    with db._get_connection() as conn:
+        conn.set_trace_callback(statements.append)
+    try:
+        call(db)
+    finally:
+        with db._get_connection() as conn:
+            conn.set_trace_callback(None)
+
+    plans = []
+    with db._get_connection() as conn:
+        for sql in statements:
+            if sql.lstrip().upper().startswith("SELECT"):
+                plans.append([row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)])
+    assert plans, "No SELECT captured"
+    return plans
+
+
+def assert_indexed(call, expected_index, allowed_scans=()):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(tmp)
+        try:
+            for plan in query_plan(db, call):
+                text = "\n".join(plan)
+                scans = [line for line in plan if line.startswith("SCAN ")
+                         and line.split()[1] not in allowed_scans]
+                assert not scans, f"Full scan in plan:\n{text}"
+                assert expected_index in text, f"{expected_index} not used:\n{text}"
+        finally:
+            DatabaseHandler.close_all(db.db_path)
+
+
+def test_approved_records_by_month():
+    assert_indexed(lambda db: db.get_approved_records_by_month("2025-03"), "idx_approved_date")
+
+
+def test_approved_records_filtered_by_month():
+    assert_indexed(lambda db: db.get_approved_records_filtered(month="2025-03"), "idx_approved_date")
+
+
+def test_approved_records_filtered_by_company():
+    assert_indexed(lambda db: db.get_approved_records_filtered(month="2025-03", company_name="Firma 3"),
+                   "idx_approved_order")
+
+
+def test_order_items_by_month():
+    assert_indexed(lambda db: db.get_all_order_items_with_details({'month': '2025-03'}),
+                   "idx_orders_date")
+
+
+def test_order_items_by_date_range():
+    assert_indexed(lambda db: db.get_all_order_items_with_details(
+        {'start_date': '2025-03-01', 'end_date': '2025-04-15'}), "idx_orders_date")
+
+
+def test_order_items_by_company_and_month():
+    assert_indexed(lambda db: db.get_all_order_items_with_details(
+        {'company_ids': [1, 2], 'month': '2025-03'}), "idx_orders_company_date")
+
+
+def test_order_items_by_company():
+    assert_indexed(lambda db: db.get_all_order_items_with_details({'company_ids': [1, 2]}),
+                   "idx_order_items_order_product")
+
+
+def test_report_snapshots():
+    # Lists every approved record, so scanning approved_records itself is expected
+    assert_indexed(lambda db: db.get_report_snapshots(), "idx_order_items_order_product",
+                   allowed_scans=("ar",))
+
+
+def test_month_filter_keeps_boundaries():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(tmp)
+        try:
+            items = db.get_all_order_items_with_details({'month': '2025-12'})
+            assert items and all(item['date_issued'].startswith("2025-12") for item in items)
+            ranged = db.get_all_order_items_with_details({'start_date': '2025-03-10', 'end_date': '2025-03-10'})
+            assert {item['date_issued'] for item in ranged} == {"2025-03-10"}, "end_date is inclusive"
+        finally:
+            DatabaseHandler.close_all(db.db_path)
+
+
+if __name__ == "__main__":
+    tests = [
+        test_approved_records_by_month,
+        test_approved_records_filtered_by_month,
+        test_approved_records_filtered_by_company,
+        test_order_items_by_month,
+        test_order_items_by_date_range,
+        test_order_items_by_company_and_month,
+        test_order_items_by_company,
+        test_report_snapshots,
+        test_month_filter_keeps_boundaries,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Test the rows report generation reads: database snapshot, stale workbooks and records without items."""
+
+import sys
+import os
+import time
+import tempfile
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+import pandas as pd
+from openpyxl import load_workbook
+
+import core.excel_handler as excel_handler_module
+from report_fixtures import ApprovalEnvironment, make_report
+
+# A named line, a line without a name but with a Stan value, and an empty line
+ROWS = [("Tlen 10L", 2, 1, 5, 6), (None, 1, 0, 0, 1), (None, None, None, None, None)]
+
+
+def report_rows(df):
+    """(company, product, delivery, return, state after) of every row, sorted."""
+    return sorted(
+        (r['Odbiorca'], r['Nazwa'], float(r['Ilość zamówiona'] or 0), float(r['Ilość zwrócona'] or 0),
+         float(r['stan po wymianie']))
+        for _, r in df.iterrows()
+    )
+
+
+def test_snapshot_stale_workbook_and_missing_items():
+    with tempfile.TemporaryDirectory() as tmp, ApprovalEnvironment(tmp) as env:
+        handler = excel_handler_module.ExcelHandler()
+        reports = []
+        for company in ("Firma A", "Firma B"):
+            filename = f"2026-02-14_{company.replace(' ', '_')}.xlsx"
+            path = make_report(env.unapproved, filename, company, ROWS)
+            reports.append((filename, "2026-02-14", company, path))
+        assert handler.approve_reports(reports) == [(name, None) for name, *_ in reports]
+
+        # Firma B: workbook edited after approval (newer than its order_items)
+        stale = os.path.join(env.approved, reports[1][0])
+        wb = load_workbook(stale)
+        wb.active.cell(row=4, column=7, value=9)
+        wb.save(stale)
+        future = time.time() + 120
+        os.utime(stale, (future, future))
+
+        # Firma C: approved record without stored items
+        missing = make_report(env.approved, "2026-02-14_Firma_C.xlsx", "Firma C", ROWS)
+        company_id = handler.db.add_company("Firma C")
+        order_id = handler.db.add_order(company_id, "2026-02-14")
+        handler.db.add_approved_record(order_id, "2026-02-14", os.path.basename(missing), missing)
+
+        fresh = os.path.join(env.approved, reports[0][0])
+        snapshot_rows = report_rows(pd.DataFrame.from_records(
+            handler._read_approved_workbook(fresh), columns=handler.REPORT_COLUMNS))
+
+        df = handler._load_report_data(handler.db, {})
+        assert report_rows(df[df['Odbiorca'] == "Firma A"]) == snapshot_rows, "Snapshot rows match the workbook"
+        assert report_rows(df) == sorted([
+            ("Firma A", "Nieokreślony", 1.0, 0.0, 1.0), ("Firma A", "Tlen 10L", 2.0, 1.0, 6.0),
+            ("Firma B", "Nieokreślony", 1.0, 0.0, 1.0), ("Firma B", "Tlen 10L", 2.0, 1.0, 9.0),
+            ("Firma C", "Nieokreślony", 1.0, 0.0, 1.0), ("Firma C", "Tlen 10L", 2.0, 1.0, 6.0),
+        ]), "Stale order read from its workbook only, not also from order_items"
+
+
+if __name__ == "__main__":
+    tests = [
+        test_snapshot_stale_workbook_and_missing_items,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Test the background prefetch of neighbouring reports in the verification view."""
+
+import sys
+import os
+import time
+import tempfile
+from concurrent.futures import wait
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from PyQt5.QtWidgets import QApplication
+
+import core.company_db as company_db
+import core.excel_handler as excel_handler
+import core.file_manager as file_manager
+from ui.report_prefetcher import ReportPrefetcher
+from ui.image_service import ImageService
+from report_fixtures import make_report, make_photo
+
+app = QApplication.instance() or QApplication([])
+
+
+def find_image(path):
+    image = os.path.splitext(path)[0] + ".jpg"
+    return image if os.path.exists(image) else None
+
+
+def new_prefetcher(capacity=4, images=None):
+    handler = excel_handler.ExcelHandler.__new__(excel_handler.ExcelHandler)
+    handler.current_workbook = None
+    return ReportPrefetcher(handler.read_report, find_image, images=images, capacity=capacity)
+
+
+def settle(prefetcher):
+    """Wait for the queued prefetches (take() skips ones that have not started)."""
+    wait(list(prefetcher._entries.values()))
+
+
+def test_prefetched_report_and_scaled_image():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_report(tmp, "a.xlsx")
+        make_photo(path, size=(1200, 800))
+        images = ImageService(max_side=256)
+        prefetcher = new_prefetcher(images=images)
+        prefetcher.prefetch([path])
+        settle(prefetcher)
+        report = prefetcher.take(path)
+        assert report['df'].iloc[0, 1] == "Firma A"
+        assert report['style_map'] == {}
+        assert report['image_path'] == find_image(path)
+        image = images.cached(report['image_path'])
+        assert (image.width(), image.height()) == (256, 170), "Photo decoded into the image cache"
+        assert prefetcher.take(path) is report, "Kept in the LRU"
+        prefetcher.shutdown()
+        images.shutdown()
+
+
+def test_changed_or_moved_files_are_not_served():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_report(tmp, "a.xlsx")
+        prefetcher = new_prefetcher()
+        prefetcher.prefetch([path])
+        settle(prefetcher)
+        assert prefetcher.take(path) is not None
+
+        time.sleep(0.01)
+        make_report(tmp, "a.xlsx", odbiorca="Firma B")
+        assert prefetcher.take(path) is None, "Report saved since the prefetch"
+        prefetcher.prefetch([path])
+        settle(prefetcher)
+        assert prefetcher.take(path)['df'].iloc[0, 1] == "Firma B"
+
+        os.remove(path)
+        assert prefetcher.take(path) is None, "Report approved/deleted since the prefetch"
+        assert prefetcher.take(os.path.join(tmp, "never.xlsx")) is None
+        prefetcher.shutdown()
+
+
+def test_lru_is_bounded():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [make_report(tmp, f"{i}.xlsx") for i in range(5)]
+        prefetcher = new_prefetcher(capacity=2)
+        prefetcher.prefetch(paths[:2])
+        prefetcher.prefetch([paths[2]])
+        assert list(prefetcher._entries) == [paths[0], paths[2]], "Most important of a batch is evicted last"
+        settle(prefetcher)
+        prefetcher.take(paths[0])
+        prefetcher.prefetch([paths[3]])
+        assert list(prefetcher._entries) == [paths[0], paths[3]]
+        prefetcher.shutdown()
+        prefetcher.prefetch([paths[4]])
+        assert prefetcher.take(paths[4]) is None, "Nothing is prefetched after shutdown"
+
+
+def test_next_report_uses_prefetched_neighbour():
+    from ui.main_window import VerificationPage
+
+    with tempfile.TemporaryDirectory() as tmp:
+        saved = (company_db.DATABASE_FILE, excel_handler.DATABASE_FILE, file_manager.DATABASE_FILE)
+        company_db.DATABASE_FILE = excel_handler.DATABASE_FILE = file_manager.DATABASE_FILE = os.path.join(tmp, "t.db")
+        try:
+            page = VerificationPage()
+            page.unapproved_reports = [make_report(tmp, f"{i}.xlsx") for i in range(3)]
+            for path in page.unapproved_reports:
+                make_photo(path, size=(300, 200))
+            page.current_report_index = 0
+            page.load_current_report()
+            settle(page.prefetcher)
+
+            report = page.prefetcher.take(page.unapproved_reports[1])
+            assert report is not None, "Next report prefetched after the load"
+            page.next_report()
+            assert page.excel_handler.current_workbook is report['workbook']
+            assert page.current_image_path == find_image(page.unapproved_reports[1])
+            assert page.image_label._pixmap.width() == 300, "Prefetched photo shown without waiting"
+            assert set(page.prefetcher._entries) >= {page.unapproved_reports[0], page.unapproved_reports[2]}
+            page.prefetcher.shutdown()
+            page.images.shutdown()
+        finally:
+            company_db.DATABASE_FILE, excel_handler.DATABASE_FILE, file_manager.DATABASE_FILE = saved
+
+
+if __name__ == "__main__":
+    tests = [
+        test_prefetched_report_and_scaled_image,
+        test_changed_or_moved_files_are_not_served,
+        test_lru_is_bounded,
+        test_next_report_uses_prefetched_neighbour,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Test the verification table model: lazy display, styles, dirty cells and saving only edits."""
+
+import sys
+import os
+import tempfile
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.styles import Font, PatternFill
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor
+from PyQt5.QtWidgets import QApplication
+
+from core.excel_handler import ExcelHandler
+from ui.report_table_model import ReportTableModel
+from report_fixtures import make_report
+
+app = QApplication.instance() or QApplication([])
+
+
+def make_styled_report(directory):
+    path = make_report(directory, "2026-02-14_Firma A.xlsx", rows=[("Tlen", 2, 1, 5, 6), ("Azot", 1, 0, 0, 1)])
+    wb = load_workbook(path)
+    ws = wb.active
+    ws["A1"].font = Font(bold=True)
+    ws["G4"].fill = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
+    wb.save(path)
+    return path
+
+
+def load(path):
+    handler = ExcelHandler.__new__(ExcelHandler)
+    handler.original_fills = {}
+    df = handler.load_file(path)
+    model = ReportTableModel()
+    model.set_report(df, handler.get_formatting())
+    return handler, model
+
+
+def test_display_and_styles():
+    with tempfile.TemporaryDirectory() as tmp:
+        _, model = load(make_styled_report(tmp))
+        assert (model.rowCount(), model.columnCount()) == (5, 7)
+        assert model.data(model.index(0, 1)) == "Firma A"
+        assert model.data(model.index(1, 0)) == "", "Empty row"
+        assert model.data(model.index(3, 6)) == "6"
+        assert model.data(model.index(0, 0), Qt.FontRole).bold()
+        assert model.data(model.index(3, 6), Qt.BackgroundRole).color() == QColor("#DDDDDD")
+        assert model.data(model.index(3, 5), Qt.BackgroundRole) is None
+        model.wrap_columns = {1}
+        assert model.data(model.index(3, 1), Qt.TextAlignmentRole) == int(Qt.AlignLeft | Qt.AlignTop)
+
+
+def test_dirty_cells():
+    with tempfile.TemporaryDirectory() as tmp:
+        _, model = load(make_styled_report(tmp))
+        changed = []
+        model.dataChanged.connect(lambda a, b, roles: changed.append((a.row(), a.column())))
+
+        assert not model.setData(model.index(3, 6), "6"), "Same text is not an edit"
+        assert model.setData(model.index(3, 6), "7")
+        assert model.setData(model.index(0, 1), "Firma B")
+        assert model.dirty_cells() == {(3, 6): "7", (0, 1): "Firma B"}
+        assert model.setData(model.index(3, 6), "6")
+        assert model.dirty_cells() == {(0, 1): "Firma B"}, "Typing the original back cleans the cell"
+        assert changed == [(3, 6), (0, 1), (3, 6)]
+
+        model.set_background(0, 1, QColor("#FEE2E2"))
+        assert model.data(model.index(0, 1), Qt.BackgroundRole).color() == QColor("#FEE2E2")
+        model.set_report(pd.DataFrame([["x"]]))
+        assert not model.is_dirty() and model.data(model.index(0, 0), Qt.BackgroundRole) is None
+
+
+def test_save_writes_only_changed_cells():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_styled_report(tmp)
+        handler, model = load(path)
+        handler._update_reporting_data = lambda: None
+        model.setData(model.index(4, 6), "3")
+
+        handler.save_data(model.dirty_cells())
+        ws = load_workbook(path).active
+        assert ws["G5"].value == 3, "Edited cell converted back to a number"
+        assert ws["G5"].fill.fgColor.rgb.endswith("FF0000"), "0 + 1 - 0 != 3"
+        assert ws["G4"].fill.fgColor.rgb.endswith("DDDDDD")
+        assert ws["B1"].value == "Firma A" and ws["A4"].value == 1
+
+
+if __name__ == "__main__":
+    tests = [
+        test_display_and_styles,
+        test_dirty_cells,
+        test_save_writes_only_changed_cells,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Test that reports added or removed on disk reach the verification queue."""
+
+import sys
+import os
+import time
+import tempfile
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from PyQt5.QtWidgets import QApplication
+
+import core.company_db as company_db
+import core.excel_handler as excel_handler
+import core.file_manager as file_manager
+from core.database_handler import DatabaseHandler
+from core.file_manager import FileManager
+from ui.report_watcher import ReportWatcher
+from report_fixtures import make_report
+
+app = QApplication.instance() or QApplication([])
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "Timed out"
+        app.processEvents()
+        time.sleep(0.01)
+
+
+class ReportsRoot:
+    """Points FileManager and the databases at a temporary REPORTS_ROOT and database."""
+
+    def __init__(self, directory):
+        self.root = os.path.join(directory, "Reports")
+        self.db_path = os.path.join(directory, "t.db")
+        os.makedirs(self.root)
+
+    def __enter__(self):
+        self.saved = (company_db.DATABASE_FILE, excel_handler.DATABASE_FILE, file_manager.DATABASE_FILE,
+                      file_manager.REPORTS_ROOT)
+        company_db.DATABASE_FILE = excel_handler.DATABASE_FILE = file_manager.DATABASE_FILE = self.db_path
+        file_manager.REPORTS_ROOT = self.root
+        return self
+
+    def __exit__(self, *exc):
+        (company_db.DATABASE_FILE, excel_handler.DATABASE_FILE, file_manager.DATABASE_FILE,
+         file_manager.REPORTS_ROOT) = self.saved
+        DatabaseHandler.close_all(self.db_path)
+
+
+def test_watcher_emits_added_and_removed_reports():
+    with tempfile.TemporaryDirectory() as tmp, ReportsRoot(tmp) as env:
+        a = make_report(os.path.join(env.root, "Firma A"), "a.xlsx")
+        manager = FileManager()
+        watcher = ReportWatcher(manager, {'debounce_ms': 50})
+        changes = []
+        watcher.reports_changed.connect(lambda added, removed: changes.append((added, removed)))
+        watcher.start(manager.get_unapproved_reports())
+        assert not watcher._poll.isActive(), "Local folders are watched, not polled"
+
+        b = make_report(os.path.join(env.root, "Firma B", "2026-02"), "b.xlsx")
+        wait_for(lambda: changes)
+        assert changes[-1] == ([b], [])
+        assert os.path.join(env.root, "Firma B", "2026-02") in watcher._watcher.directories(), "New folders watched"
+
+        os.remove(a)
+        wait_for(lambda: len(changes) == 2)
+        assert changes[-1] == ([], [a])
+        watcher.stop()
+        assert not watcher.is_active() and not watcher._watcher.directories()
+
+
+def test_polling_fallback_and_debounce():
+    with tempfile.TemporaryDirectory() as tmp, ReportsRoot(tmp) as env:
+        manager = FileManager()
+        watcher = ReportWatcher(manager, {'polling': True, 'poll_interval_s': 0.05, 'debounce_ms': 10000})
+        changes = []
+        watcher.reports_changed.connect(lambda added, removed: changes.append((added, removed)))
+        watcher.start([])
+        assert watcher._poll.isActive()
+
+        paths = [make_report(env.root, f"{i}.xlsx") for i in range(3)]
+        wait_for(lambda: changes)
+        assert sorted(p for added, _ in changes for p in added) == paths
+        watcher.stop()
+
+
+def test_queue_updated_without_reloading_current_report():
+    from ui.main_window import VerificationPage
+
+    with tempfile.TemporaryDirectory() as tmp, ReportsRoot(tmp) as env:
+        b = make_report(env.root, "b.xlsx")
+        d = make_report(env.root, "d.xlsx")
+        page = VerificationPage()
+        page.report_watcher._debounce.setInterval(50)
+        assert page.unapproved_reports == [b, d] and page.current_excel_path == b
+        workbook = page.excel_handler.current_workbook
+
+        a = make_report(env.root, "a.xlsx")
+        c = make_report(env.root, "c.xlsx")
+        wait_for(lambda: len(page.unapproved_reports) == 4)
+        assert page.unapproved_reports == [a, b, c, d]
+        assert page.current_report_index == 1 and page.nav_label.text() == "2/4"
+        assert page.excel_handler.current_workbook is workbook, "Current report not reloaded"
+
+        os.remove(b)
+        wait_for(lambda: len(page.unapproved_reports) == 3)
+        assert page.current_excel_path == c, "Report on screen deleted elsewhere: the next one is shown"
+        assert page.nav_label.text() == "2/3"
+
+        for path in (a, c, d):
+            os.remove(path)
+        wait_for(lambda: not page.unapproved_reports)
+        assert page.nav_label.text() == "0/0"
+        e = make_report(env.root, "e.xlsx")
+        page.sync_reports()
+        wait_for(lambda: page.current_excel_path == e)
+
+        page.report_watcher.stop()
+        page.prefetcher.shutdown()
+        page.images.shutdown()
+
+
+if __name__ == "__main__":
+    tests = [
+        test_watcher_emits_added_and_removed_reports,
+        test_polling_fallback_and_debounce,
+        test_queue_updated_without_reloading_current_report,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
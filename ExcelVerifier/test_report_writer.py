@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Test the single-pass Excel report writer of ImageTransformer.write_report."""
+
+import sys
+import os
+import tempfile
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from openpyxl import load_workbook
+
+from core.image_transformer import ImageTransformer
+
+RESULT = {
+    'odbiorca': 'Firma A',
+    'nr_dokumentu': 'FV/12/2026 FVS',
+    'data_wystawienia': '14.02.2026',
+    'dane': "\n".join([
+        "|Lp|Nazwa|Ilość|Uwagi|Ilość|Stan poprzedni|Stan po wymianie|",
+        "|---|---|---|---|---|---|---|",
+        "|1|Tlen 10L|2||1|5|6|",       # 5 + 2 - 1 = 6
+        "|2|Azot 20L|1||0|0|3|",       # expected 1 -> red
+        "|3|Hel|||||",                 # empty -> not checked
+        "|4|CO2|1,5||0,5|2|3|",        # decimal commas
+    ]),
+}
+
+
+def write(tmp, result, image_data=None):
+    image = os.path.join(tmp, "photo.jpg")
+    with open(image, "wb") as f:
+        f.write(b"original photo")
+    transformer = ImageTransformer(api_key="test", use_cache=False)
+    return transformer.write_report(image, result, os.path.join(tmp, "out"), image_data=image_data)
+
+
+def test_layout_and_styles():
+    with tempfile.TemporaryDirectory() as tmp:
+        path, highlighted = write(tmp, RESULT)
+        assert os.path.basename(path) == "2026-02-14_Firma A.xlsx"
+        ws = load_workbook(path)["Sheet1"]
+
+        assert [c.value for c in ws[1]][:6] == ["Odbiorca", "Firma A", "Data wystawienia", "14.02.2026",
+                                            "Nr dokumentu", "FV/12/2026 FVS"]
+        assert [ws.cell(row=1, column=c).font.b for c in (1, 3, 5)] == [True] * 3
+        assert [ws.cell(row=1, column=c).alignment.wrap_text for c in (2, 4, 6)] == [True] * 3
+        assert ws.row_dimensions[1].height == 80
+        assert [ws.column_dimensions[c].width for c in "BDF"] == [15, 15, 15]
+        assert all(c.value is None for c in ws[2]), "No errors row"
+        assert ws.cell(row=3, column=2).value == "Nazwa"
+        assert [c.value for c in ws[4]] == ["1", "Tlen 10L", "2", None, "1", "5", "6"]
+        assert ws.max_row == 7
+
+
+def test_validation_fill():
+    with tempfile.TemporaryDirectory() as tmp:
+        path, highlighted = write(tmp, RESULT)
+        ws = load_workbook(path)["Sheet1"]
+        red = [row for row in range(4, 8) if ws.cell(row=row, column=7).fill.fill_type == "solid"]
+        assert red == [5] and highlighted == 1
+        assert ws.cell(row=5, column=7).fill.fgColor.rgb.endswith("FF9999")
+
+
+def test_errors_row_and_fallback_table():
+    with tempfile.TemporaryDirectory() as tmp:
+        path, highlighted = write(tmp, {'odbiorca': 'Firma B', 'dane': '', 'error': 'All models failed'})
+        ws = load_workbook(path)["Sheet1"]
+        assert ws.cell(row=2, column=1).value == "Errors"
+        assert "API response: All models failed" in ws.cell(row=2, column=2).value
+        assert [c.value for c in ws[3]][:2] == ["Notice", "Value"]
+        assert highlighted == 0
+
+
+def test_prepared_image_saved_next_to_report():
+    with tempfile.TemporaryDirectory() as tmp:
+        path, _ = write(tmp, RESULT, image_data=b"trimmed photo")
+        with open(os.path.splitext(path)[0] + ".jpg", "rb") as f:
+            assert f.read() == b"trimmed photo"
+
+
+if __name__ == "__main__":
+    tests = [
+        test_layout_and_styles,
+        test_validation_fill,
+        test_errors_row_and_fallback_table,
+        test_prepared_image_saved_next_to_report,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
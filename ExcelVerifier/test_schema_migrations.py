@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Test the versioned schema bootstrap of DatabaseHandler (PRAGMA user_version)."""
+
+import sys
+import os
+import sqlite3
+import tempfile
+
+# Path fix
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from ExcelVerifier.core.database_handler import DatabaseHandler, SCHEMA_VERSION, normalize_date
+
+
+def user_version(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_new_database_gets_current_version():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test.db")
+        db = DatabaseHandler(db_path)
+        assert user_version(db_path) == SCHEMA_VERSION
+        assert db.get_all_companies() == []
+        DatabaseHandler.close_all(db_path)
+
+
+def test_bootstrap_runs_once_per_path():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test.db")
+        DatabaseHandler(db_path)
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA user_version = 0")
+        conn.commit()
+        conn.close()
+
+        DatabaseHandler(db_path)
+        assert user_version(db_path) == 0, "Second handler should not re-run migrations"
+
+        DatabaseHandler.close_all(db_path)
+        DatabaseHandler(db_path)
+        assert user_version(db_path) == SCHEMA_VERSION, "close_all should force a new check"
+        DatabaseHandler.close_all(db_path)
+
+
+def test_legacy_schema_is_converted():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "legacy.db")
+        conn = sqlite3.connect(db_path)
+        conn.executescript("""
+            CREATE TABLE approved_records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT NOT NULL, company TEXT,
+                filename TEXT UNIQUE NOT NULL, filepath TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+            CREATE INDEX idx_approved_date ON approved_records(date);
+            CREATE TABLE reporting_data (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, date_issued TEXT, recipient TEXT,
+                document_number TEXT, product_name TEXT, quantity_delivery REAL,
+                quantity_return REAL, previous_state REAL, state_after REAL,
+                source_filename TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+            INSERT INTO approved_records (date, company, filename, filepath)
+                VALUES ('2026-01-05', 'Firma A', 'a.xlsx', 'C:/a.xlsx');
+            INSERT INTO reporting_data (date_issued, recipient, document_number, product_name,
+                quantity_delivery, quantity_return, previous_state, state_after, source_filename)
+                VALUES ('2026-01-04', 'Firma A', 'WZ/1', 'Tlen 10L', 2, 1, 5, 6, 'a.xlsx'),
+                       ('2026-01-04', 'Firma A', 'WZ/1', 'Azot 20L', 1, 0, 0, 1, 'a.xlsx');
+        """)
+        conn.commit()
+        conn.close()
+
+        db = DatabaseHandler(db_path)
+        record = db.get_approved_record('a.xlsx')
+        assert record is not None and record['company_name'] == 'Firma A'
+        items = db.get_order_items(record['order_id'])
+        assert len(items) == 2
+        assert sorted(p['name'] for p in db.get_all_products()) == ['Azot 20L', 'Tlen 10L']
+        assert user_version(db_path) == SCHEMA_VERSION
+        assert any(name.startswith("legacy.db.backup_") for name in os.listdir(tmp)), "Backup expected"
+        DatabaseHandler.close_all(db_path)
+
+
+def test_normalize_date():
+    from datetime import date, datetime
+    assert normalize_date("14.02.2026") == "2026-02-14"
+    assert normalize_date("2026-02-14 00:00:00") == "2026-02-14"
+    assert normalize_date(datetime(2026, 2, 14, 8, 30)) == "2026-02-14"
+    assert normalize_date(date(2026, 2, 14)) == "2026-02-14"
+    assert normalize_date(46067) == "2026-02-14"  # Excel serial
+    for bad in (None, "", "brak", 7):
+        try:
+            normalize_date(bad)
+            assert False, f"{bad!r} should be rejected"
+        except ValueError:
+            pass
+
+
+def test_dates_normalized_and_enforced():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test.db")
+        db = DatabaseHandler(db_path)
+        # Simulate rows written before dates were normalized (schema version 1)
+        conn = sqlite3.connect(db_path)
+        conn.executescript("""
+            DROP TRIGGER trg_orders_date_issued_iso_insert;
+            DROP TRIGGER trg_approved_records_date_iso_insert;
+            INSERT INTO companies (name) VALUES ('Firma A');
+            INSERT INTO orders (company_id, date_issued) VALUES (1, '14.02.2026');
+            INSERT INTO approved_records (order_id, date, filename, filepath)
+                VALUES (1, '2026-02-14 00:00:00', 'a.xlsx', 'a.xlsx');
+            PRAGMA user_version = 1;
+        """)
+        conn.close()
+        DatabaseHandler.close_all(db_path)
+
+        db = DatabaseHandler(db_path)
+        assert db.get_order_by_id(1)['date_issued'] == "2026-02-14"
+        assert [r['filename'] for r in db.get_approved_records_by_month("2026-02")] == ['a.xlsx']
+
+        assert db.add_order(1, "15.02.2026")
+        try:
+            with db._get_connection() as conn:
+                conn.execute("INSERT INTO orders (company_id, date_issued) VALUES (1, '15.02.2026')")
+            assert False, "Trigger should reject non-ISO dates"
+        except sqlite3.IntegrityError:
+            pass
+        DatabaseHandler.close_all(db_path)
+
+
+if __name__ == "__main__":
+    tests = [
+        test_new_database_gets_current_version,
+        test_bootstrap_runs_once_per_path,
+        test_legacy_schema_is_converted,
+        test_normalize_date,
+        test_dates_normalized_and_enforced,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
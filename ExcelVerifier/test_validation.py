@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Test the shared stock validation kernel (F + C - E = G) and its call sites."""
+
+import sys
+import os
+import random
+
+# Path fix (the app modules import "config" and "core.*" directly)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.join(current_dir, "ExcelVerifier")
+for path in (current_dir, app_dir):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from openpyxl import Workbook
+from openpyxl.styles import PatternFill
+
+from core.validation import parse_numbers, expected_stock, table_mismatches, batch_mismatches
+from core.excel_handler import ExcelHandler
+
+
+def legacy_mismatch(row):
+    """The per-cell check both call sites used before."""
+    def to_num(x):
+        if x is None or (isinstance(x, str) and x.strip() == ""):
+            return None
+        try:
+            return float(str(x).replace(",", "."))
+        except ValueError:
+            return None
+
+    c, e, f, g = (to_num(row[i]) if i < len(row) else None for i in (2, 4, 5, 6))
+    safe_f = f if f is not None else 0.0
+    if c is None and e is None:
+        expected = f
+    else:
+        expected = safe_f + (c or 0.0) - (e or 0.0)
+    return expected is not None and g is not None and round(g, 2) != round(expected, 2)
+
+
+def random_row(rng):
+    def value():
+        return rng.choice([None, "", "—", "-", "abc", rng.randint(0, 20), f"{rng.randint(0, 20)},5",
+                           str(rng.randint(0, 20)), rng.randint(0, 2000) / 100])
+    return ["1", "Tlen 10L"] + [value() for _ in range(rng.randint(0, 5))]
+
+
+def test_parse_numbers():
+    values = parse_numbers([None, "", " 3 ", "2,5", "—", "-", "–", 7, 1.25, "x"])
+    assert [None if v != v else v for v in values] == [None, None, 3.0, 2.5, None, None, None, 7.0, 1.25, None]
+
+
+def test_expected_stock_rules():
+    nan = float("nan")
+    expected = expected_stock([nan, 2, 2, nan, nan], [nan, nan, 1, 1, nan], [5, nan, 5, 5, nan])
+    assert list(expected[:4]) == [5, 2, 6, 4]
+    assert expected[4] != expected[4], "Nothing to check when C, E and F are empty"
+
+
+def test_kernel_matches_legacy_check():
+    rng = random.Random(7)
+    rows = [random_row(rng) for _ in range(3000)]
+    expected = [i for i, row in enumerate(rows) if legacy_mismatch(row)]
+    assert table_mismatches(rows).tolist() == expected
+    assert len(expected) > 100
+
+
+def test_batch_splits_per_table():
+    ok = ["1", "A", "2", "", "1", "5", "6"]
+    bad = ["2", "B", "1", "", "0", "0", "3"]
+    result = batch_mismatches([[ok, bad, bad], [], [ok], [bad, ok]])
+    assert [r.tolist() for r in result] == [[1, 2], [], [], [0]]
+    assert table_mismatches([]).tolist() == []
+
+
+def test_editor_save_colours_mismatches():
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Odbiorca", "Firma A"])
+    ws.append([])
+    ws.append(["Lp", "Nazwa", "Ilość", "Uwagi", "Ilość", "Stan poprzedni", "Stan po wymianie"])
+    ws.append(["1", "Tlen", "2", None, "1", "5", "6"])
+    ws.append(["2", "Azot", "1", None, "0", "0", "3"])
+    ws.append(["3", "Hel", "1,5", None, None, "1", "2,5"])
+    grey = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
+
+    handler = ExcelHandler.__new__(ExcelHandler)
+    handler.original_fills = {4: grey, 5: None, 6: PatternFill(start_color="FF0000", fill_type="solid")}
+    ws.cell(row=6, column=7).fill = PatternFill(start_color="FF0000", fill_type="solid")
+    handler._apply_validation_coloring(ws)
+
+    assert ws.cell(row=4, column=7).fill.fgColor.rgb.endswith("DDDDDD"), "Original fill restored"
+    assert ws.cell(row=5, column=7).fill.fgColor.rgb.endswith("FF0000")
+    assert ws.cell(row=6, column=7).fill.fill_type is None, "Fixed row loses the old red"
+
+
+if __name__ == "__main__":
+    tests = [
+        test_parse_numbers,
+        test_expected_stock_rules,
+        test_kernel_matches_legacy_check,
+        test_batch_splits_per_table,
+        test_editor_save_colours_mismatches,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ PASS - {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ FAIL - {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)